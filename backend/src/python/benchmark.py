@@ -0,0 +1,272 @@
+"""
+Benchmark offline cho TechnicalIndicators và TechnicalAnalysisTool trên OHLCV random walk tổng hợp.
+
+    python benchmark.py                              # 1e3 .. 1e7 điểm, JSON ra stdout
+    python benchmark.py --sizes 1000 100000 --repeat 5 --output bench.json
+    python benchmark.py --compare bench.json         # thêm tỉ lệ so với một lần chạy trước
+
+Mỗi case báo thời gian tốt nhất/trung vị qua `repeat` lần chạy, cùng bộ nhớ đỉnh và số block
+cấp phát ròng từ một lần chạy thêm dưới tracemalloc (chạy riêng để tracing không làm chậm
+số đo thời gian). Lần chạy đầy đủ còn báo `output_sizes`: kích thước JSON và số token prompt
+ước tính của một lần gọi TechnicalAnalysisTool ở dạng compact so với full, và `parallel_scaling`:
+tốc độ của ParallelIndicatorExecutor với mọi core so với 1 worker (mục tiêu gần tuyến tính).
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+import numpy as np
+from tools.technical_indicators import TechnicalIndicators
+from tools.indicator_cache import get_default_cache
+from tools.result_cache import get_default_result_cache
+from tools.synthetic_data import random_walk_ohlcv, SyntheticProvider
+from tools.compact_output import output_savings
+from tools.parallel_indicators import ParallelIndicatorExecutor, build_jobs
+
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+ALL_INDICATORS = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic', 'volume',
+                  'atr', 'adx', 'obv', 'vwap', 'ichimoku']
+
+# Số mã giả lập cho benchmark executor song song: lịch sử được chia đều cho các mã
+PARALLEL_SYMBOLS = 64
+
+SWEEP_PARAMS = [
+    {"indicator": "rsi", "period": 7}, {"indicator": "rsi", "period": 21},
+    {"indicator": "ema", "period": 50}, {"indicator": "sma", "period": 200},
+    {"indicator": "bollinger", "period": 20, "std_dev": 2.5}
+]
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> Dict[str, Any]:
+    """Thời gian qua `repeat` lần chạy, sau đó bộ nhớ đỉnh và cấp phát ròng từ một lần chạy có tracing"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    allocated_blocks = sys.getallocatedblocks() - blocks_before
+
+    return {
+        "best_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "peak_memory_bytes": peak,
+        "allocated_blocks": allocated_blocks,
+        "repeat": repeat
+    }
+
+
+def indicator_cases(data) -> Dict[str, Callable[[], Any]]:
+    """Mọi hàm calculate_* public, gọi giống cách các tool gọi (đầu vào là list)"""
+    prices = data['Close'].tolist()
+    volumes = data['Volume'].tolist()
+    highs = data['High'].tolist()
+    lows = data['Low'].tolist()
+    ti = TechnicalIndicators
+    return {
+        "calculate_rsi": lambda: ti.calculate_rsi(prices),
+        "calculate_macd": lambda: ti.calculate_macd(prices),
+        "calculate_bollinger_bands": lambda: ti.calculate_bollinger_bands(prices),
+        "calculate_ema": lambda: ti.calculate_ema(prices),
+        "calculate_sma": lambda: ti.calculate_sma(prices),
+        "calculate_volume": lambda: ti.calculate_volume(prices, volumes),
+        "calculate_stochastic": lambda: ti.calculate_stochastic(prices, highs, lows),
+        "calculate_atr": lambda: ti.calculate_atr(prices, highs, lows),
+        "calculate_adx": lambda: ti.calculate_adx(prices, highs, lows),
+        "calculate_obv": lambda: ti.calculate_obv(prices, volumes),
+        "calculate_vwap": lambda: ti.calculate_vwap(prices, volumes, highs, lows),
+        "calculate_ichimoku": lambda: ti.calculate_ichimoku(prices, highs, lows),
+        "calculate_multiple_indicators": lambda: ti.calculate_multiple_indicators(prices, volumes, highs, lows),
+        "calculate_multiple_indicators[all]": lambda: ti.calculate_multiple_indicators(prices, volumes, highs, lows,
+                                                                                       ALL_INDICATORS),
+        "calculate_indicator_columns": lambda: ti.calculate_indicator_columns(prices, volumes, highs, lows),
+        "calculate_parameter_sweep": lambda: ti.calculate_parameter_sweep(prices, SWEEP_PARAMS, volumes, highs, lows),
+        "calculate_signal_series": lambda: ti.calculate_signal_series(prices, volumes, highs, lows),
+    }
+
+
+def parallel_cases(data, executors: Dict[int, ParallelIndicatorExecutor]) -> Dict[str, Callable[[], Any]]:
+    """
+    ParallelIndicatorExecutor.map trên PARALLEL_SYMBOLS mã (cùng tổng số điểm với các case khác),
+    mỗi số worker một case; pool được giữ qua các lần chạy nên thời gian đo là throughput, không gồm khởi động
+    """
+    step = max(1, len(data) // PARALLEL_SYMBOLS)
+    jobs = build_jobs({f"SYM{i}": data.iloc[start:start + step]
+                       for i, start in enumerate(range(0, len(data), step))}, indicators=ALL_INDICATORS)
+    return {f"parallel_map[workers={workers}]": (lambda executor=executor: executor.map(jobs))
+            for workers, executor in executors.items()}
+
+
+def parallel_scaling(results: List[Dict[str, Any]], workers: int) -> List[Dict[str, Any]]:
+    """Tốc độ và hiệu suất của `workers` worker so với 1 worker ở từng kích thước"""
+    timings = {(r["case"], r["points"]): r["best_ms"] for r in results if "best_ms" in r}
+    scaling = []
+    for (case, points), serial in timings.items():
+        parallel = timings.get((f"parallel_map[workers={workers}]", points))
+        if case != "parallel_map[workers=1]" or not parallel:
+            continue
+        speedup = serial / parallel
+        scaling.append({"points": points, "workers": workers, "speedup": round(speedup, 2),
+                        "efficiency": round(speedup / workers, 2)})
+    return scaling
+
+
+def tool_cases(data) -> Dict[str, Callable[[], Any]]:
+    """Các hàm market_context và một lần `_run` trọn vẹn, phần tải dữ liệu thay bằng dữ liệu tổng hợp"""
+    from tools.technical_analysis_tool import TechnicalAnalysisTool
+
+    provider = SyntheticProvider(points=len(data))
+
+    class OfflineTechnicalAnalysisTool(TechnicalAnalysisTool):
+        def _fetch_history(self, symbol: str, period: str, interval: str):
+            return provider.history(symbol, period, interval)
+        
+        def _data_version(self, symbol: str, interval: str) -> int:
+            return 0
+
+    tool = OfflineTechnicalAnalysisTool()
+    volumes = data['Volume'].tolist()
+
+    # Cache bị xóa trước mỗi lần chạy để đo đường tính toán đầy đủ, không phải cache hit
+    # (trừ ca "result cache hit" đo riêng đường trả JSON đã cache)
+    def analyze():
+        get_default_cache().clear()
+        return tool._analyze(data, ["rsi", "macd", "bollinger", "ema", "sma"])
+
+    def run_tool():
+        get_default_cache().clear()
+        get_default_result_cache().clear()
+        return tool._run("BTC")
+
+    def run_tool_cached():
+        return tool._run("BTC")
+
+    return {
+        "tool._market_structure": lambda: tool._market_structure(data),
+        "tool._analyze_volume_trend": lambda: tool._analyze_volume_trend(volumes),
+        "tool._analyze": analyze,
+        "tool._run": run_tool,
+        "tool._run[result cache hit]": run_tool_cached,
+    }
+
+
+def output_sizes(data) -> List[Dict[str, Any]]:
+    """Kích thước serialize và số token prompt ước tính của một lần gọi tool, full so với compact"""
+    from tools.technical_analysis_tool import TechnicalAnalysisTool
+
+    tool = TechnicalAnalysisTool()
+    results = tool._analyze(data, ["rsi", "macd", "bollinger", "ema", "sma"])
+    full = tool._serialize(results)
+    variants = {
+        "compact": ((), "numeric", 0),
+        "compact history=none": ((), "none", 0),
+        "compact fields=summary,market_context": (("summary", "market_context"), "none", 0),
+        "compact max_chars=1000": ((), "numeric", 1000),
+    }
+    return [{"case": f"tool output {name}", "points": len(data), **output_savings(full, tool._serialize(results, compact))}
+            for name, compact in variants.items()]
+
+
+def run_benchmarks(sizes: List[int], repeat: int = 3, include_tool: bool = True,
+                   only: Optional[List[str]] = None) -> Dict[str, Any]:
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": []
+    }
+    workers = os.cpu_count() or 1
+    executors = {count: ParallelIndicatorExecutor(count) for count in sorted({1, workers})}
+
+    for size in sizes:
+        data = random_walk_ohlcv(size)
+        cases = indicator_cases(data)
+        cases.update(parallel_cases(data, executors))
+        if include_tool:
+            try:
+                cases.update(tool_cases(data))
+            except ImportError as e:
+                report.setdefault("skipped", []).append(f"tool benchmarks: {str(e)}")
+                include_tool = False
+
+        for name, func in cases.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            entry = {"case": name, "points": size}
+            try:
+                entry.update(measure(func, repeat))
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {str(e)}"
+            report["results"].append(entry)
+            print(f"{name:<40} {size:>10,} {entry.get('best_ms', 'error'):>12} ms", file=sys.stderr)
+
+        if include_tool and not only:
+            for entry in output_sizes(data):
+                report.setdefault("output_sizes", []).append(entry)
+                print(f"{entry['case']:<40} {size:>10,} {entry['tokens_saved']:>9} tokens saved "
+                      f"({entry['saved_pct']}%)", file=sys.stderr)
+
+    for executor in executors.values():
+        executor.close()
+    if workers > 1:
+        report["parallel_scaling"] = parallel_scaling(report["results"], workers)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Gắn vào mỗi kết quả tỉ lệ thời gian và bộ nhớ so với một báo cáo trước"""
+    previous = {(r["case"], r["points"]): r for r in baseline.get("results", []) if "best_ms" in r}
+    for result in report["results"]:
+        before = previous.get((result["case"], result["points"]))
+        if before is None or "best_ms" not in result:
+            continue
+        result["baseline_best_ms"] = before["best_ms"]
+        result["time_ratio"] = round(result["best_ms"] / before["best_ms"], 3) if before["best_ms"] else None
+        if before.get("peak_memory_bytes"):
+            result["memory_ratio"] = round(result["peak_memory_bytes"] / before["peak_memory_bytes"], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline indicator benchmark on synthetic OHLCV")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="Run only cases whose name contains one of these strings")
+    parser.add_argument("--no-tool", action="store_true", help="Skip TechnicalAnalysisTool cases")
+    parser.add_argument("--compare", help="Earlier JSON report to compute ratios against")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeat, not args.no_tool, args.only)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📁 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
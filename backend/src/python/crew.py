@@ -178,7 +178,7 @@ class SocialFiCrew():
             config=self.agents_config["strategy_agent"],
             verbose=True,
             llm=gemini_reasoning_llm,
-            tools=[TechnicalAnalysisTool(),search_tool, scrape_tool],
+            tools=[TechnicalAnalysisTool(compact_output=True), search_tool, scrape_tool],
             max_rpm=3,
             max_iter=3
         )
@@ -190,7 +190,7 @@ class SocialFiCrew():
             config=self.agents_config["technical_prediction_engine"],
             verbose=True,
             llm=gemini_reasoning_llm,
-            tools=[TechnicalAnalysisTool(), LSTMPredictionTool(), search_tool],
+            tools=[TechnicalAnalysisTool(compact_output=True), LSTMPredictionTool(compact_output=True), search_tool],
             max_rpm=5,
             max_iter=3
         )
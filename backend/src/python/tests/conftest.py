@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Các module được import dạng `tools.*` từ backend/src/python
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,38 @@
+import numpy as np
+from tools.indicator_cache import IndicatorCache
+
+
+def _series(seed: int, points: int = 120) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, points)))
+
+
+def test_disk_tier_stays_within_budget(tmp_path):
+    probe = IndicatorCache(disk_dir=str(tmp_path / "probe"))
+    probe.calculate_multiple_indicators(_series(0))
+    entry_size = probe.stats()["disk_bytes"]
+
+    budget = entry_size * 5
+    cache = IndicatorCache(max_bytes=0, disk_dir=str(tmp_path / "cache"), disk_max_bytes=budget)
+    for seed in range(20):
+        cache.calculate_multiple_indicators(_series(seed))
+
+    files = list((tmp_path / "cache").glob("*.json"))
+    assert sum(path.stat().st_size for path in files) <= budget
+    assert cache.stats()["disk_evictions"] > 0
+    assert cache.stats()["disk_bytes"] == sum(path.stat().st_size for path in files)
+
+    # Kết quả mới nhất vẫn còn trên đĩa, kết quả cũ nhất đã bị xóa
+    fresh = IndicatorCache(max_bytes=0, disk_dir=str(tmp_path / "cache"), disk_max_bytes=budget)
+    fresh.calculate_multiple_indicators(_series(19))
+    assert fresh.stats()["disk_hits"] == 1
+    fresh.calculate_multiple_indicators(_series(0))
+    assert fresh.stats()["misses"] == 1
+
+
+def test_disk_tier_unlimited(tmp_path):
+    cache = IndicatorCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=0)
+    for seed in range(5):
+        cache.calculate_multiple_indicators(_series(seed))
+    assert len(list(tmp_path.glob("*.json"))) == 5
+    assert cache.stats()["disk_evictions"] == 0
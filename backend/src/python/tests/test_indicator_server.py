@@ -0,0 +1,45 @@
+import io
+import json
+import sys
+import numpy as np
+from tools import technical_indicators
+from tools.technical_indicators import serve
+
+
+def single_shot(monkeypatch, capsys, *argv):
+    """Kết quả của CLI một lần: `python technical_indicators.py <prices> <indicator> ...`"""
+    monkeypatch.setattr(sys, "argv", ["technical_indicators.py", *argv])
+    technical_indicators.main()
+    return json.loads(capsys.readouterr().out)
+
+
+def test_serve_matches_single_shot(monkeypatch, capsys):
+    rng = np.random.default_rng(2)
+    prices = (30000 * np.exp(np.cumsum(rng.normal(0, 0.01, 120)))).round(2).tolist()
+    volumes = rng.uniform(1, 100, 120).round(2).tolist()
+    requests = [
+        {"id": 1, "indicator": "rsi", "prices": prices},
+        {"id": "b", "indicator": "all", "prices": prices, "volumes": volumes},
+        {"id": 3, "indicator": "macd", "prices": prices[:20]},
+    ]
+    stdin = io.StringIO("\n".join(json.dumps(r) for r in requests[:2]) + "\n\n   \n" + json.dumps(requests[2]) + "\n")
+    stdout = io.StringIO()
+    serve(stdin, stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    # Dòng trống bị bỏ qua, mỗi request một response theo đúng thứ tự
+    assert [r["id"] for r in responses] == [1, "b", 3]
+    assert responses[0]["result"] == single_shot(monkeypatch, capsys, json.dumps(prices), "rsi")
+    assert responses[1]["result"] == single_shot(monkeypatch, capsys, json.dumps(prices), "all", json.dumps(volumes))
+    assert responses[2]["result"] == single_shot(monkeypatch, capsys, json.dumps(prices[:20]), "macd")
+
+
+def test_bad_request_does_not_stop_the_loop():
+    stdin = io.StringIO('not json\n{"id": 7, "indicator": "rsi"}\n{"id": 8, "indicator": "sma", "prices": [1, 2, 3]}\n')
+    stdout = io.StringIO()
+    serve(stdin, stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert len(responses) == 3
+    assert responses[0] == {"id": None, "result": {"error": responses[0]["result"]["error"]}}
+    assert responses[1]["id"] == 7 and "error" in responses[1]["result"]
+    assert responses[2]["id"] == 8 and "error" in responses[2]["result"]
@@ -0,0 +1,37 @@
+import numpy as np
+from tools.indicator_cache import IndicatorCache
+from tools.indicator_engine import LOW_MEMORY_WINDOW, IndicatorEngine, obv_offset
+from tools.synthetic_data import random_walk_ohlcv
+from tools.technical_indicators import TechnicalIndicators
+
+INDICATORS = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic', 'volume', 'atr', 'adx', 'obv', 'vwap', 'ichimoku']
+
+
+def _columns(points):
+    data = random_walk_ohlcv(points, "1h")
+    return (data['Close'].to_numpy(), data['Volume'].to_numpy(), data['High'].to_numpy(), data['Low'].to_numpy())
+
+
+def test_low_memory_matches_full_history():
+    prices, volumes, highs, lows = _columns(3 * LOW_MEMORY_WINDOW + 17)
+    full = TechnicalIndicators.calculate_multiple_indicators(prices, volumes, highs, lows, INDICATORS)
+    tail = TechnicalIndicators.calculate_multiple_indicators(prices, volumes, highs, lows, INDICATORS, low_memory=True)
+    assert tail == full
+
+
+def test_obv_offset_is_bitwise_full_obv():
+    prices, volumes, _, _ = _columns(LOW_MEMORY_WINDOW * 5 + 3)
+    full = IndicatorEngine(prices, volumes).obv()
+    for start in (1, 100, LOW_MEMORY_WINDOW, len(prices) - 10):
+        assert obv_offset(prices, volumes, start) == full[start]
+    tail = IndicatorEngine.from_tail(prices, volumes).obv()
+    np.testing.assert_array_equal(tail, full[-LOW_MEMORY_WINDOW:])
+
+
+def test_cache_keys_include_obv_offset():
+    prices, volumes, highs, lows = _columns(LOW_MEMORY_WINDOW)
+    cache = IndicatorCache()
+    plain = cache.calculate_multiple_indicators(prices, volumes, highs, lows, ['obv'])
+    shifted = cache.calculate_multiple_indicators(prices, volumes, highs, lows, ['obv'], obv_offset=1e6)
+    assert shifted['obv']['obv'] == round(plain['obv']['obv'] + 1e6, 2)
+    assert cache.stats()["hits"] == 0
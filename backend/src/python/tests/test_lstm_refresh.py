@@ -0,0 +1,122 @@
+import time
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("sklearn")
+from sklearn.preprocessing import MinMaxScaler
+from tools import lstm_model
+from tools.lstm_architectures import ARCHITECTURES
+from tools.lstm_model import FINE_TUNE, LSTMForecaster
+from tools.model_registry import ModelRegistry, TrainedModel
+
+DAY_NS = 86_400 * 10 ** 9
+
+
+class PersistenceModel:
+    """Model giả: dự đoán mọi horizon bằng giá cuối của cửa sổ; ghi lại dữ liệu của lần fit"""
+
+    def __init__(self, outputs=1):
+        self.outputs = outputs
+        self.fitted = None
+
+    def predict(self, X, verbose=0):
+        return np.repeat(np.asarray(X)[:, -1, :], self.outputs, axis=1)
+
+    def get_weights(self):
+        return [self.outputs]
+
+    def set_weights(self, weights):
+        self.outputs = weights[0]
+
+    def compile(self, **kwargs):
+        pass
+
+    def fit(self, X, y, **kwargs):
+        self.fitted = (np.asarray(X), np.asarray(y))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(b"stub")
+
+
+def make_trained(registry, mode="recursive", candles=200, new_candles=10, **meta):
+    """Model đã lưu trên `candles - new_candles` nến đầu của một chuỗi giá tăng đều 1 mỗi ngày"""
+    architecture = ARCHITECTURES[mode]
+    prices = (100.0 + np.arange(candles)).reshape(-1, 1)
+    timestamps = np.arange(candles, dtype=np.int64) * DAY_NS
+    known = candles - new_candles
+    scaler = MinMaxScaler(feature_range=(0, 1)).fit(prices[:known])
+    now = time.time()
+    trained = TrainedModel(registry.key("BTC", "1y", architecture), PersistenceModel(architecture["dense_units"]),
+                           scaler, {"architecture": architecture, "last_timestamp": int(timestamps[known - 1]),
+                                    "mae": 1.0, "trained_at": now, "full_trained_at": now, **meta})
+    return trained, prices, timestamps
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), max_age_seconds=3600, error_ratio=1.5)
+
+
+def test_refresh_plan(registry):
+    forecaster = LSTMForecaster()
+    trained, prices, timestamps = make_trained(registry)
+    plan = lambda model, values=prices: forecaster._refresh_plan(registry, model, values, timestamps)
+
+    assert plan(None) == ("full", "missing", None)
+    assert plan(trained._replace(meta={**trained.meta, "full_trained_at": time.time() - 7200})) == ("full", "stale", None)
+    assert plan(trained._replace(meta={**trained.meta, "last_timestamp": int(timestamps[-1])})) == (None, None, None)
+
+    # Giá mới vượt xa khoảng của scaler: phải fit lại scaler
+    jumped = prices.copy()
+    jumped[-3:] *= 2
+    assert plan(trained, jumped) == ("full", "range", None)
+
+    # Model giữ giá cuối trên chuỗi tăng 1 mỗi ngày: MAE trên nến mới đúng bằng 1
+    mode, reason, drift = plan(trained)
+    assert (mode, reason) == ("incremental", "new_candles")
+    assert drift == {"timestamp": int(timestamps[-1]), "holdout_mae": 1.0, "ratio": 1.0}
+
+    mode, reason, drift = plan(trained._replace(meta={**trained.meta, "mae": 0.5}))
+    assert (mode, reason, drift["ratio"]) == ("full", "drift", 2.0)
+
+    # MAE validation bằng 0: không có tỉ lệ để so, không coi là drift
+    mode, reason, drift = plan(trained._replace(meta={**trained.meta, "mae": 0.0}))
+    assert (mode, reason, drift["ratio"]) == ("incremental", "new_candles", None)
+
+
+@pytest.mark.parametrize("mode, candles, new_candles", [
+    ("recursive", 200, 10), ("direct", 200, 10), ("recursive", 100, 10), ("recursive", 200, 1)
+])
+def test_fine_tune_replays_old_windows(registry, monkeypatch, mode, candles, new_candles):
+    clones = []
+    monkeypatch.setattr(lstm_model, "clone_model", lambda model: clones.append(PersistenceModel()) or clones[-1])
+    monkeypatch.setattr(lstm_model, "Adam", lambda **kwargs: None)
+    trained, prices, timestamps = make_trained(registry, mode, candles, new_candles, fine_tunes=2)
+    sequence_length = trained.meta["architecture"]["sequence_length"]
+    horizon = trained.meta["architecture"].get("horizon", 1)
+
+    saved = LSTMForecaster()._fine_tune(registry, trained, prices, timestamps)
+    X, y = clones[0].fitted
+    # Cửa sổ thứ i có target đầu tiên là nến i + sequence_length
+    indices = np.rint(trained.scaler.inverse_transform(y.reshape(len(y), -1)[:, :1]).ravel()
+                      - 100 - sequence_length).astype(int)
+    windows = candles - sequence_length - horizon + 1
+    old_windows = windows - new_candles
+    replay = min(old_windows, max(FINE_TUNE["replay_min"], FINE_TUNE["replay_ratio"] * new_candles))
+
+    assert len(indices) == replay + new_candles == len(np.unique(indices))
+    np.testing.assert_array_equal(indices[replay:], np.arange(old_windows, windows))
+    assert (indices[:replay] < old_windows).all()
+    np.testing.assert_allclose(X[:, -1, 0], trained.scaler.transform(prices[indices + sequence_length - 1]).ravel())
+    assert clones[0].get_weights() == trained.model.get_weights()
+
+    # Cùng nến thì cùng mẫu phát lại
+    LSTMForecaster()._fine_tune(registry, trained, prices, timestamps)
+    np.testing.assert_array_equal(clones[1].fitted[1], y)
+
+    assert saved.meta["last_timestamp"] == int(timestamps[-1])
+    assert saved.meta["fine_tunes"] == 3 and saved.meta["reason"] == "new_candles"
+    assert saved.meta["full_trained_at"] == trained.meta["full_trained_at"]
+    assert registry.meta(trained.key)["fine_tunes"] == 3
@@ -0,0 +1,93 @@
+import pytest
+from tools.lstm_architectures import ARCHITECTURES
+from tools.lstm_scheduler import MISSING_STALENESS, LSTMTrainingScheduler, RequestLog
+from tools.lstm_worker import LSTMWorkerPool
+from tools.model_registry import ModelRegistry
+
+DAY = 86400
+NOW = 20000 * DAY + 13 * 3600
+# Thời điểm mở của nến ngày hiện tại và hôm trước, theo ns như "last_timestamp"
+CURRENT_CANDLE = 20000 * DAY * 10 ** 9
+PREVIOUS_CANDLE = 19999 * DAY * 10 ** 9
+
+
+class StubModel:
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(b"stub")
+
+
+class RecordingPool:
+    """Thay LSTMWorkerPool: ghi lại các request refresh theo thứ tự nhận"""
+    workers = 1
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, op, args=None, route=None):
+        self.requests.append((op, args["symbol"], args["training_period"], args["forecast_mode"]))
+        return {"action": "full", "reason": "missing", "seconds": 0.0}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), max_age_seconds=7 * DAY)
+
+
+def save_meta(registry, symbol, mode="recursive", period="1y", trained_days_ago=0.0,
+              last_timestamp=CURRENT_CANDLE):
+    key = registry.key(symbol, period, ARCHITECTURES[mode])
+    trained_at = NOW - trained_days_ago * DAY
+    registry.save(key, StubModel(), None, {"architecture": ARCHITECTURES[mode], "last_timestamp": last_timestamp,
+                                          "trained_at": trained_at, "full_trained_at": trained_at})
+
+
+def make_scheduler(registry, log, pool=None):
+    return LSTMTrainingScheduler(["BTC", "ETH", "SOL"], ["1y"], ["recursive"], pool or LSTMWorkerPool(workers=0),
+                                 registry, log, window_days=7)
+
+
+def test_plan_orders_due_jobs_and_skips_fresh_models(registry):
+    log = RequestLog(":memory:")
+    save_meta(registry, "BTC", trained_days_ago=0.5)                                 # mới, đã thấy nến hôm nay
+    save_meta(registry, "ETH", trained_days_ago=0.5, last_timestamp=PREVIOUS_CANDLE)  # chưa thấy nến hôm nay
+    # SOL chưa có model
+    save_meta(registry, "DOGE", "direct", trained_days_ago=10)                       # quá tuổi tối đa
+    for _ in range(5):
+        log.record("DOGE", "1y", "direct", NOW)
+    for _ in range(2):
+        log.record("ETH", "1y", "recursive", NOW - DAY)
+    log.record("BTC", "1y", "recursive", NOW)
+    # Ngoài cửa sổ 7 ngày: không tính
+    log.record("ADA", "1y", "recursive", NOW - 8 * DAY)
+    # Mode không tồn tại trong log: bị bỏ qua thay vì làm hỏng lượt lập kế hoạch
+    log.record("BTC", "1y", "transformer", NOW)
+
+    jobs = make_scheduler(registry, log).plan(NOW)
+    assert [(job.symbol, job.forecast_mode) for job in jobs] == [("DOGE", "direct"), ("ETH", "recursive"),
+                                                                 ("SOL", "recursive")]
+    doge, eth, sol = jobs
+    assert (doge.requests, doge.staleness, doge.priority) == (5, round(10 / 7, 3), round(6 * (1 + 10 / 7), 3))
+    assert (eth.requests, eth.staleness) == (2, round(0.5 / 7, 3))
+    assert (sol.requests, sol.staleness, sol.priority) == (0, MISSING_STALENESS, 1 + MISSING_STALENESS)
+
+
+def test_stale_model_is_due_even_with_current_candle(registry):
+    log = RequestLog(":memory:")
+    for symbol in ("BTC", "ETH", "SOL"):
+        save_meta(registry, symbol, trained_days_ago=0.5)
+    assert make_scheduler(registry, log).plan(NOW) == []
+    save_meta(registry, "SOL", trained_days_ago=30)
+    jobs = make_scheduler(registry, log).plan(NOW)
+    # Độ cũ bị chặn ở MISSING_STALENESS
+    assert [(job.symbol, job.staleness) for job in jobs] == [("SOL", MISSING_STALENESS)]
+
+
+def test_run_once_dispatches_in_priority_order(registry):
+    log = RequestLog(":memory:")
+    save_meta(registry, "BTC", trained_days_ago=0.5)
+    log.record("ETH", "1y", "recursive", NOW)
+    pool = RecordingPool()
+    results = make_scheduler(registry, log, pool).run_once(NOW)
+    assert pool.requests == [("refresh", "ETH", "1y", "recursive"), ("refresh", "SOL", "1y", "recursive")]
+    assert [(result["symbol"], result["action"]) for result in results] == [("ETH", "full"), ("SOL", "full")]
@@ -0,0 +1,52 @@
+import os
+import zlib
+import pytest
+from tools.lstm_worker import LSTMWorkerPool, handle
+
+
+@pytest.fixture
+def pool():
+    with LSTMWorkerPool(workers=1, threads=2) as pool:
+        yield pool
+
+
+def test_ping_through_worker_process(pool):
+    response = pool.request("ping", route="BTC")
+    assert response["pid"] != os.getpid() and response["threads"] == 2
+    # Worker chạy lâu dài: request sau dùng lại cùng process
+    assert pool.request("ping", route="ETH") == response
+    assert "error" in pool.request("train", route="BTC")
+    assert pool.stats() == {"workers": 1, "threads_per_worker": 2, "running": 1,
+                            "requests": 3, "errors": 1, "restarts": 0}
+
+
+def test_in_process_mode():
+    with LSTMWorkerPool(workers=0) as pool:
+        assert pool.request("ping")["pid"] == os.getpid()
+    assert handle({"op": "nope"})["error"].startswith("Unsupported operation")
+
+
+def test_routing_is_stable_crc32():
+    with LSTMWorkerPool(workers=3, threads=1) as pool:
+        for symbol in ("BTC", "ETH", "SOL", "DOGE"):
+            assert pool.slot(symbol) == zlib.crc32(symbol.encode("utf-8")) % 3
+        pids = {symbol: pool.request("ping", route=symbol)["pid"] for symbol in ("BTC", "ETH", "SOL", "DOGE")}
+        # Cùng slot thì cùng process, khác slot thì khác process
+        for a in pids:
+            for b in pids:
+                assert (pids[a] == pids[b]) == (pool.slot(a) == pool.slot(b))
+        assert pool.request("ping", route="BTC")["pid"] == pids["BTC"]
+
+
+def test_restart_after_worker_exits(pool):
+    first = pool.request("ping", route="BTC")["pid"]
+    worker = pool._processes[pool.slot("BTC")]
+    worker.process.kill()
+    worker.process.wait()
+
+    response = pool.request("ping", route="BTC")
+    assert "exited unexpectedly" in response["error"]
+    assert pool.stats()["restarts"] == 1 and pool.stats()["running"] == 0
+    # Worker được thay ở request kế tiếp
+    assert pool.request("ping", route="BTC")["pid"] not in (first, None)
+    assert pool.stats()["restarts"] == 1
@@ -0,0 +1,39 @@
+import numpy as np
+from tools.market_structure import (
+    TREND_FLAT_SLOPE_PCT, TREND_LABEL_MIN_WINDOW, market_structure, regression_slopes, trend_label
+)
+
+
+def test_tiny_drift_is_sideways():
+    # Đường thẳng gần như phẳng: R² = 1 nhưng độ dốc không đáng kể
+    prices = 30000 * (1 + 1e-6 * np.arange(300))
+    slopes = regression_slopes(prices)
+    assert slopes["50"]["r2"] > 0.99
+    assert abs(slopes["50"]["slope_pct"]) < TREND_FLAT_SLOPE_PCT
+    assert market_structure(prices)["trend_strength"] == "Sideways"
+
+
+def test_steady_trend_is_strong():
+    prices = 30000 * np.exp(0.002 * np.arange(300))
+    assert market_structure(prices)["trend_strength"] == "Strong Uptrend"
+    assert market_structure(prices[::-1].copy())["trend_strength"] == "Strong Downtrend"
+
+
+def test_strong_needs_minimum_window():
+    slope = {"slope_pct": 0.5, "r2": 0.95}
+    assert trend_label(slope, TREND_LABEL_MIN_WINDOW - 1) == "Weak Uptrend"
+    assert trend_label(slope, TREND_LABEL_MIN_WINDOW) == "Strong Uptrend"
+    # Lịch sử ngắn hơn cửa sổ tối thiểu: nhãn từ cửa sổ 10 nến, không bao giờ "Strong"
+    prices = 30000 * np.exp(0.002 * np.arange(TREND_LABEL_MIN_WINDOW - 1))
+    assert market_structure(prices)["trend_strength"] == "Weak Uptrend"
+
+
+def test_label_ignores_short_window_noise():
+    rng = np.random.default_rng(1)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    # 10 nến cuối tăng thẳng nhưng 50 nến trước đó đi ngang
+    prices[-60:] = prices[-60] * (1 + rng.normal(0, 0.0005, 60))
+    prices[-10:] = prices[-11] * np.exp(0.01 * np.arange(1, 11))
+    result = market_structure(prices)
+    assert result["trend_slopes"]["10"]["r2"] > 0.9
+    assert not result["trend_strength"].startswith("Strong")
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+import pytest
+from tools.model_registry import KEEP_VERSIONS, ModelRegistry, TrainedModel
+
+
+class StubModel:
+    """Thay model Keras: save/load chỉ là ghi/đọc bytes"""
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.weights, f)
+
+
+def load_stub(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return StubModel(json.load(f))
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelRegistry, "_load_model", staticmethod(load_stub))
+    return ModelRegistry(str(tmp_path), max_age_seconds=3600)
+
+
+def save(registry, key, weights, **meta):
+    return registry.save(key, StubModel(weights), {"scale": weights}, {"mae": 1.0, **meta})
+
+
+def test_save_load_round_trip(tmp_path, registry):
+    key = registry.key("BTC-USD", "1y", {"units": 50})
+    assert registry.load(key) is None and registry.meta(key) is None
+    save(registry, key, [1, 2, 3], last_timestamp=123)
+
+    # Registry mới (process khác) đọc lại từ đĩa
+    other = ModelRegistry(str(tmp_path))
+    trained = other.load(key)
+    assert trained.model.weights == [1, 2, 3]
+    assert trained.scaler == {"scale": [1, 2, 3]}
+    assert trained.meta["last_timestamp"] == 123
+    assert trained.meta["symbol"] == "BTC-USD" and trained.meta["architecture_hash"] == key.architecture
+    assert other.meta(key) == trained.meta
+    assert other.stats()["disk_loads"] == 1
+
+
+def test_memory_lru_follows_current_version(tmp_path, registry):
+    key = registry.key("BTC-USD", "1y", {"units": 50})
+    save(registry, key, [1])
+    reader = ModelRegistry(str(tmp_path))
+    first = reader.load(key)
+    assert reader.load(key) is first
+    assert reader.stats()["memory_hits"] == 1
+
+    # Process khác lưu phiên bản mới: lần load kế tiếp đọc lại từ đĩa
+    save(registry, key, [2])
+    second = reader.load(key)
+    assert second is not first and second.model.weights == [2]
+    assert reader.stats()["disk_loads"] == 2
+
+    reader.max_loaded = 1
+    other_key = registry.key("ETH-USD", "1y", {"units": 50})
+    save(registry, other_key, [3])
+    reader.load(other_key)
+    assert reader.stats()["loaded"] == 1
+
+
+def test_partial_version_is_skipped(tmp_path, registry):
+    key = registry.key("BTC-USD", "1y", {"units": 50})
+    # Lần lưu chết giữa chừng: có model và scaler nhưng chưa có meta.json, CURRENT chưa được ghi
+    partial = registry.path(key) / "versions" / "00000000000000000001-1-deadbeef"
+    partial.mkdir(parents=True)
+    StubModel([9]).save(partial / "model.keras")
+    assert registry.load(key) is None and registry.meta(key) is None
+
+    save(registry, key, [1])
+    assert registry.load(key).model.weights == [1]
+    # CURRENT trỏ tới phiên bản hỏng: coi như chưa có thay vì trả model lệch
+    (registry.path(key) / "CURRENT").write_text(partial.name)
+    assert ModelRegistry(str(tmp_path)).load(key) is None
+
+
+def test_saves_use_separate_versions(registry):
+    key = registry.key("BTC-USD", "1y", {"units": 50})
+    for weights in range(5):
+        save(registry, key, [weights])
+    versions = registry.path(key) / "versions"
+    names = sorted(p.name for p in versions.iterdir())
+    assert len(names) == KEEP_VERSIONS
+    assert registry.current_version(key) == names[-1]
+    assert not [p for p in registry.path(key).iterdir() if p.name.endswith(".tmp")]
+    # Phiên bản dở dang còn mới có thể là lần lưu đang chạy của process khác nên không bị dọn
+    in_progress = versions / "99999999999999999999-1-cafecafe"
+    in_progress.mkdir()
+    save(registry, key, [5])
+    assert in_progress.exists()
+    stale = time.time() - 2 * 3600
+    os.utime(in_progress, (stale, stale))
+    save(registry, key, [6])
+    assert not in_progress.exists()
+
+
+def test_is_stale_uses_last_full_training(registry):
+    key = registry.key("BTC-USD", "1y", {"units": 50})
+    now = time.time()
+    trained = TrainedModel(key, None, None, {"trained_at": now - 60, "full_trained_at": now - 7200})
+    # Fine-tune một phút trước không đặt lại mốc huấn luyện đầy đủ
+    assert registry.is_stale(trained, now)
+    assert not registry.is_stale(trained._replace(meta={"trained_at": now - 60}), now)
+    assert registry.is_stale(trained._replace(meta={"trained_at": now - 7200}), now)
+    assert registry.is_stale(trained._replace(meta={}), now)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from tools.ohlcv_store import OHLCVProvider, OHLCVStore
+from tools.timeframes import period_to_timedelta
+
+
+class FrameProvider(OHLCVProvider):
+    """Trả về các nến cố định theo interval, đếm số lần gọi"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = 0
+
+    def fetch(self, symbol, interval, start=None):
+        self.calls += 1
+        frame = self.frames[interval]
+        return frame if start is None else frame[frame.index >= start]
+
+
+def make_frame(freq, points=50):
+    index = pd.date_range(end=pd.Timestamp.now(tz="UTC").floor("D"), periods=points, freq=freq)
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, points)))
+    frame = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                          "Volume": rng.uniform(1, 1e6, points)}, index=index)
+    # Giá trị đặc biệt phải đi qua SQLite nguyên vẹn
+    frame.iloc[-3, 4] = np.inf
+    frame.iloc[-2, 0] = np.nan
+    frame.iloc[-1, 4] = 1 / 3
+    return frame
+
+
+@pytest.fixture
+def provider():
+    return FrameProvider({"1d": make_frame("D"), "1wk": make_frame("W-MON", 20)})
+
+
+def test_read_round_trips_exactly(provider):
+    store = OHLCVStore(":memory:", provider=provider)
+    arrays = store.arrays("BTC-USD", "max", "1d")
+    frame = provider.frames["1d"]
+    assert arrays["timestamp"].dtype == np.dtype("datetime64[ns]")
+    np.testing.assert_array_equal(arrays["timestamp"], frame.index.tz_convert(None).as_unit("ns").to_numpy())
+    for column in ("Open", "High", "Low", "Close", "Volume"):
+        np.testing.assert_array_equal(arrays[column.lower()], frame[column].to_numpy())
+
+
+def test_read_empty(provider):
+    arrays = OHLCVStore(":memory:", provider=provider).read("BTC-USD", "1d")
+    assert all(len(array) == 0 for array in arrays.values())
+    assert arrays["timestamp"].dtype == np.dtype("datetime64[ns]")
+
+
+def test_unkeyed_interval_fetches_directly(provider):
+    store = OHLCVStore(":memory:", provider=provider)
+    for _ in range(2):
+        data = store.history("BTC-USD", "max", "1wk")
+        assert len(data) == 20
+    assert provider.calls == 2
+    assert store.stats()["direct_fetches"] == 2
+    assert store.read("BTC-USD", "1wk")["close"].size == 0
+
+
+def test_ytd_period(provider):
+    now = pd.Timestamp.now(tz="UTC")
+    assert now - period_to_timedelta("ytd") <= pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    data = OHLCVStore(":memory:", provider=provider).history("BTC-USD", "ytd", "1d")
+    assert (data.index.year == now.year).all()
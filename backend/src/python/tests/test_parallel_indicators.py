@@ -0,0 +1,58 @@
+import json
+import numpy as np
+import pytest
+from tools.parallel_indicators import IndicatorJob, ParallelIndicatorExecutor, build_jobs
+from tools.synthetic_data import random_walk_ohlcv
+from tools.technical_indicators import TechnicalIndicators
+
+
+def make_jobs(count=10):
+    jobs = []
+    for i in range(count):
+        # Độ dài khác nhau để chunk không cân bằng, một job quá ngắn cho MACD
+        data = random_walk_ohlcv(20 if i == 3 else 200 + 37 * i, "1h")
+        jobs.append(IndicatorJob(f"SYM{i}", "1h", data["Close"].to_numpy(), data["Volume"].to_numpy(),
+                                 data["High"].to_numpy(), data["Low"].to_numpy()))
+    # Job không có volume/high/low: các chuỗi None không chiếm chỗ trong shared memory
+    jobs[5] = jobs[5]._replace(volumes=None, highs=None, lows=None, indicators=["rsi", "macd", "volume"])
+    return jobs
+
+
+def expected(job):
+    result = TechnicalIndicators.calculate_multiple_indicators(
+        job.prices, job.volumes, job.highs, job.lows, job.indicators)
+    return {"symbol": job.symbol, "timeframe": job.timeframe, "candles": len(job.prices), "result": result}
+
+
+def as_json(results):
+    return json.dumps(results, sort_keys=True, default=str)
+
+
+@pytest.mark.parametrize("max_workers, chunk_size", [(3, None), (3, 4), (1, None)])
+def test_map_matches_serial_in_submission_order(max_workers, chunk_size):
+    jobs = make_jobs()
+    with ParallelIndicatorExecutor(max_workers, chunk_size) as executor:
+        results = executor.map(jobs)
+        # Pool được giữ lại giữa các lần map
+        assert as_json(executor.map(jobs[::-1])) == as_json(results[::-1])
+    assert [r["symbol"] for r in results] == [job.symbol for job in jobs]
+    assert as_json(results) == as_json([expected(job) for job in jobs])
+    assert "error" in results[3]["result"]["macd"]
+    assert "volume" not in results[5]["result"] and "rsi" in results[5]["result"]
+
+
+def test_chunk_size():
+    assert ParallelIndicatorExecutor(4, 5)._chunk_size(100) == 5
+    # Mặc định khoảng 4 chunk cho mỗi worker
+    assert ParallelIndicatorExecutor(3)._chunk_size(10) == 1
+    assert ParallelIndicatorExecutor(3)._chunk_size(120) == 10
+    assert ParallelIndicatorExecutor(2).map([]) == []
+
+
+def test_build_jobs_fans_out_symbols_and_timeframes():
+    data = {"BTC-USD": random_walk_ohlcv(500, "1h"), "ETH-USD": random_walk_ohlcv(300, "1h")}
+    jobs = build_jobs(data, ["1h", "4h"], ["rsi"])
+    assert [(job.symbol, job.timeframe) for job in jobs] == [
+        ("BTC-USD", "1h"), ("BTC-USD", "4h"), ("ETH-USD", "1h"), ("ETH-USD", "4h")]
+    np.testing.assert_array_equal(jobs[0].prices, data["BTC-USD"]["Close"].to_numpy())
+    assert len(jobs[1].prices) < len(jobs[0].prices)
@@ -0,0 +1,24 @@
+import tools.lstm_scheduler as scheduler
+
+
+def test_unusable_path_falls_back_to_memory(tmp_path, monkeypatch):
+    # Thư mục model nằm dưới một file: mkdir lỗi OSError
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("LSTM_MODEL_DIR", str(blocker / "models"))
+    monkeypatch.setattr(scheduler, "_default_log", None)
+    log = scheduler.get_default_request_log()
+    assert log.path == ":memory:"
+    log.record("BTC", "1y", "recursive", now=0)
+    log.record("BTC", "1y", "recursive", now=0)
+    assert log.counts(now=0) == {("BTC", "1y", "recursive"): 2}
+    assert scheduler.get_default_request_log() is log
+
+
+def test_default_log_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv("LSTM_MODEL_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(scheduler, "_default_log", None)
+    log = scheduler.get_default_request_log()
+    assert log.path == str(tmp_path / "models" / "requests.sqlite")
+    log.record("ETH", "6mo", "direct", now=0)
+    assert scheduler.RequestLog(log.path).counts(now=0) == {("ETH", "6mo", "direct"): 1}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from tools.sequence_windows import sliding_windows, window_dataset
+
+
+def list_sequences(data, seq_length, horizon=1):
+    """Cách tạo cửa sổ ban đầu (list append, một bản sao mỗi cửa sổ), dùng làm mốc so sánh"""
+    X, y = [], []
+    for i in range(seq_length, len(data) - horizon + 1):
+        X.append(data[i - seq_length:i, 0])
+        y.append(data[i, 0] if horizon == 1 else data[i:i + horizon, 0])
+    return np.array(X), np.array(y)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(5)
+    return rng.uniform(0, 1, (365, 1))
+
+
+@pytest.mark.parametrize("seq_length, horizon", [(60, 1), (60, 30), (5, 3), (1, 1)])
+def test_matches_list_based_windows(series, seq_length, horizon):
+    expected_X, expected_y = list_sequences(series, seq_length, horizon)
+    X, y = sliding_windows(series, seq_length, horizon)
+    assert X.shape == expected_X.shape and y.shape == expected_y.shape
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+    np.testing.assert_array_equal(X[0], series[:seq_length, 0])
+    np.testing.assert_array_equal(y[0], series[seq_length:seq_length + horizon, 0] if horizon > 1 else series[seq_length, 0])
+    np.testing.assert_array_equal(y[-1], series[-horizon:, 0] if horizon > 1 else series[-1, 0])
+    # Chuỗi 1 chiều cho cùng kết quả
+    np.testing.assert_array_equal(sliding_windows(series[:, 0], seq_length, horizon)[0], X)
+
+
+def test_direct_targets(series):
+    X, y = sliding_windows(series, 60, 30)
+    assert X.shape == (365 - 60 - 30 + 1, 60) and y.shape == (276, 30)
+    np.testing.assert_array_equal(y[0], series[60:90, 0])
+    # Target đầu tiên của cửa sổ direct trùng target của cửa sổ recursive cùng vị trí
+    np.testing.assert_array_equal(y[:, 0], sliding_windows(series, 60)[1][:len(y)])
+
+
+def test_windows_are_read_only_views(series):
+    X, y = sliding_windows(series, 60, 30)
+    assert np.shares_memory(X, series) and np.shares_memory(y, series)
+    assert not X.flags.writeable
+
+
+def test_too_short_series():
+    X, y = sliding_windows(np.arange(10.0), 8, 3)
+    assert X.shape == (0, 8) and y.shape == (0, 3)
+    X, y = sliding_windows(np.arange(10.0), 10)
+    assert X.shape == (0, 10) and y.shape == (0,)
+    expected_X, expected_y = list_sequences(np.arange(10.0).reshape(-1, 1), 8, 3)
+    assert len(expected_X) == len(expected_y) == 0
+
+
+@pytest.mark.parametrize("horizon", [1, 30])
+def test_window_dataset_matches_arrays(series, horizon):
+    pytest.importorskip("tensorflow")
+    X, y = sliding_windows(series.astype(np.float32), 60, horizon)
+    indices = np.arange(10, len(X), 7)
+    batches = list(window_dataset(series, 60, horizon, indices, batch_size=8).as_numpy_iterator())
+    np.testing.assert_array_equal(np.concatenate([inputs for inputs, _ in batches]), X[indices][..., None])
+    np.testing.assert_array_equal(np.concatenate([targets for _, targets in batches]), y[indices])
+    inputs = np.concatenate(list(window_dataset(series, 60, horizon, indices, with_targets=False).as_numpy_iterator()))
+    np.testing.assert_array_equal(inputs, X[indices][..., None])
@@ -0,0 +1,127 @@
+import math
+import numpy as np
+import pytest
+from tools.streaming_indicators import (
+    StreamingBollingerBands, StreamingEMA, StreamingIndicator, StreamingIndicatorSet, StreamingMACD,
+    StreamingRSI, StreamingSMA, StreamingStochastic
+)
+from tools.technical_indicators import TechnicalIndicators
+
+POINTS = 160
+# Nến dùng để khởi tạo; phần còn lại được đưa vào từng nến một
+PREFIX = 60
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(7)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, POINTS)))
+    spread = prices * rng.uniform(0.001, 0.01, POINTS)
+    return prices, prices + spread, prices - spread
+
+
+def assert_matches(streamed, batch):
+    """Các trường số khớp trong sai số dấu phẩy động (sau khi làm tròn), trường chữ khớp tuyệt đối"""
+    assert "error" not in streamed and "error" not in batch, (streamed, batch)
+    for key, value in streamed.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            np.testing.assert_allclose(value, batch[key], rtol=1e-9, atol=0.011, err_msg=key)
+        else:
+            assert value == batch[key], key
+
+
+CASES = [
+    (StreamingRSI, lambda p, h, l: TechnicalIndicators.calculate_rsi(p), "value"),
+    (StreamingEMA, lambda p, h, l: TechnicalIndicators.calculate_ema(p), "ema_value"),
+    (StreamingSMA, lambda p, h, l: TechnicalIndicators.calculate_sma(p), "sma_value"),
+    (StreamingMACD, lambda p, h, l: TechnicalIndicators.calculate_macd(p), "macd"),
+    (StreamingBollingerBands, lambda p, h, l: TechnicalIndicators.calculate_bollinger_bands(p), "upper_band"),
+    (StreamingStochastic, lambda p, h, l: TechnicalIndicators.calculate_stochastic(p, h, l), "k_percent"),
+]
+
+
+@pytest.mark.parametrize("cls, batch, key", CASES, ids=[case[0].__name__ for case in CASES])
+def test_streaming_matches_batch(candles, cls, batch, key):
+    prices, highs, lows = candles
+    stream = cls.from_history(prices[:PREFIX], highs[:PREFIX], lows[:PREFIX])
+    assert_matches(stream.result(), batch(prices[:PREFIX], highs[:PREFIX], lows[:PREFIX]))
+
+    streamed, expected = [], []
+    for i in range(PREFIX, POINTS):
+        result = stream.update(float(prices[i]), float(highs[i]), float(lows[i]))
+        reference = batch(prices[:i + 1], highs[:i + 1], lows[:i + 1])
+        assert_matches(result, reference)
+        streamed.append(result[key])
+        expected.append(reference[key])
+    np.testing.assert_allclose(streamed, expected, rtol=1e-9, atol=0.011)
+
+
+def test_streaming_set_matches_batch(candles):
+    prices, highs, lows = candles
+    stream = StreamingIndicatorSet.from_history(prices[:PREFIX], highs[:PREFIX], lows[:PREFIX])
+    for i in range(PREFIX, POINTS):
+        results = stream.update(float(prices[i]), float(highs[i]), float(lows[i]))
+        reference = TechnicalIndicators.calculate_multiple_indicators(prices[:i + 1], highs=highs[:i + 1],
+                                                                      lows=lows[:i + 1])
+        assert set(results) == set(reference)
+        for name in StreamingIndicatorSet.INDICATOR_CLASSES:
+            assert_matches(results[name], reference[name])
+        assert_matches(results["summary"], reference["summary"])
+
+
+def test_streaming_from_short_history(candles):
+    prices, _, _ = candles
+    stream = StreamingRSI.from_history(prices[:5])
+    assert "error" in stream.result()
+    for price in prices[5:40]:
+        result = stream.update(float(price))
+    assert_matches(result, TechnicalIndicators.calculate_rsi(prices[:40]))
+    assert not math.isnan(stream.value)
+
+
+def test_missing_override_fails_on_instantiation():
+    class Incomplete(StreamingIndicator):
+        def seed(self, engine):
+            return self
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_running_sums_do_not_drift():
+    # Nhiều chu kỳ tính lại ở mức giá cỡ BTC: SMA/Bollinger vẫn khớp bản batch
+    rng = np.random.default_rng(11)
+    prices = 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, 3000)))
+    sma = StreamingSMA.from_history(prices[:20])
+    bands = StreamingBollingerBands.from_history(prices[:20])
+    for price in prices[20:]:
+        sma.update(float(price))
+        bands.update(float(price))
+    assert_matches(sma.result(), TechnicalIndicators.calculate_sma(prices))
+    assert_matches(bands.result(), TechnicalIndicators.calculate_bollinger_bands(prices))
+
+
+def test_running_sums_recover_after_nan():
+    prices = 100 + np.sin(np.arange(80))
+    prices[30] = np.nan
+    sma = StreamingSMA.from_history(prices[:25])
+    for i in range(25, 80):
+        result = sma.update(float(prices[i]))
+        if 30 <= i < 50:
+            assert math.isnan(sma.value)
+        elif i >= 50:
+            assert_matches(result, TechnicalIndicators.calculate_sma(prices[:i + 1]))
+
+
+def test_rolling_extreme_matches_window():
+    from tools.streaming_indicators import _RollingExtreme
+    rng = np.random.default_rng(5)
+    values = rng.integers(0, 20, 300).astype(float)
+    values[[40, 41, 200]] = np.nan
+    highest, lowest = _RollingExtreme(14, largest=True), _RollingExtreme(14, largest=False)
+    for i, value in enumerate(values):
+        highest.append(value)
+        lowest.append(value)
+        window = values[max(0, i - 13):i + 1].tolist()
+        assert highest.value == max(window) or (math.isnan(highest.value) and math.isnan(max(window)))
+        assert lowest.value == min(window) or (math.isnan(lowest.value) and math.isnan(min(window)))
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from tools.synthetic_data import random_walk_ohlcv
+from tools.timeframes import MIN_TIMEFRAME_CANDLES, candle_spacing, resample_ohlcv, timeframe_confluence
+
+
+def test_hourly_with_gap_at_start_is_not_treated_as_resampled():
+    data = random_walk_ohlcv(200, "1h")
+    # Thiếu nến thứ 2: khoảng cách hai nến đầu là 2h nhưng dữ liệu vẫn là nến 1h
+    gapped = data.drop(data.index[1])
+    assert candle_spacing(gapped.index) == pd.Timedelta(hours=1)
+    resampled = resample_ohlcv(gapped, "4h")
+    assert len(resampled) < len(gapped)
+    np.testing.assert_allclose(resampled["Close"].to_numpy(), gapped["Close"].resample("4h").last().dropna())
+
+
+def test_already_at_timeframe_is_returned_as_is():
+    data = random_walk_ohlcv(100, "1h")
+    gapped = data.drop(data.index[[1, 2]])
+    assert resample_ohlcv(gapped, "1h") is gapped
+    assert resample_ohlcv(gapped, "1h", base="1h") is gapped
+
+
+def test_base_interval_overrides_spacing():
+    data = random_walk_ohlcv(120, "15m")
+    assert resample_ohlcv(data, "15m", base="15m") is data
+    assert len(resample_ohlcv(data, "1h", base="15m")) == len(data["Close"].resample("1h").last().dropna())
+
+
+def test_short_timeframe_does_not_vote():
+    # Base 5m với period 30d: nến 1d chỉ có 30 nến, không đủ cho MACD
+    results = {
+        "5m": {"summary": {"valid_indicators": 6, "average_score": -1.0}, "candles": 8640},
+        "1h": {"summary": {"valid_indicators": 6, "average_score": -0.6}, "candles": 720},
+        "1d": {"summary": {"valid_indicators": 5, "average_score": 2.0}, "candles": 30},
+        "4h": {"error": "No candles for 4h"},
+    }
+    confluence = timeframe_confluence(results)
+    assert results["1d"]["insufficient"] is True
+    assert "insufficient" not in results["5m"]
+    assert confluence["excluded"] == ["1d", "4h"]
+    assert confluence["bearish"] == ["5m", "1h"] and confluence["bullish"] == []
+    assert confluence["average_score"] == -0.8
+    assert confluence["overall_signal"] == "BEARISH"
+    # Đủ MIN_TIMEFRAME_CANDLES nến thì được bỏ phiếu
+    results["1d"]["candles"] = MIN_TIMEFRAME_CANDLES
+    del results["1d"]["insufficient"]
+    assert timeframe_confluence(results)["bullish"] == ["1d"]
+
+
+def test_resampled_daily_from_five_minutes_is_insufficient():
+    data = random_walk_ohlcv(30 * 288, "5m")
+    daily = resample_ohlcv(data, "1d", base="5m")
+    assert len(daily) in (30, 31) and len(daily) < MIN_TIMEFRAME_CANDLES
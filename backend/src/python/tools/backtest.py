@@ -0,0 +1,137 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+from tools.indicator_engine import IndicatorEngine
+from tools.batch_indicators import (
+    SIGNALS, DEFAULT_INDICATORS, summarize_codes, _rsi_codes, _macd_codes, _bollinger_codes,
+    _moving_average_codes, _stochastic_codes, _volume_codes, _atr_codes, _adx_codes, _obv_codes,
+    _vwap_codes, _ichimoku_codes, _percent_change
+)
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    """Giá trị của nến trước (NaN cho nến đầu tiên)"""
+    shifted = np.empty_like(values)
+    shifted[..., 0] = np.nan
+    shifted[..., 1:] = values[..., :-1]
+    return shifted
+
+
+def signal_series(engine: IndicatorEngine, indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Tín hiệu của từng chỉ báo và phần tổng hợp có trọng số (`overall_signal`, `average_score`)
+    cho MỌI nến trong một lượt vector hóa. Giá trị tại nến i trùng với kết quả của
+    `calculate_multiple_indicators(prices[:i + 1], ...)`, thay cho việc gọi lại hàm đó cho từng nến (O(n²))
+    """
+    if indicators is None:
+        indicators = DEFAULT_INDICATORS + (['volume'] if engine.volume is not None else [])
+    indicators = [name.lower() for name in indicators]
+
+    close = engine.close
+    # Số nến đã có tại mỗi vị trí, dùng cho điều kiện "đủ dữ liệu" của từng chỉ báo
+    count = np.arange(1, len(close) + 1)
+    codes: Dict[str, np.ndarray] = {}
+
+    if 'rsi' in indicators:
+        codes['rsi'] = _rsi_codes(engine.rsi(14), count >= 15)
+    if 'macd' in indicators:
+        macd_line, signal_line, histogram = engine.macd(12, 26, 9)
+        prev_histogram = _shift(histogram)
+        prev_histogram[0] = 0
+        codes['macd'] = _macd_codes(macd_line, signal_line, histogram, prev_histogram, count >= 35)
+    if 'bollinger' in indicators:
+        upper, middle, lower = engine.bollinger(20, 2)
+        codes['bollinger'] = _bollinger_codes(close, upper, middle, lower, count >= 20)
+    for name, period, series in (('ema', 21, engine.ema), ('sma', 20, engine.sma)):
+        if name in indicators:
+            line = series(period)
+            slope = _percent_change(line, _shift(line))
+            slope[0] = 0
+            codes[name] = _moving_average_codes(close, line, slope, count >= period)
+    if 'stochastic' in indicators:
+        k_percent, d_percent = engine.stochastic(14, 3)
+        prev_k, prev_d = _shift(k_percent), _shift(d_percent)
+        prev_k[0], prev_d[0] = k_percent[0], d_percent[0]
+        codes['stochastic'] = _stochastic_codes(k_percent, d_percent, prev_k, prev_d, count >= 17)
+    if 'volume' in indicators and engine.volume is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = engine.volume / engine.volume_sma(20)
+        price_change = _percent_change(close, _shift(close))
+        price_change[0] = 0
+        codes['volume'] = _volume_codes(volume_ratio, price_change, count >= 20)
+
+    if 'atr' in indicators:
+        price_move = close - _shift(close)
+        codes['atr'] = _atr_codes(price_move, engine.atr(14), count >= 15)
+    if 'adx' in indicators:
+        plus_di, minus_di, adx = engine.dmi(14)
+        codes['adx'] = _adx_codes(adx, plus_di, minus_di, count >= 28)
+    if 'obv' in indicators and engine.volume is not None:
+        obv = engine.obv()
+        codes['obv'] = _obv_codes(obv, engine.obv_sma(20), obv - _shift(obv), count >= 21)
+    if 'vwap' in indicators and engine.volume is not None:
+        codes['vwap'] = _vwap_codes(close, engine.vwap(20), count >= 20)
+    if 'ichimoku' in indicators:
+        codes['ichimoku'] = _ichimoku_codes(close, *engine.ichimoku(9, 26, 52), count >= 78)
+
+    # Giống `summarize_signals`: MACD không được tính điểm trong phần tổng hợp
+    summary = summarize_codes({name: code for name, code in codes.items() if name != 'macd'})
+    return {
+        "signals": {name: SIGNALS[code] for name, code in codes.items()},
+        "overall_signal": summary.get("overall_signal"),
+        "average_score": summary.get("average_score")
+    }
+
+
+def positions_from_scores(average_score: np.ndarray, long_threshold: float = 0.5,
+                          short_threshold: float = -0.5, allow_short: bool = True) -> np.ndarray:
+    """Vị thế long (+1) / flat (0) / short (-1) theo điểm tổng hợp của từng nến"""
+    positions = np.where(average_score >= long_threshold, 1.0, 0.0)
+    if allow_short:
+        positions = np.where(average_score <= short_threshold, -1.0, positions)
+    return positions
+
+
+def backtest(prices, volumes=None, highs=None, lows=None, indicators: Optional[List[str]] = None,
+             fee_rate: float = 0.001, long_threshold: float = 0.5, short_threshold: float = -0.5,
+             allow_short: bool = True, periods_per_year: float = 365 * 24) -> Dict[str, Any]:
+    """
+    Backtest vector hóa cho tín hiệu tổng hợp: vị thế quyết định tại giá đóng cửa nến i được
+    giữ trong nến i+1 (không nhìn trước). Phí = fee_rate × |thay đổi vị thế|.
+    `periods_per_year` dùng để quy đổi Sharpe (mặc định cho nến 1h)
+    """
+    engine = IndicatorEngine(prices, volumes, highs, lows)
+    series = signal_series(engine, indicators)
+    close = engine.close
+    if len(close) < 2 or series["average_score"] is None:
+        return {"error": "Không đủ dữ liệu để backtest"}
+
+    positions = positions_from_scores(series["average_score"], long_threshold, short_threshold, allow_short)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bar_returns = close[1:] / close[:-1] - 1
+    held = positions[:-1]
+    turnover = np.abs(np.diff(positions, prepend=0.0))[:-1]
+    strategy_returns = held * bar_returns - fee_rate * turnover
+
+    equity = np.cumprod(1 + strategy_returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    in_market = held != 0
+    std = strategy_returns.std()
+
+    return {
+        "bars": int(len(close)),
+        "total_return": round(float(equity[-1] - 1) * 100, 2),
+        "buy_and_hold_return": round(float(close[-1] / close[0] - 1) * 100, 2),
+        "max_drawdown": round(float(drawdown.min()) * 100, 2),
+        "hit_rate": round(float(np.mean(strategy_returns[in_market] > 0)) * 100, 2) if in_market.any() else 0.0,
+        "sharpe": round(float(strategy_returns.mean() / std * np.sqrt(periods_per_year)), 2) if std > 0 else 0.0,
+        "exposure": round(float(in_market.mean()) * 100, 2),
+        "trades": int(np.count_nonzero(turnover)),
+        "fees_paid": round(float(fee_rate * turnover.sum()) * 100, 4),
+        "series": {
+            "positions": positions,
+            "strategy_returns": strategy_returns,
+            "equity": equity,
+            "average_score": series["average_score"],
+            "overall_signal": series["overall_signal"]
+        }
+    }
@@ -0,0 +1,264 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+from tools.indicator_engine import IndicatorEngine, as_float_array
+from tools.technical_indicators import TechnicalIndicators
+
+# Bảng mã tín hiệu dùng cho tính toán vector hóa; mã 0 = không đủ dữ liệu
+SIGNALS = np.array([None, 'STRONG_BULLISH', 'BULLISH', 'BUY', 'OVERSOLD', 'NEUTRAL',
+                    'BEARISH', 'SELL', 'STRONG_BEARISH', 'OVERBOUGHT'], dtype=object)
+_CODE = {signal: code for code, signal in enumerate(SIGNALS) if signal is not None}
+_SCORES = np.array([np.nan] + [TechnicalIndicators.SIGNAL_WEIGHTS[s] for s in SIGNALS[1:]])
+
+DEFAULT_INDICATORS = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic']
+
+
+def pad_histories(series: Sequence[Sequence[float]], length: Optional[int] = None) -> np.ndarray:
+    """
+    Ghép các lịch sử giá có độ dài khác nhau thành ma trận mã × thời gian,
+    căn theo nến cuối cùng và đệm NaN ở đầu
+    """
+    if length is None:
+        length = max((len(s) for s in series), default=0)
+    matrix = np.full((len(series), length), np.nan)
+    for row, values in enumerate(series):
+        values = as_float_array(values)[-length:] if len(values) else ()
+        if len(values):
+            matrix[row, length - len(values):] = values
+    return matrix
+
+
+def _select(conditions: List[np.ndarray], signals: List[str], default: str, valid: np.ndarray) -> np.ndarray:
+    codes = np.select(conditions, [_CODE[s] for s in signals], _CODE[default])
+    return np.where(valid, codes, 0)
+
+
+def _rsi_codes(rsi: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select([rsi >= 70, rsi <= 30], ['OVERBOUGHT', 'OVERSOLD'], 'NEUTRAL', valid)
+
+
+def _macd_codes(macd: np.ndarray, signal: np.ndarray, histogram: np.ndarray,
+                prev_histogram: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select(
+        [(macd > signal) & (prev_histogram <= 0) & (histogram > 0),
+         (macd < signal) & (prev_histogram >= 0) & (histogram < 0),
+         macd > signal],
+        ['BUY', 'SELL', 'BULLISH'], 'BEARISH', valid
+    )
+
+
+def _bollinger_codes(price: np.ndarray, upper: np.ndarray, middle: np.ndarray,
+                     lower: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select([price >= upper, price <= lower, price > middle],
+                   ['OVERBOUGHT', 'OVERSOLD', 'BULLISH'], 'BEARISH', valid)
+
+
+def _moving_average_codes(price: np.ndarray, value: np.ndarray, slope: np.ndarray,
+                          valid: np.ndarray) -> np.ndarray:
+    above = price > value
+    return _select([above & (slope > 0), above, slope < 0],
+                   ['STRONG_BULLISH', 'BULLISH', 'STRONG_BEARISH'], 'BEARISH', valid)
+
+
+def _stochastic_codes(k: np.ndarray, d: np.ndarray, prev_k: np.ndarray, prev_d: np.ndarray,
+                      valid: np.ndarray) -> np.ndarray:
+    return _select(
+        [(k >= 80) & (d >= 80), (k <= 20) & (d <= 20), (k > d) & (prev_k <= prev_d),
+         (k < d) & (prev_k >= prev_d), k > d],
+        ['OVERBOUGHT', 'OVERSOLD', 'BUY', 'SELL', 'BULLISH'], 'BEARISH', valid
+    )
+
+
+def _volume_codes(volume_ratio: np.ndarray, price_change: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    rising = price_change > 0
+    return _select(
+        [(volume_ratio > 1.5) & rising, volume_ratio > 1.5, (volume_ratio > 1.2) & rising, volume_ratio > 1.2],
+        ['STRONG_BULLISH', 'STRONG_BEARISH', 'BULLISH', 'BEARISH'], 'NEUTRAL', valid
+    )
+
+
+def _atr_codes(price_move: np.ndarray, atr: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select([price_move > atr, price_move < -atr], ['BULLISH', 'BEARISH'], 'NEUTRAL', valid)
+
+
+def _adx_codes(adx: np.ndarray, plus_di: np.ndarray, minus_di: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    rising = plus_di > minus_di
+    return _select([(adx >= 25) & rising, adx >= 25, (adx >= 20) & rising, adx >= 20],
+                   ['STRONG_BULLISH', 'STRONG_BEARISH', 'BULLISH', 'BEARISH'], 'NEUTRAL', valid)
+
+
+def _obv_codes(obv: np.ndarray, obv_sma: np.ndarray, obv_change: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select([(obv > obv_sma) & (obv_change > 0), (obv < obv_sma) & (obv_change < 0)],
+                   ['BULLISH', 'BEARISH'], 'NEUTRAL', valid)
+
+
+def _vwap_codes(price: np.ndarray, vwap: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return _select([price > vwap], ['BULLISH'], 'BEARISH', valid)
+
+
+def _ichimoku_codes(price: np.ndarray, tenkan: np.ndarray, kijun: np.ndarray, span_a: np.ndarray,
+                    span_b: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    cloud_top, cloud_bottom = np.maximum(span_a, span_b), np.minimum(span_a, span_b)
+    return _select(
+        [(price > cloud_top) & (tenkan > kijun), price > cloud_top,
+         (price < cloud_bottom) & (tenkan < kijun), price < cloud_bottom],
+        ['STRONG_BULLISH', 'BULLISH', 'STRONG_BEARISH', 'BEARISH'], 'NEUTRAL', valid
+    )
+
+
+def _percent_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (current - previous) / previous * 100
+
+
+def summarize_codes(codes: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Phiên bản vector hóa của `TechnicalIndicators.summarize_signals` cho nhiều mã cùng lúc
+    """
+    if not codes:
+        return {}
+    scores = _SCORES[np.stack(list(codes.values()))]
+    valid_indicators = np.sum(~np.isnan(scores), axis=0)
+    total_score = np.nansum(scores, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_score = np.where(valid_indicators > 0, total_score / valid_indicators, 0.0)
+    overall = np.select(
+        [valid_indicators == 0, average_score >= 1.5, average_score >= 0.5,
+         average_score <= -1.5, average_score <= -0.5],
+        ['UNKNOWN', 'STRONG_BULLISH', 'BULLISH', 'STRONG_BEARISH', 'BEARISH'], 'NEUTRAL'
+    ).astype(object)
+    return {
+        "overall_signal": overall,
+        "average_score": average_score,
+        "total_score": total_score,
+        "valid_indicators": valid_indicators,
+        "confidence": np.minimum(100, np.abs(average_score) * 30)
+    }
+
+
+def calculate_batch_indicators(closes, volumes=None, highs=None, lows=None,
+                               indicators: Optional[List[str]] = None,
+                               symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Tính các chỉ báo mặc định cho nhiều mã cùng lúc trên ma trận mã × thời gian.
+    Lịch sử ngắn hơn được đệm NaN ở đầu (xem `pad_histories`); mọi phép tính chạy theo trục thời gian.
+    Trả về giá trị mới nhất, tín hiệu của từng chỉ báo và phần tổng hợp cho từng mã
+    """
+    engine = IndicatorEngine(np.atleast_2d(as_float_array(closes)),
+                             None if volumes is None else np.atleast_2d(as_float_array(volumes)),
+                             None if highs is None else np.atleast_2d(as_float_array(highs)),
+                             None if lows is None else np.atleast_2d(as_float_array(lows)))
+    if indicators is None:
+        indicators = DEFAULT_INDICATORS + (['volume'] if engine.volume is not None else [])
+    indicators = [name.lower() for name in indicators]
+
+    close = engine.close
+    n_valid = np.sum(~np.isnan(close), axis=1)
+    price = close[:, -1]
+    prev = lambda values: values[:, -2] if values.shape[1] > 1 else np.full(len(values), np.nan)
+
+    values: Dict[str, Dict[str, np.ndarray]] = {}
+    codes: Dict[str, np.ndarray] = {}
+
+    if 'rsi' in indicators:
+        rsi = engine.rsi(14)[:, -1]
+        values['rsi'] = {"value": rsi}
+        codes['rsi'] = _rsi_codes(rsi, n_valid >= 15)
+
+    if 'macd' in indicators:
+        macd_line, signal_line, histogram = engine.macd(12, 26, 9)
+        values['macd'] = {"macd": macd_line[:, -1], "signal": signal_line[:, -1], "histogram": histogram[:, -1]}
+        codes['macd'] = _macd_codes(macd_line[:, -1], signal_line[:, -1], histogram[:, -1],
+                                    prev(histogram), n_valid >= 35)
+
+    if 'bollinger' in indicators:
+        upper, middle, lower = engine.bollinger(20, 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            band_position = (price - lower[:, -1]) / (upper[:, -1] - lower[:, -1])
+            bandwidth = (upper[:, -1] - lower[:, -1]) / middle[:, -1] * 100
+        values['bollinger'] = {"upper_band": upper[:, -1], "middle_band": middle[:, -1],
+                               "lower_band": lower[:, -1], "bandwidth": bandwidth,
+                               "band_position": band_position}
+        codes['bollinger'] = _bollinger_codes(price, upper[:, -1], middle[:, -1], lower[:, -1], n_valid >= 20)
+
+    for name, period, series in (('ema', 21, engine.ema), ('sma', 20, engine.sma)):
+        if name in indicators:
+            line = series(period)
+            slope = _percent_change(line[:, -1], prev(line))
+            values[name] = {f"{name}_value": line[:, -1], f"{name}_slope": slope}
+            codes[name] = _moving_average_codes(price, line[:, -1], slope, n_valid >= period)
+
+    if 'stochastic' in indicators:
+        k_percent, d_percent = engine.stochastic(14, 3)
+        values['stochastic'] = {"k_percent": k_percent[:, -1], "d_percent": d_percent[:, -1]}
+        codes['stochastic'] = _stochastic_codes(k_percent[:, -1], d_percent[:, -1],
+                                                prev(k_percent), prev(d_percent), n_valid >= 17)
+
+    if 'volume' in indicators and engine.volume is not None:
+        volume = engine.volume
+        sma_volume = engine.volume_sma(20)[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = volume[:, -1] / sma_volume
+        price_change = _percent_change(price, prev(close))
+        values['volume'] = {"sma_volume": sma_volume, "volume_ratio": volume_ratio,
+                            "volume_roc": _percent_change(volume[:, -1], prev(volume))}
+        codes['volume'] = _volume_codes(volume_ratio, price_change, np.sum(~np.isnan(volume), axis=1) >= 20)
+
+    if 'atr' in indicators:
+        atr = engine.atr(14)[:, -1]
+        values['atr'] = {"atr_value": atr, "atr_percent": atr / price * 100}
+        codes['atr'] = _atr_codes(price - prev(close), atr, n_valid >= 15)
+
+    if 'adx' in indicators:
+        plus_di, minus_di, adx = (line[:, -1] for line in engine.dmi(14))
+        values['adx'] = {"adx": adx, "plus_di": plus_di, "minus_di": minus_di}
+        codes['adx'] = _adx_codes(adx, plus_di, minus_di, n_valid >= 28)
+
+    if engine.volume is not None:
+        n_volume = np.sum(~np.isnan(engine.volume), axis=1)
+        if 'obv' in indicators:
+            obv = engine.obv()
+            obv_sma = engine.obv_sma(20)[:, -1]
+            values['obv'] = {"obv": obv[:, -1], "obv_sma": obv_sma}
+            codes['obv'] = _obv_codes(obv[:, -1], obv_sma, obv[:, -1] - prev(obv), n_volume >= 21)
+        if 'vwap' in indicators:
+            vwap = engine.vwap(20)[:, -1]
+            values['vwap'] = {"vwap": vwap, "distance_percent": _percent_change(price, vwap)}
+            codes['vwap'] = _vwap_codes(price, vwap, n_volume >= 20)
+
+    if 'ichimoku' in indicators:
+        tenkan, kijun, span_a, span_b = (line[:, -1] for line in engine.ichimoku(9, 26, 52))
+        values['ichimoku'] = {"tenkan_sen": tenkan, "kijun_sen": kijun,
+                              "senkou_span_a": span_a, "senkou_span_b": span_b}
+        codes['ichimoku'] = _ichimoku_codes(price, tenkan, kijun, span_a, span_b, n_valid >= 78)
+
+    return {
+        "symbols": list(symbols) if symbols is not None else list(range(len(close))),
+        "current_price": price,
+        "values": values,
+        "signals": {name: SIGNALS[code] for name, code in codes.items()},
+        # Giống `summarize_signals`: key `signal` của MACD là giá trị đường signal nên MACD không được tính điểm
+        "summary": summarize_codes({name: code for name, code in codes.items() if name != 'macd'})
+    }
+
+
+def screen(closes, volumes=None, highs=None, lows=None, symbols: Optional[List[str]] = None,
+           indicators: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Sàng lọc toàn thị trường: trả về danh sách mã xếp theo điểm trung bình giảm dần
+    """
+    batch = calculate_batch_indicators(closes, volumes, highs, lows, indicators, symbols)
+    summary = batch["summary"]
+    if not summary:
+        return []
+    order = np.argsort(-summary["average_score"], kind='stable')
+    return [
+        {
+            "symbol": batch["symbols"][i],
+            "current_price": round(float(batch["current_price"][i]), 2),
+            "overall_signal": summary["overall_signal"][i],
+            "average_score": round(float(summary["average_score"][i]), 2),
+            "valid_indicators": int(summary["valid_indicators"][i]),
+            "signals": {name: signals[i] for name, signals in batch["signals"].items()}
+        }
+        for i in order
+    ]
@@ -0,0 +1,116 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+# Các key chứa chuỗi theo từng nến / từng ngày
+HISTORY_KEYS = ("history", "predictions")
+
+# Văn bản cho người đọc, lặp lại điều các trường tín hiệu đã nói
+VERBOSE_KEYS = ("message", "recommendation", "disclaimer", "signal_details")
+
+# Các key cấp cao nhất bị bỏ sau cùng khi kết quả phải vừa `max_chars`
+PROTECTED_KEYS = ("error", "symbol", "summary", "confluence", "current_price")
+
+HISTORY_MODES = ("full", "numeric", "none")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _numeric_history(value: Any) -> Any:
+    """Chỉ giữ số: list các record thành một list cho mỗi cột số, văn bản bị bỏ"""
+    if isinstance(value, dict):
+        return {k: v for k, v in ((k, _numeric_history(v)) for k, v in value.items()) if v is not None}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = [k for k in value[0] if all(_is_number(item.get(k)) for item in value)]
+            return {k: [item[k] for item in value] for k in columns}
+        numbers = [item for item in value if _is_number(item)]
+        return numbers if len(numbers) == len(value) else None
+    return value if _is_number(value) else None
+
+
+def _strip(value: Any, history: str) -> Any:
+    if isinstance(value, dict):
+        stripped = {}
+        for key, item in value.items():
+            if key in VERBOSE_KEYS:
+                continue
+            if key in HISTORY_KEYS:
+                if history == "none":
+                    continue
+                if history == "numeric":
+                    item = _numeric_history(item)
+                    if item is None:
+                        continue
+                    stripped[key] = item
+                    continue
+            stripped[key] = _strip(item, history)
+        return stripped
+    if isinstance(value, list):
+        return [_strip(item, history) for item in value]
+    return value
+
+
+def compact_result(result: Dict[str, Any], fields: Optional[Sequence[str]] = None,
+                   history: str = "numeric") -> Dict[str, Any]:
+    """
+    Dạng kết quả tool dành cho agent:
+    - `fields` chỉ giữ các key cấp cao nhất này (key "error" luôn được giữ)
+    - bỏ văn bản message/recommendation/disclaimer và signal_details của từng chỉ báo
+    - history="numeric" chuyển lịch sử thành list số thuần (record thành cột),
+      "none" bỏ lịch sử, "full" giữ nguyên
+    """
+    if history not in HISTORY_MODES:
+        raise ValueError(f"Unsupported history mode: {history} (expected one of {HISTORY_MODES})")
+    if fields:
+        result = {k: v for k, v in result.items() if k in fields or k == "error"}
+    return _strip(result, history)
+
+
+def dumps_compact(result: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+    """
+    JSON rút gọn. Có `max_chars` thì bỏ lịch sử trước, sau đó bỏ các key cấp cao nhất từ key cuối
+    ngược lên (PROTECTED_KEYS sau cùng); các key bị bỏ được liệt kê trong "truncated".
+    """
+    text = _dumps(result)
+    if not max_chars or len(text) <= max_chars:
+        return text
+
+    result = _strip(result, "none")
+    dropped: List[str] = []
+    order = [k for k in reversed(list(result)) if k not in PROTECTED_KEYS] + \
+            [k for k in reversed(PROTECTED_KEYS) if k in result]
+    for key in [None] + order:
+        if key is not None:
+            result = {k: v for k, v in result.items() if k != key}
+            dropped.append(key)
+        text = _dumps({**result, "truncated": dropped} if dropped else result)
+        if len(text) <= max_chars:
+            return text
+    return _dumps({"error": f"Result does not fit in {max_chars} characters"})
+
+
+def _dumps(result: Any) -> str:
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Ước lượng số token LLM: khoảng 4 byte UTF-8 mỗi token. Dấu tiếng Việt chiếm 2-3 byte mỗi
+    ký tự, khớp với cách tokenizer subword tách chúng hơn là đếm ký tự.
+    """
+    return max(1, round(len(text.encode("utf-8")) / 4)) if text else 0
+
+
+def output_savings(full: str, compact: str) -> Dict[str, Any]:
+    """Kích thước bản full và bản compact của cùng một lần gọi, và số token tiết kiệm được"""
+    full_tokens, compact_tokens = estimate_tokens(full), estimate_tokens(compact)
+    return {
+        "full_chars": len(full),
+        "compact_chars": len(compact),
+        "full_tokens": full_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": full_tokens - compact_tokens,
+        "saved_pct": round((full_tokens - compact_tokens) / full_tokens * 100, 1) if full_tokens else 0.0
+    }
@@ -0,0 +1,272 @@
+import os
+import copy
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from tools.indicator_engine import IndicatorEngine
+from tools.technical_indicators import TechnicalIndicators
+
+# Số nến đầu dùng để tìm các chuỗi có cùng phần đầu (ứng viên trùng tiền tố)
+HEAD_LENGTH = 64
+
+# Dọn tầng đĩa xuống tỉ lệ này của ngân sách để không phải quét thư mục ở mỗi lần ghi
+DISK_SWEEP_TARGET = 0.9
+
+
+def _hash_arrays(*arrays: Optional[np.ndarray]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        if array is None:
+            digest.update(b'\x00')
+        else:
+            digest.update(str(array.shape).encode())
+            digest.update(memoryview(np.ascontiguousarray(array)).cast('B'))
+    return digest.hexdigest()
+
+
+class _Entry:
+    __slots__ = ('engine', 'results', 'nbytes')
+
+    def __init__(self, engine: IndicatorEngine):
+        self.engine = engine
+        self.results: Dict[Tuple, Dict[str, Any]] = {}
+        self.nbytes = 0
+
+
+class IndicatorCache:
+    """
+    Cache memo theo nội dung đặt trước TechnicalIndicators.
+    Key = hash nhanh (BLAKE2b) của các mảng đầu vào + tham số chỉ báo.
+    - LRU trong bộ nhớ với ngân sách byte cấu hình được (mảng đầu vào + chuỗi trung gian)
+    - Chuỗi là tiền tố của một chuỗi đã cache được phục vụ bằng cách cắt các chuỗi đã tính
+    - Tầng đĩa tùy chọn lưu kết quả JSON theo key, giới hạn `disk_max_bytes`: vượt ngân sách thì
+      xóa các file cũ nhất (theo mtime, lần đọc trúng cập nhật mtime) đến khi còn DISK_SWEEP_TARGET
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_bytes = 0
+        self.disk_evictions = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._heads: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.prefix_hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_evictions": self.disk_evictions
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._heads.clear()
+            self._bytes = 0
+
+    def calculate_multiple_indicators(self, prices, volumes=None, highs=None, lows=None,
+                                      indicators: Optional[List[str]] = None,
+                                      obv_offset: float = 0.0) -> Dict[str, Any]:
+        """
+        Cùng chữ ký và kết quả với `TechnicalIndicators.calculate_multiple_indicators`;
+        `obv_offset` cho dữ liệu là cửa sổ đuôi của một lịch sử dài hơn (xem IndicatorEngine.from_tail)
+        """
+        engine = IndicatorEngine(prices, volumes, highs, lows, obv_offset=obv_offset)
+        data_key = self._offset_key(_hash_arrays(engine.close, engine.volume, engine.high, engine.low), engine)
+        params = tuple(name.lower() for name in indicators) if indicators is not None else None
+        result_key = (data_key, params)
+
+        with self._lock:
+            entry = self._entries.get(data_key)
+            if entry is not None:
+                self._entries.move_to_end(data_key)
+                if params in entry.results:
+                    self.hits += 1
+                    return copy.deepcopy(entry.results[params])
+                engine = entry.engine
+            else:
+                cached = self._find_prefix(engine)
+                if cached is not None:
+                    # Chỉ còn bước định dạng kết quả trên các chuỗi đã cắt
+                    self.prefix_hits += 1
+                    return TechnicalIndicators.calculate_from_engine(cached.truncated(len(engine)), indicators)
+
+            if entry is None:
+                result = self._read_disk(result_key)
+                if result is not None:
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+
+        # Tính ngoài lock; engine của entry có sẵn vẫn dùng lại các chuỗi trung gian
+        result = TechnicalIndicators.calculate_from_engine(engine, indicators)
+        self._write_disk(result_key, result)
+        with self._lock:
+            return copy.deepcopy(self._store(data_key, engine, params, result))
+
+    def _find_prefix(self, engine: IndicatorEngine) -> Optional[IndicatorEngine]:
+        """Tìm engine đã cache mà chuỗi yêu cầu là tiền tố của nó"""
+        length = len(engine)
+        for key in self._heads.get(self._head_key(engine), ()):
+            cached = self._entries[key].engine
+            if len(cached) < length:
+                continue
+            if all(
+                (a is None and b is None) or
+                (a is not None and b is not None and np.array_equal(a[:length], b, equal_nan=True))
+                for a, b in ((cached.close, engine.close), (cached.volume, engine.volume),
+                             (cached.high, engine.high), (cached.low, engine.low))
+            ):
+                self._entries.move_to_end(key)
+                return cached
+        return None
+
+    @staticmethod
+    def _head_key(engine: IndicatorEngine) -> str:
+        head = engine.close[:HEAD_LENGTH]
+        return IndicatorCache._offset_key(
+            _hash_arrays(head, None if engine.volume is None else engine.volume[:HEAD_LENGTH]), engine)
+
+    @staticmethod
+    def _offset_key(key: str, engine: IndicatorEngine) -> str:
+        # Cùng dữ liệu nhưng khác obv_offset cho OBV khác nhau; tiền tố chỉ khớp khi cùng offset
+        return f"{key}:{engine.obv_offset!r}" if engine.obv_offset else key
+
+    def _store(self, data_key: str, engine: IndicatorEngine, params, result: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self._entries.get(data_key)
+        if entry is None:
+            entry = _Entry(engine)
+            self._entries[data_key] = entry
+            self._heads.setdefault(self._head_key(engine), set()).add(data_key)
+        entry.results[params] = result
+        self._bytes -= entry.nbytes
+        entry.nbytes = entry.engine.nbytes + 2048 * len(entry.results)
+        self._bytes += entry.nbytes
+        self._evict()
+        return result
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self.evictions += 1
+            head_key = self._head_key(entry.engine)
+            self._heads.get(head_key, set()).discard(key)
+
+    def _disk_path(self, result_key) -> Optional[Path]:
+        if not self.disk_dir:
+            return None
+        digest = hashlib.blake2b(repr(result_key).encode(), digest_size=16).hexdigest()
+        return self.disk_dir / f"{digest}.json"
+
+    def _read_disk(self, result_key) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(result_key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Lần đọc trúng làm mới mtime: file hay dùng bị xóa sau cùng
+            os.utime(path)
+            return result
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, result_key, result: Dict[str, Any]) -> None:
+        path = self._disk_path(result_key)
+        if path is None:
+            return
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            size = tmp_path.stat().st_size
+            # Ghi đè key đã có: chỉ cộng phần chênh lệch
+            replaced = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            return
+        with self._lock:
+            self._disk_bytes += size - replaced
+            over_budget = self.disk_max_bytes > 0 and self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._sweep_disk()
+
+    def _disk_files(self) -> List[Tuple[int, int, Path]]:
+        """(mtime_ns, size, path) của các file kết quả trên đĩa"""
+        files = []
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def _sweep_disk(self) -> None:
+        """Xóa file cũ nhất đến khi tầng đĩa về DISK_SWEEP_TARGET của ngân sách; tổng tính lại từ thư mục
+        (process khác có thể ghi cùng thư mục)"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * DISK_SWEEP_TARGET
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+
+
+_default_cache: Optional[IndicatorCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> IndicatorCache:
+    """
+    Cache dùng chung cho các tool; cấu hình qua INDICATOR_CACHE_MAX_BYTES, INDICATOR_CACHE_DIR và
+    INDICATOR_CACHE_DISK_MAX_BYTES (ngân sách tầng đĩa, mặc định 512 MB, 0 = không giới hạn)
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = IndicatorCache(
+                max_bytes=int(os.environ.get("INDICATOR_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                disk_dir=os.environ.get("INDICATOR_CACHE_DIR") or None,
+                disk_max_bytes=int(os.environ.get("INDICATOR_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+            )
+        return _default_cache
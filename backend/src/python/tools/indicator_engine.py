@@ -0,0 +1,407 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+# Số nến cuối dùng ở chế độ tiết kiệm bộ nhớ (low_memory). Các chỉ báo cửa sổ trượt (SMA, Bollinger,
+# Stochastic, ATR, Ichimoku, VWAP trượt `period` nến) chỉ cần tối đa vài chục nến; với EMA/RSI/ADX
+# (đệ quy) trọng số của nến nằm ngoài cửa sổ nhỏ hơn (1 - 1/14)^2000 ≈ 1e-64, nên kết quả trên cửa sổ
+# trùng với kết quả trên toàn bộ lịch sử ở mọi chữ số được làm tròn. Riêng OBV là tổng tích lũy từ
+# nến đầu tiên: engine được gán `obv_offset` (OBV của phần lịch sử bị cắt, xem `obv_offset`) để mức
+# OBV tuyệt đối cũng trùng với bản toàn bộ lịch sử
+LOW_MEMORY_WINDOW = 2048
+
+
+def as_float_array(values: Optional[ArrayLike], dtype=np.float64) -> Optional[np.ndarray]:
+    """
+    Chuyển dữ liệu đầu vào sang mảng float liên tục (không sao chép nếu đã đúng kiểu)
+    """
+    if values is None:
+        return None
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def _frame(values: np.ndarray):
+    """
+    Bọc mảng 1-D thành Series, mảng 2-D (mã × thời gian) thành DataFrame theo cột thời gian
+    """
+    if values.ndim == 2:
+        return pd.DataFrame(values.T, copy=False)
+    return pd.Series(values, copy=False)
+
+
+def _unframe(values: np.ndarray, result) -> np.ndarray:
+    out = result.to_numpy()
+    return out.T if values.ndim == 2 else out
+
+
+def ewm_mean(values: np.ndarray, span: Optional[float] = None, alpha: Optional[float] = None,
+             min_periods: int = 0) -> np.ndarray:
+    """
+    EWM (adjust=True) giống hệt pandas, dùng kernel Cython của pandas trên mảng NumPy.
+    Mảng 2-D được tính theo trục cuối (thời gian)
+    """
+    frame = _frame(values)
+    return _unframe(values, frame.ewm(span=span, alpha=alpha, min_periods=min_periods).mean())
+
+
+def rolling(values: np.ndarray, window: int, how: str) -> np.ndarray:
+    """
+    Cửa sổ trượt (mean, std, min, max) trên mảng NumPy, kết quả khớp với pandas.rolling.
+    Mảng 2-D được tính theo trục cuối (thời gian)
+    """
+    roller = _frame(values).rolling(window=window)
+    return _unframe(values, getattr(roller, how)())
+
+
+def widen_extreme(extreme: np.ndarray, window: int, target: int, ufunc) -> np.ndarray:
+    """
+    Max/min trượt cho cửa sổ `target` từ max/min trượt đã có của cửa sổ `window` (window <= target):
+    ghép các cửa sổ dời 0, window, 2·window, ..., target - window nến. Chính xác (không cộng dồn sai số)
+    và chỉ tốn vài phép so sánh từng phần tử thay vì một lần rolling mới
+    """
+    out = extreme.copy()
+    for offset in sorted(set(range(window, target - window, window)) | {target - window}):
+        if offset <= 0:
+            continue
+        shifted = np.full_like(extreme, np.nan)
+        shifted[..., offset:] = extreme[..., :-offset]
+        ufunc(out, shifted, out=out)
+    return out
+
+
+def rolling_mean_stack(values: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    """
+    Trung bình trượt cho nhiều cửa sổ bằng một lần cumsum; kết quả có dạng (số cửa sổ, n).
+    Dữ liệu được trừ giá trị đầu tiên trước khi cộng dồn để hạn chế sai số làm tròn
+    """
+    values = as_float_array(values)
+    offset = values[0] if len(values) else 0.0
+    cumulative = np.concatenate(([0.0], np.cumsum(values - offset)))
+    out = np.full((len(windows), len(values)), np.nan)
+    for row, window in enumerate(windows):
+        if window <= len(values):
+            out[row, window - 1:] = (cumulative[window:] - cumulative[:-window]) / window + offset
+    return out
+
+
+def tail(values: np.ndarray, decimals: int, count: int = 10) -> List[float]:
+    """
+    Tương đương `series.dropna().round(decimals).tolist()[-count:]` nhưng chỉ xử lý phần đuôi
+    """
+    last = values[-count:]
+    if np.isnan(last).any():
+        last = values[~np.isnan(values)][-count:]
+    return np.round(last, decimals).tolist()
+
+
+def obv_offset(prices: ArrayLike, volumes: ArrayLike, start: int, chunk: int = LOW_MEMORY_WINDOW) -> float:
+    """
+    OBV tại nến `start` của lịch sử đầy đủ, tức phần OBV tích lũy trước một cửa sổ đuôi bắt đầu ở `start`.
+    Cộng lần lượt từng khối `chunk` nến nên bộ nhớ không phụ thuộc độ dài lịch sử; thứ tự cộng giống
+    `np.cumsum` trên toàn bộ lịch sử nên kết quả trùng từng bit
+    """
+    total = np.zeros(1)
+    for begin in range(1, start + 1, chunk):
+        end = min(begin + chunk, start + 1)
+        close = np.asarray(prices[begin - 1:end], dtype=np.float64)
+        volume = np.asarray(volumes[begin:end], dtype=np.float64)
+        flow = np.nan_to_num(np.sign(close[1:] - close[:-1]) * volume)
+        total = np.cumsum(np.concatenate((total, flow)))[-1:]
+    return float(total[0])
+
+
+class IndicatorEngine:
+    """
+    Bộ tính chỉ báo hợp nhất: chuyển giá, khối lượng, high, low sang mảng float64 một lần
+    và dùng chung các kết quả trung gian (diff, EMA, rolling mean/std) giữa các chỉ báo.
+    Chấp nhận mảng 1-D (một mã) hoặc ma trận mã × thời gian có NaN đệm ở đầu
+    cho các lịch sử ngắn hơn.
+
+    dtype=np.float32 giảm một nửa bộ nhớ của đầu vào và mọi chuỗi đã lưu (pandas vẫn tính
+    từng chuỗi bằng float64 rồi mới ép kiểu), đổi lại chỉ còn ~7 chữ số có nghĩa:
+    giá 60000.12 chỉ chính xác đến ~0.004, nên chữ số làm tròn cuối có thể lệch so với float64
+    """
+
+    def __init__(self, prices: ArrayLike, volumes: Optional[ArrayLike] = None,
+                 highs: Optional[ArrayLike] = None, lows: Optional[ArrayLike] = None,
+                 dtype=np.float64, obv_offset: float = 0.0):
+        self.dtype = np.dtype(dtype)
+        # OBV của phần lịch sử trước nến đầu tiên (engine trên cửa sổ đuôi, xem from_tail)
+        self.obv_offset = obv_offset
+        self.close = as_float_array(prices, self.dtype)
+        self.volume = as_float_array(volumes, self.dtype) if volumes is not None and len(volumes) else None
+        self.high = as_float_array(highs, self.dtype) if highs is not None and len(highs) else self.close
+        self.low = as_float_array(lows, self.dtype) if lows is not None and len(lows) else self.close
+        self._cache: Dict[tuple, object] = {}
+
+    @classmethod
+    def from_tail(cls, prices: ArrayLike, volumes: Optional[ArrayLike] = None,
+                  highs: Optional[ArrayLike] = None, lows: Optional[ArrayLike] = None,
+                  window: int = LOW_MEMORY_WINDOW, dtype=np.float64) -> "IndicatorEngine":
+        """
+        Engine chỉ trên `window` nến cuối: chỉ phần đuôi được chuyển kiểu/sao chép, nên bộ nhớ
+        không phụ thuộc độ dài lịch sử. Đủ cho các kết quả "giá trị hiện tại + 10 giá trị cuối"
+        (xem LOW_MEMORY_WINDOW), không dùng cho chế độ toàn bộ lịch sử. OBV được nối tiếp từ phần
+        lịch sử bị cắt (obv_offset)
+        """
+        def cut(values):
+            return values[-window:] if values is not None and len(values) > window else values
+        start = len(prices) - window
+        offset = obv_offset(prices, volumes, start) if volumes is not None and len(volumes) and start > 0 else 0.0
+        return cls(cut(prices), cut(volumes), cut(highs), cut(lows), dtype=dtype, obv_offset=offset)
+
+    def __len__(self) -> int:
+        return self.close.shape[-1]
+
+    @property
+    def nbytes(self) -> int:
+        """Tổng số byte của dữ liệu đầu vào và các chuỗi trung gian đã lưu"""
+        arrays = [self.close, self.volume, self.high, self.low]
+        for value in self._cache.values():
+            arrays.extend(value if isinstance(value, tuple) else (value,))
+        seen = set()
+        total = 0
+        for array in arrays:
+            if array is not None and id(array) not in seen:
+                seen.add(id(array))
+                total += array.nbytes
+        return total
+
+    def truncated(self, length: int) -> "IndicatorEngine":
+        """
+        Engine cho `length` nến đầu tiên. Mọi chỉ báo tại nến i chỉ phụ thuộc dữ liệu đến i,
+        nên các chuỗi đã tính được cắt (view, không sao chép) thay vì tính lại
+        """
+        engine = IndicatorEngine.__new__(IndicatorEngine)
+        engine.dtype = self.dtype
+        engine.obv_offset = self.obv_offset
+        engine.close = self.close[..., :length]
+        engine.volume = self.volume[..., :length] if self.volume is not None else None
+        engine.high = self.high[..., :length]
+        engine.low = self.low[..., :length]
+        engine._cache = {
+            key: tuple(v[..., :length] for v in value) if isinstance(value, tuple) else value[..., :length]
+            for key, value in self._cache.items()
+        }
+        return engine
+
+    def _memo(self, key: tuple, compute):
+        if key not in self._cache:
+            value = compute()
+            # Không sao chép với float64; với float32 chỉ giữ lại bản đã ép kiểu
+            if isinstance(value, tuple):
+                value = tuple(v.astype(self.dtype, copy=False) for v in value)
+            else:
+                value = value.astype(self.dtype, copy=False)
+            self._cache[key] = value
+        return self._cache[key]
+
+    def diff(self) -> np.ndarray:
+        def compute():
+            delta = np.empty_like(self.close)
+            delta[..., 0] = np.nan
+            np.subtract(self.close[..., 1:], self.close[..., :-1], out=delta[..., 1:])
+            return delta
+        return self._memo(('diff',), compute)
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._memo(('ema', span), lambda: ewm_mean(self.close, span=span))
+
+    def sma(self, period: int) -> np.ndarray:
+        return self._memo(('sma', period), lambda: rolling(self.close, period, 'mean'))
+
+    def prefill_sma(self, periods: Sequence[int]) -> None:
+        """Tính trước SMA cho nhiều chu kỳ bằng một lần cumsum (dùng cho quét tham số)"""
+        missing = sorted({p for p in periods if ('sma', p) not in self._cache})
+        if missing and self.close.ndim == 1:
+            for period, line in zip(missing, rolling_mean_stack(self.close, missing)):
+                self._cache[('sma', period)] = line.astype(self.dtype, copy=False)
+
+    def rolling_std(self, period: int) -> np.ndarray:
+        return self._memo(('std', period), lambda: rolling(self.close, period, 'std'))
+
+    def volume_sma(self, period: int) -> np.ndarray:
+        return self._memo(('volume_sma', period), lambda: rolling(self.volume, period, 'mean'))
+
+    @staticmethod
+    def gains(delta: np.ndarray) -> np.ndarray:
+        # Giá trị diff đầu tiên (NaN) được coi là 0 như `Series.where`
+        return np.where(delta > 0, delta, 0.0)
+
+    @staticmethod
+    def losses(delta: np.ndarray) -> np.ndarray:
+        return np.where(delta < 0, -delta, 0.0)
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        def compute():
+            delta = self.diff()
+            gain, loss = self.gains(delta), self.losses(delta)
+            if self.close.ndim == 2:
+                # Phần NaN đệm không được tính là quan sát của EWM
+                padding = np.isnan(self.close)
+                gain[padding] = np.nan
+                loss[padding] = np.nan
+            avg_gain = ewm_mean(gain, alpha=1 / period, min_periods=period)
+            avg_loss = ewm_mean(loss, alpha=1 / period, min_periods=period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = avg_gain / avg_loss
+                return 100 - (100 / (1 + rs))
+        return self._memo(('rsi', period), compute)
+
+    def macd(self, fast_period: int = 12, slow_period: int = 26,
+             signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        def compute():
+            macd_line = self.ema(fast_period) - self.ema(slow_period)
+            signal_line = ewm_mean(macd_line, span=signal_period)
+            return macd_line, signal_line, macd_line - signal_line
+        return self._memo(('macd', fast_period, slow_period, signal_period), compute)
+
+    def bollinger(self, period: int = 20,
+                  std_dev: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        def compute():
+            middle = self.sma(period)
+            std = self.rolling_std(period)
+            return middle + std * std_dev, middle, middle - std * std_dev
+        return self._memo(('bollinger', period, std_dev), compute)
+
+    def stochastic(self, k_period: int = 14, d_period: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        def compute():
+            lowest_low = rolling(self.low, k_period, 'min')
+            highest_high = rolling(self.high, k_period, 'max')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                k_percent = (self.close - lowest_low) / (highest_high - lowest_low) * 100
+            d_percent = rolling(k_percent, d_period, 'mean')
+            return k_percent, d_percent
+        return self._memo(('stochastic', k_period, d_period), compute)
+
+    def _previous(self, values: np.ndarray) -> np.ndarray:
+        """Giá trị của nến trước; nến đầu tiên dùng chính nó"""
+        previous = np.empty_like(values)
+        previous[..., 0] = values[..., 0]
+        previous[..., 1:] = values[..., :-1]
+        return previous
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            prev_close = self._previous(self.close)
+            # fmax bỏ qua NaN: nến đầu tiên sau phần đệm NaN (mảng 2-D) vẫn có TR = High - Low
+            return np.fmax.reduce([self.high - self.low, np.abs(self.high - prev_close),
+                                   np.abs(self.low - prev_close)])
+        return self._memo(('true_range',), compute)
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        # Làm trơn Wilder (alpha = 1/period) giống RSI
+        return self._memo(('atr', period),
+                          lambda: ewm_mean(self.true_range(), alpha=1 / period, min_periods=period))
+
+    def dmi(self, period: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(+DI, -DI, ADX) theo Wilder"""
+        def compute():
+            up = self.high - self._previous(self.high)
+            down = self._previous(self.low) - self.low
+            plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+            minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+            if self.close.ndim == 2:
+                # Phần NaN đệm không được tính là quan sát của EWM
+                padding = np.isnan(self.close)
+                plus_dm[padding] = np.nan
+                minus_dm[padding] = np.nan
+            atr = self.atr(period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                plus_di = 100 * ewm_mean(plus_dm, alpha=1 / period, min_periods=period) / atr
+                minus_di = 100 * ewm_mean(minus_dm, alpha=1 / period, min_periods=period) / atr
+                dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+            adx = ewm_mean(dx, alpha=1 / period, min_periods=period)
+            return plus_di, minus_di, adx
+        return self._memo(('dmi', period), compute)
+
+    def obv(self) -> np.ndarray:
+        def compute():
+            direction = np.sign(self.close - self._previous(self.close))
+            flow = np.nan_to_num(direction * self.volume)
+            if self.obv_offset:
+                # Nến đầu không có nến trước (flow = 0): mang OBV của phần lịch sử đã cắt
+                flow[..., 0] += self.obv_offset
+            obv = np.cumsum(flow, axis=-1)
+            obv[np.isnan(self.close) | np.isnan(self.volume)] = np.nan
+            return obv
+        return self._memo(('obv',), compute)
+
+    def obv_sma(self, period: int = 20) -> np.ndarray:
+        return self._memo(('obv_sma', period), lambda: rolling(self.obv(), period, 'mean'))
+
+    def vwap(self, period: int = 20) -> np.ndarray:
+        """VWAP trượt theo `period` nến trên giá điển hình (high + low + close) / 3"""
+        def compute():
+            typical_price = (self.high + self.low + self.close) / 3
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return rolling(typical_price * self.volume, period, 'mean') / self.volume_sma(period)
+        return self._memo(('vwap', period), compute)
+
+    def highest(self, period: int, base: Optional[int] = None) -> np.ndarray:
+        """High cao nhất của `period` nến; có `base` thì ghép từ highest(base) đã tính (xem widen_extreme)"""
+        if base is not None and base < period:
+            return self._memo(('highest', period),
+                              lambda: widen_extreme(self.highest(base), base, period, np.maximum))
+        return self._memo(('highest', period), lambda: rolling(self.high, period, 'max'))
+
+    def lowest(self, period: int, base: Optional[int] = None) -> np.ndarray:
+        """Low thấp nhất của `period` nến; có `base` thì ghép từ lowest(base) đã tính"""
+        if base is not None and base < period:
+            return self._memo(('lowest', period),
+                              lambda: widen_extreme(self.lowest(base), base, period, np.minimum))
+        return self._memo(('lowest', period), lambda: rolling(self.low, period, 'min'))
+
+    def midpoint(self, period: int, base: Optional[int] = None) -> np.ndarray:
+        """(đỉnh cao nhất + đáy thấp nhất) / 2 của `period` nến, dùng cho Ichimoku"""
+        return self._memo(('midpoint', period),
+                          lambda: (self.highest(period, base) + self.lowest(period, base)) / 2)
+
+    def ichimoku(self, tenkan_period: int = 9, kijun_period: int = 26,
+                 senkou_b_period: int = 52) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (Tenkan-sen, Kijun-sen, Senkou Span A, Senkou Span B). Hai đường Senkou đã được dời
+        kijun_period nến về phía trước, nên giá trị tại nến i là mây đang nằm dưới/trên nến i
+        """
+        def compute():
+            # Chỉ cần một lần rolling max/min; Kijun và Senkou B được ghép từ cửa sổ ngắn hơn
+            tenkan = self.midpoint(tenkan_period)
+            kijun = self.midpoint(kijun_period, base=tenkan_period)
+            span_a = np.full_like(tenkan, np.nan)
+            span_b = np.full_like(tenkan, np.nan)
+            span_a[..., kijun_period:] = ((tenkan + kijun) / 2)[..., :-kijun_period]
+            span_b[..., kijun_period:] = self.midpoint(senkou_b_period, base=kijun_period)[..., :-kijun_period]
+            return tenkan, kijun, span_a, span_b
+        return self._memo(('ichimoku', tenkan_period, kijun_period, senkou_b_period), compute)
+
+    def columns(self, timestamps: Optional[ArrayLike] = None) -> Dict[str, np.ndarray]:
+        """
+        Toàn bộ lịch sử các chỉ báo mặc định dưới dạng các cột NumPy thẳng hàng với nến
+        (không làm tròn, không chuyển sang list); NaN ở giai đoạn khởi động của mỗi chỉ báo
+        """
+        macd_line, signal_line, histogram = self.macd(12, 26, 9)
+        upper, middle, lower = self.bollinger(20, 2)
+        k_percent, d_percent = self.stochastic(14, 3)
+        columns = {}
+        if timestamps is not None:
+            columns['timestamp'] = np.asarray(timestamps)
+        columns.update({
+            'close': self.close,
+            'rsi': self.rsi(14),
+            'macd': macd_line,
+            'macd_signal': signal_line,
+            'macd_histogram': histogram,
+            'bb_upper': upper,
+            'bb_middle': middle,
+            'bb_lower': lower,
+            'ema_21': self.ema(21),
+            'sma_20': self.sma(20),
+            'stoch_k': k_percent,
+            'stoch_d': d_percent
+        })
+        if self.volume is not None:
+            columns['volume'] = self.volume
+            columns['volume_sma_20'] = self.volume_sma(20)
+        return columns
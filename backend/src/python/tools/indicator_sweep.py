@@ -0,0 +1,111 @@
+import math
+import pandas as pd
+from typing import List, Dict, Any, Optional
+from tools.indicator_engine import IndicatorEngine
+from tools.technical_indicators import TechnicalIndicators
+
+# Tham số mặc định giống các hàm calculate_* tương ứng
+DEFAULT_PARAMS = {
+    'rsi': {'period': 14},
+    'ema': {'period': 21},
+    'sma': {'period': 20},
+    'bollinger': {'period': 20, 'std_dev': 2},
+    'macd': {'fast_period': 12, 'slow_period': 26, 'signal_period': 9},
+    'stochastic': {'k_period': 14, 'd_period': 3}
+}
+
+# Số nến tối thiểu, cùng điều kiện với các hàm calculate_*
+MIN_LENGTH = {
+    'rsi': lambda p: p['period'] + 1,
+    'ema': lambda p: p['period'],
+    'sma': lambda p: p['period'],
+    'bollinger': lambda p: p['period'],
+    'macd': lambda p: p['slow_period'] + p['signal_period'],
+    'stochastic': lambda p: p['k_period'] + p['d_period']
+}
+
+
+def _previous(values, current):
+    return float(values[-2]) if len(values) >= 2 else current
+
+
+def _sweep_row(engine: IndicatorEngine, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    price = float(engine.close[-1])
+
+    if name == 'rsi':
+        value = float(engine.rsi(params['period'])[-1])
+        signal, _ = TechnicalIndicators._rsi_signal(value)
+        return {"value": value, "signal": signal}
+
+    if name in ('ema', 'sma'):
+        line = engine.ema(params['period']) if name == 'ema' else engine.sma(params['period'])
+        value = float(line[-1])
+        previous = _previous(line, value)
+        slope = (value - previous) / previous * 100 if len(line) >= 2 else 0
+        signal, _ = TechnicalIndicators._moving_average_signal(name.upper(), params['period'], price, value, slope)
+        return {"value": value, "slope": slope, "signal": signal}
+
+    if name == 'bollinger':
+        upper, middle, lower = (float(line[-1]) for line in engine.bollinger(params['period'], params['std_dev']))
+        signal, _ = TechnicalIndicators._bollinger_signal(price, upper, middle, lower)
+        return {
+            "value": middle, "upper_band": upper, "lower_band": lower,
+            "bandwidth": (upper - lower) / middle * 100 if middle else math.nan,
+            "band_position": (price - lower) / (upper - lower) if upper != lower else math.nan,
+            "signal": signal
+        }
+
+    if name == 'macd':
+        macd_line, signal_line, histogram = engine.macd(params['fast_period'], params['slow_period'],
+                                                        params['signal_period'])
+        current_histogram = float(histogram[-1])
+        prev_histogram = float(histogram[-2]) if len(histogram) > 1 else 0
+        signal, _ = TechnicalIndicators._macd_signal(float(macd_line[-1]), float(signal_line[-1]),
+                                                     current_histogram, prev_histogram)
+        return {"value": float(macd_line[-1]), "signal_line": float(signal_line[-1]),
+                "histogram": current_histogram, "signal": signal}
+
+    if name == 'stochastic':
+        k_percent, d_percent = engine.stochastic(params['k_period'], params['d_period'])
+        current_k, current_d = float(k_percent[-1]), float(d_percent[-1])
+        signal, _ = TechnicalIndicators._stochastic_signal(current_k, current_d,
+                                                           _previous(k_percent, current_k),
+                                                           _previous(d_percent, current_d))
+        return {"value": current_k, "d_percent": current_d, "signal": signal}
+
+    raise ValueError(f"Chỉ báo '{name}' không hỗ trợ quét tham số")
+
+
+def run_parameter_sweep(prices, param_sets: List[Dict[str, Any]], volumes=None, highs=None,
+                        lows=None) -> pd.DataFrame:
+    """
+    Tính nhiều bộ tham số trên cùng một chuỗi dữ liệu trong một lượt.
+    Các bộ tham số dùng chung kết quả trung gian qua IndicatorEngine: một diff cho mọi RSI,
+    SMA của mọi chu kỳ từ một lần cumsum, rolling std dùng chung giữa các hệ số Bollinger,
+    EMA dùng chung giữa chỉ báo EMA và MACD.
+    Trả về bảng tidy: mỗi hàng là một bộ tham số với giá trị mới nhất và tín hiệu
+    """
+    engine = IndicatorEngine(prices, volumes, highs, lows)
+
+    resolved = []
+    for param_set in param_sets:
+        name = str(param_set.get('indicator', '')).lower()
+        params = dict(DEFAULT_PARAMS.get(name, {}))
+        params.update({k: v for k, v in param_set.items() if k != 'indicator'})
+        resolved.append((name, params))
+
+    engine.prefill_sma([p['period'] for name, p in resolved if name in ('sma', 'bollinger')])
+
+    records = []
+    for name, params in resolved:
+        record = {"indicator": name, "params": ",".join(f"{k}={v}" for k, v in params.items()), **params}
+        try:
+            if name in MIN_LENGTH and len(engine) < MIN_LENGTH[name](params):
+                record["error"] = "Không đủ dữ liệu"
+            else:
+                record.update(_sweep_row(engine, name, params))
+        except Exception as e:
+            record["error"] = f"Lỗi tính {name}: {str(e)}"
+        records.append(record)
+
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,32 @@
+# Cấu hình model LSTM, không import TensorFlow để process của crew và scheduler huấn luyện
+# tính được key của registry (architecture_hash trong tools/model_registry.py) mà không phải load nó
+
+# Cấu hình model và huấn luyện; registry lưu model theo hash của nó, nên thay đổi sẽ huấn luyện lại
+ARCHITECTURE = {
+    "sequence_length": 60,
+    "lstm_units": [50, 50, 50],
+    "dropout": 0.2,
+    "dense_units": 1,
+    "optimizer": "adam",
+    "loss": "mean_squared_error",
+    "epochs": 50,
+    "batch_size": 32,
+    "scaler": "minmax",
+    "validation_split": 0.2
+}
+
+# Các model chọn được ở mỗi lời gọi: "recursive" đưa dự đoán 1 ngày ngược vào (mỗi ngày một lượt
+# forward), "direct" có head Dense với một đầu ra cho mỗi horizon, nên mọi days_ahead <= 30 chỉ một lượt
+MAX_HORIZON = 30
+ARCHITECTURES = {
+    "recursive": ARCHITECTURE,
+    "direct": {**ARCHITECTURE, "head": "direct", "horizon": MAX_HORIZON, "dense_units": MAX_HORIZON}
+}
+
+# Số cửa sổ huấn luyện tối thiểu; mỗi cửa sổ cần sequence_length nến đầu vào và horizon nến mục tiêu
+MIN_TRAINING_WINDOWS = 20
+
+
+def min_training_candles(architecture: dict) -> int:
+    """Số nến ngày tối thiểu để huấn luyện: 80 cho "recursive", 109 cho "direct" (period "3mo" không đủ)"""
+    return architecture["sequence_length"] + architecture.get("horizon", 1) - 1 + MIN_TRAINING_WINDOWS
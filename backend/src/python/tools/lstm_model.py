@@ -0,0 +1,465 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.metrics import mean_squared_error, mean_absolute_error
+import tensorflow as tf
+from tensorflow.keras.models import Sequential, clone_model
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.layers import LSTM, Dense, Dropout
+import json
+import time
+import warnings
+from tools.ohlcv_store import get_default_store
+from tools.compact_output import HISTORY_MODES, compact_result, dumps_compact
+from tools.model_registry import ModelKey, ModelRegistry, TrainedModel, get_default_registry
+from tools.result_cache import get_default_result_cache
+from tools.timeframes import next_candle_close
+from tools.lstm_architectures import ARCHITECTURE, ARCHITECTURES, min_training_candles
+from tools.sequence_windows import STREAMING_MIN_WINDOWS, sliding_windows, window_dataset
+warnings.filterwarnings('ignore')
+
+# Làm mới kiểu warm start trên nến mới; không thuộc hash kiến trúc (cùng model, huấn luyện thêm)
+FINE_TUNE = {
+    "epochs": 5,
+    "learning_rate": 1e-4,
+    "replay_ratio": 4,      # số cửa sổ cũ phát lại cho mỗi cửa sổ mới
+    "replay_min": 64,
+    "range_margin": 0.1     # giá mới vượt khoảng [0, 1] của scaler chừng này thì bắt buộc huấn luyện lại đầy đủ
+}
+
+# Kiểm tra drift trên ít nhất chừng này dự đoán gần nhất, kể cả khi có ít nến mới hơn
+DRIFT_MIN_SAMPLES = 5
+
+# Các lần đo drift trên hold-out được giữ trong meta.json
+DRIFT_HISTORY = 30
+
+class LSTMForecaster:
+    """
+    Huấn luyện, làm mới và suy luận phía sau LSTM prediction tool. Import TensorFlow, nên chạy
+    trong các process worker LSTM (tools/lstm_worker.py), không bao giờ trong process của crew.
+    """
+
+    def run(self, symbol: str, days_ahead: int = 7, training_period: str = "1y", output_mode: str = "full",
+            fields: Optional[List[str]] = None, history: str = "numeric", max_chars: int = 0,
+            forecast_mode: str = "recursive") -> str:
+        try:
+            architecture = ARCHITECTURES.get(forecast_mode)
+            if architecture is None:
+                return json.dumps({"error": f"Unsupported forecast mode: {forecast_mode} (expected one of {list(ARCHITECTURES)})"})
+
+            compact = output_mode == "compact"
+            if compact and history not in HISTORY_MODES:
+                return json.dumps({"error": f"Unsupported history mode: {history}"})
+            
+            # Validate inputs
+            if days_ahead > 30:
+                days_ahead = 30
+            if days_ahead < 1:
+                days_ahead = 1
+                
+            ticker = f"{symbol}-USD"
+            prices, timestamps, error = self._history(ticker, training_period, architecture)
+            fallback = None
+            if error and architecture is not ARCHITECTURES["recursive"]:
+                # Lịch sử quá ngắn cho head direct (ví dụ "3mo"): dùng model recursive và báo trong output
+                prices, timestamps, recursive_error = self._history(ticker, training_period, ARCHITECTURES["recursive"])
+                if recursive_error is None:
+                    architecture = ARCHITECTURES["recursive"]
+                    fallback = {"requested_mode": forecast_mode, "reason": error}
+            if prices is None:
+                return json.dumps({"error": error})
+            trained, _, _ = self._refresh(symbol, training_period, architecture, prices, timestamps)
+            
+            # Cùng model và nến -> cùng dự đoán, cache đến nến ngày kế tiếp
+            cache = get_default_result_cache()
+            cache_key = ("lstm", symbol, training_period, forecast_mode, trained.key.architecture,
+                         trained.meta["trained_at"], int(timestamps[-1]), days_ahead, (tuple(fields or ()), history, max_chars) if compact else None)
+            version = get_default_store().version(ticker, "1d")
+            cached = cache.get(cache_key, version)
+            if cached is not None:
+                return cached
+            
+            result = self._predict(symbol, trained, prices, days_ahead)
+            if fallback:
+                result["model"]["fallback"] = fallback
+            
+            if compact:
+                output = dumps_compact(compact_result(result, fields, history), max_chars)
+            else:
+                output = json.dumps(result, ensure_ascii=False, indent=2)
+            cache.put(cache_key, output, next_candle_close("1d"), version)
+            return output
+            
+        except Exception as e:
+            return json.dumps({"error": f"LSTM prediction failed: {str(e)}"})
+    
+    def refresh(self, symbol: str, training_period: str = "1y", forecast_mode: str = "recursive") -> Dict[str, Any]:
+        """
+        Cập nhật model đã lưu cho (symbol, training_period, forecast_mode) mà không dự đoán, giống
+        lời gọi dự đoán đầu tiên sẽ làm; dùng bởi scheduler chạy nền (tools/lstm_scheduler.py)
+        """
+        architecture = ARCHITECTURES.get(forecast_mode)
+        if architecture is None:
+            return {"error": f"Unsupported forecast mode: {forecast_mode} (expected one of {list(ARCHITECTURES)})"}
+        prices, timestamps, error = self._history(f"{symbol}-USD", training_period, architecture)
+        if error:
+            return {"error": error}
+        start = time.perf_counter()
+        trained, mode, reason = self._refresh(symbol, training_period, architecture, prices, timestamps)
+        return {
+            "symbol": symbol,
+            "training_period": training_period,
+            "forecast_mode": forecast_mode,
+            "action": mode or "none",
+            "reason": reason,
+            "trained_at": trained.meta["trained_at"],
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+    
+    def _history(self, ticker: str, training_period: str,
+                 architecture: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[str]]:
+        """(prices, timestamps, error) của lịch sử huấn luyện theo ngày"""
+        # Lấy dữ liệu huấn luyện (kho OHLCV cục bộ, chỉ tải phần đuôi còn thiếu)
+        data = get_default_store().history(ticker, training_period, "1d")
+        
+        if len(data) < 60:
+            return None, None, "Insufficient training data"
+        
+        # Prepare data for LSTM
+        prices = data['Close'].values.reshape(-1, 1)
+        timestamps = data.index.asi8
+        required = min_training_candles(architecture)
+        if len(prices) < required:
+            return None, None, f"Not enough data for training: {len(prices)} daily candles, need {required}"
+        return prices, timestamps, None
+    
+    def _refresh(self, symbol: str, training_period: str, architecture: Dict[str, Any], prices: np.ndarray,
+                 timestamps: np.ndarray) -> Tuple[TrainedModel, Optional[str], Optional[str]]:
+        """(trained, mode, reason): model trong registry sau lần làm mới mà `_refresh_plan` yêu cầu"""
+        # Model đã huấn luyện từ registry: fine-tune trên nến mới, huấn luyện lại khi chưa có, đã cũ hoặc bị drift
+        registry = get_default_registry()
+        key = registry.key(symbol, training_period, architecture)
+        trained = registry.load(key)
+        mode, reason, drift = self._refresh_plan(registry, trained, prices, timestamps)
+        if mode == "full":
+            previous = trained
+            trained = registry.train(key, lambda: self._train(registry, key, architecture, prices, timestamps,
+                                                              reason, self._drift_history(previous, drift)))
+        elif mode == "incremental":
+            trained = registry.train(key, lambda: self._fine_tune(registry, trained, prices, timestamps, drift))
+        return trained, mode, reason
+    
+    def _refresh_plan(self, registry: ModelRegistry, trained: Optional[TrainedModel], prices: np.ndarray,
+                      timestamps: np.ndarray) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]:
+        """
+        (mode, reason, drift) cho model đã lưu: mode None dùng nguyên model, "incremental" fine-tune
+        nó trên các nến mới, "full" huấn luyện lại từ đầu khi model chưa có, đã cũ (lần huấn luyện đầy đủ
+        gần nhất cũ hơn tuổi tối đa của registry), giá mới ra ngoài khoảng của scaler, hoặc bị drift
+        (MAE trên các nến mới, phần hold-out mới nhất, vượt MAE validation quá tỉ lệ sai số của
+        registry). `drift` là kết quả đo trên hold-out nếu có đo.
+        """
+        if trained is None:
+            return "full", "missing", None
+        if registry.is_stale(trained):
+            return "full", "stale", None
+        
+        new_candles = int(np.count_nonzero(timestamps > trained.meta["last_timestamp"]))
+        if new_candles == 0:
+            return None, None, None
+        sequence_length = trained.meta["architecture"]["sequence_length"]
+        samples = min(max(new_candles, DRIFT_MIN_SAMPLES), len(prices) - sequence_length)
+        scaled = trained.scaler.transform(prices[-(samples + sequence_length):])
+        if scaled.min() < -FINE_TUNE["range_margin"] or scaled.max() > 1 + FINE_TUNE["range_margin"]:
+            return "full", "range", None
+        X, y = self._create_sequences(scaled, sequence_length)
+        # Sai số ngày kế tiếp (đầu ra đầu tiên của model direct), so sánh được với MAE validation
+        predicted = trained.model.predict(X.reshape(-1, sequence_length, 1), verbose=0)[:, :1]
+        predicted = trained.scaler.inverse_transform(predicted)
+        actual = trained.scaler.inverse_transform(y.reshape(-1, 1))
+        recent_mae = mean_absolute_error(actual, predicted)
+        drift = {
+            "timestamp": int(timestamps[-1]),
+            "holdout_mae": round(float(recent_mae), 4),
+            "ratio": round(float(recent_mae / trained.meta["mae"]), 3) if trained.meta["mae"] else None
+        }
+        if drift["ratio"] is not None and drift["ratio"] > registry.error_ratio:
+            return "full", "drift", drift
+        return "incremental", "new_candles", drift
+    
+    def _train(self, registry: ModelRegistry, key: ModelKey, architecture: Dict[str, Any], prices: np.ndarray,
+               timestamps: np.ndarray, reason: Optional[str] = None,
+               drift: Optional[List[Dict[str, Any]]] = None) -> TrainedModel:
+        """
+        Fit scaler và model trên toàn bộ lịch sử, validate trên 20% cuối, lưu vào registry.
+        mse/mae/accuracy là chỉ số ngày kế tiếp cho cả hai loại head; model direct ghi thêm
+        horizon_mae, sai số trung bình trên mọi horizon của nó.
+        """
+        # Scale the data
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_data = scaler.fit_transform(prices)
+        
+        # Create training sequences
+        sequence_length = architecture["sequence_length"]
+        horizon = architecture.get("horizon", 1)
+        X, y = self._create_sequences(scaled_data, sequence_length, horizon)
+        
+        # Split data
+        train_size = int(len(X) * (1 - architecture["validation_split"]))
+        X_train, X_test = X[:train_size], X[train_size:]
+        y_train, y_test = y[:train_size], y[train_size:]
+        
+        # Build LSTM model
+        model = self._build_lstm_model((X_train.shape[1], 1), architecture)
+        
+        # Huấn luyện model; lịch sử dài nạp batch dạng streaming qua tf.data thay vì một tensor đầu vào lớn
+        if len(X) >= STREAMING_MIN_WINDOWS:
+            train_indices, test_indices = np.arange(train_size), np.arange(train_size, len(X))
+            model.fit(window_dataset(scaled_data, sequence_length, horizon, train_indices,
+                                     architecture["batch_size"], shuffle=True),
+                      epochs=architecture["epochs"], verbose=0)
+            test_predictions = model.predict(window_dataset(scaled_data, sequence_length, horizon, test_indices,
+                                                            architecture["batch_size"], with_targets=False), verbose=0)
+        else:
+            model.fit(X_train[..., None], y_train, epochs=architecture["epochs"],
+                      batch_size=architecture["batch_size"], verbose=0)
+            
+            # Make predictions for test set (for validation)
+            test_predictions = model.predict(X_test[..., None], verbose=0)
+        test_predictions = test_predictions.reshape(len(X_test), horizon)
+        test_predictions = scaler.inverse_transform(test_predictions.reshape(-1, 1)).reshape(-1, horizon)
+        actual_test = scaler.inverse_transform(y_test.reshape(-1, 1)).reshape(-1, horizon)
+        
+        # Calculate accuracy metrics
+        mse = mean_squared_error(actual_test[:, 0], test_predictions[:, 0])
+        mae = mean_absolute_error(actual_test[:, 0], test_predictions[:, 0])
+        accuracy = max(0, 100 - (mae / actual_test[:, 0].mean()) * 100)
+        
+        now = time.time()
+        return registry.save(key, model, scaler, {
+            "architecture": architecture,
+            "last_timestamp": int(timestamps[-1]),
+            "samples": len(X),
+            "mse": float(mse),
+            "mae": float(mae),
+            "horizon_mae": float(mean_absolute_error(actual_test, test_predictions)),
+            "accuracy": float(accuracy),
+            "reason": reason,
+            "trained_at": now,
+            "full_trained_at": now,
+            "fine_tunes": 0,
+            "drift": drift or []
+        })
+    
+    def _fine_tune(self, registry: ModelRegistry, trained: TrainedModel, prices: np.ndarray,
+                   timestamps: np.ndarray, drift: Optional[Dict[str, Any]] = None) -> TrainedModel:
+        """
+        Warm start: một bản sao của model đã lưu (để các dự đoán đồng thời vẫn dùng model cũ) được
+        huấn luyện vài epoch trên các cửa sổ kết thúc ở nến mới cùng một mẫu ngẫu nhiên các cửa sổ
+        cũ phát lại, để model không quên phần lịch sử còn lại. Scaler được dùng lại.
+        """
+        architecture = trained.meta["architecture"]
+        sequence_length = architecture["sequence_length"]
+        horizon = architecture.get("horizon", 1)
+        X, y = self._create_sequences(trained.scaler.transform(prices), sequence_length, horizon)
+        # Các cửa sổ có target cuối là nến mới
+        new_windows = min(int(np.count_nonzero(
+            timestamps[sequence_length + horizon - 1:] > trained.meta["last_timestamp"])), len(X))
+        old_windows = len(X) - new_windows
+        replay = min(old_windows, max(FINE_TUNE["replay_min"], FINE_TUNE["replay_ratio"] * new_windows))
+        rng = np.random.default_rng(int(timestamps[-1]) % 2 ** 32)
+        indices = np.concatenate([rng.choice(old_windows, replay, replace=False), np.arange(old_windows, len(X))])
+        
+        model = clone_model(trained.model)
+        model.set_weights(trained.model.get_weights())
+        model.compile(optimizer=Adam(learning_rate=FINE_TUNE["learning_rate"]), loss=architecture["loss"])
+        model.fit(X[indices].reshape(-1, sequence_length, 1), y[indices], epochs=FINE_TUNE["epochs"],
+                  batch_size=architecture["batch_size"], verbose=0)
+        
+        return registry.save(trained.key, model, trained.scaler, {
+            **trained.meta,
+            "last_timestamp": int(timestamps[-1]),
+            "samples": len(X),
+            "reason": "new_candles",
+            "trained_at": time.time(),
+            "fine_tunes": trained.meta.get("fine_tunes", 0) + 1,
+            "drift": self._drift_history(trained, drift)
+        })
+    
+    @staticmethod
+    def _drift_history(trained: Optional[TrainedModel], drift: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Các lần đo hold-out giữ trong meta.json, DRIFT_HISTORY entry mới nhất"""
+        history = list(trained.meta.get("drift", [])) if trained is not None else []
+        if drift is not None:
+            history.append(drift)
+        return history[-DRIFT_HISTORY:]
+    
+    def _predict(self, symbol: str, trained: TrainedModel, prices: np.ndarray, days_ahead: int) -> Dict[str, Any]:
+        model, scaler, meta = trained.model, trained.scaler, trained.meta
+        architecture = meta["architecture"]
+        sequence_length = architecture["sequence_length"]
+        accuracy = meta["accuracy"]
+        
+        # Predict future prices
+        last_sequence = scaler.transform(prices[-sequence_length:])
+        if architecture.get("head") == "direct":
+            # Một lượt forward trả về mọi horizon
+            future_predictions = model.predict(last_sequence.reshape(1, sequence_length, 1), verbose=0)[0, :days_ahead]
+        else:
+            future_predictions = []
+            current_sequence = last_sequence.copy()
+            
+            for _ in range(days_ahead):
+                next_pred = model.predict(current_sequence.reshape(1, sequence_length, 1), verbose=0)
+                future_predictions.append(next_pred[0, 0])
+                
+                # Update sequence for next prediction
+                current_sequence = np.append(current_sequence[1:], next_pred[0, 0]).reshape(-1, 1)
+        
+        # Inverse transform predictions
+        future_predictions = np.array(future_predictions).reshape(-1, 1)
+        future_prices = scaler.inverse_transform(future_predictions).flatten()
+        
+        # Calculate confidence intervals (simplified)
+        current_price = prices[-1][0]
+        volatility = np.std(prices[-30:]) if len(prices) >= 30 else np.std(prices)
+        
+        predictions_with_confidence = []
+        for i, price in enumerate(future_prices):
+            confidence_range = volatility * np.sqrt(i + 1) * 0.1  # Increasing uncertainty over time
+            predictions_with_confidence.append({
+                "day": i + 1,
+                "predicted_price": round(float(price), 2),
+                "confidence_lower": round(float(price - confidence_range), 2),
+                "confidence_upper": round(float(price + confidence_range), 2),
+                "price_change": round(((price - current_price) / current_price) * 100, 2)
+            })
+        
+        # Trend analysis
+        trend_direction = "Bullish" if future_prices[-1] > current_price else "Bearish"
+        trend_strength = abs((future_prices[-1] - current_price) / current_price) * 100
+        
+        if trend_strength > 10:
+            trend_intensity = "Strong"
+        elif trend_strength > 5:
+            trend_intensity = "Moderate"
+        else:
+            trend_intensity = "Weak"
+        
+        # Market cycle analysis
+        cycle_analysis = self._analyze_market_cycle(prices.flatten())
+        
+        return {
+            "symbol": symbol,
+            "current_price": round(float(current_price), 2),
+            "prediction_period": f"{days_ahead} days",
+            "model_accuracy": round(float(accuracy), 2),
+            "model_metrics": {
+                "mse": round(float(meta["mse"]), 2),
+                "mae": round(float(meta["mae"]), 2)
+            },
+            "model": {
+                "trained_at": datetime.fromtimestamp(meta["trained_at"], timezone.utc).isoformat(timespec="seconds"),
+                "trained_because": meta.get("reason"),
+                "forecast_mode": architecture.get("head", "recursive"),
+                "fine_tunes": meta.get("fine_tunes", 0),
+                "holdout_mae": meta["drift"][-1]["holdout_mae"] if meta.get("drift") else None,
+                "architecture": trained.key.architecture
+            },
+            "predictions": predictions_with_confidence,
+            "trend_analysis": {
+                "direction": trend_direction,
+                "intensity": trend_intensity,
+                "strength_percentage": round(float(trend_strength), 2)
+            },
+            "market_cycle": cycle_analysis,
+            "summary": {
+                "target_price": round(float(future_prices[-1]), 2),
+                "total_change": round(((future_prices[-1] - current_price) / current_price) * 100, 2),
+                "confidence_level": min(90, accuracy),
+                "recommendation": self._generate_recommendation(trend_direction, trend_strength, accuracy)
+            },
+            "disclaimer": "AI predictions are not financial advice. Past performance doesn't guarantee future results."
+        }
+    
+    def _create_sequences(self, data, seq_length, horizon=1):
+        """
+        Tạo chuỗi huấn luyện LSTM (target là `horizon` giá trị kế tiếp, 1 chiều khi horizon=1).
+        View strided không sao chép của `data`, xem tools/sequence_windows.py
+        """
+        return sliding_windows(data, seq_length, horizon)
+    
+    def _build_lstm_model(self, input_shape, architecture=ARCHITECTURE):
+        """Xây kiến trúc model LSTM (các lớp LSTM + dropout xếp chồng, head Dense với dense_units đầu ra)"""
+        units = architecture["lstm_units"]
+        layers = []
+        for i, size in enumerate(units):
+            last = i == len(units) - 1
+            if i == 0:
+                layers.append(LSTM(size, return_sequences=not last, input_shape=input_shape))
+            else:
+                layers.append(LSTM(size, return_sequences=not last))
+            layers.append(Dropout(architecture["dropout"]))
+        layers.append(Dense(architecture["dense_units"]))
+        model = Sequential(layers)
+        
+        model.compile(optimizer=architecture["optimizer"], loss=architecture["loss"])
+        return model
+    
+    def _analyze_market_cycle(self, prices):
+        """Analyze current market cycle position"""
+        if len(prices) < 100:
+            return {"cycle": "Unknown", "position": "Insufficient data"}
+        
+        # Simple cycle analysis based on moving averages
+        short_ma = np.mean(prices[-20:])
+        long_ma = np.mean(prices[-100:])
+        current_price = prices[-1]
+        
+        # Calculate cycle metrics
+        price_vs_short = (current_price - short_ma) / short_ma * 100
+        price_vs_long = (current_price - long_ma) / long_ma * 100
+        
+        if price_vs_long > 20 and price_vs_short > 5:
+            cycle = "Bull Market"
+            position = "Late Stage"
+        elif price_vs_long > 10 and price_vs_short > 0:
+            cycle = "Bull Market"
+            position = "Early-Mid Stage"
+        elif price_vs_long < -20 and price_vs_short < -5:
+            cycle = "Bear Market"
+            position = "Late Stage"
+        elif price_vs_long < -10 and price_vs_short < 0:
+            cycle = "Bear Market"
+            position = "Early-Mid Stage"
+        else:
+            cycle = "Consolidation"
+            position = "Sideways Movement"
+        
+        return {
+            "cycle": cycle,
+            "position": position,
+            "price_vs_short_ma": round(price_vs_short, 2),
+            "price_vs_long_ma": round(price_vs_long, 2)
+        }
+    
+    def _generate_recommendation(self, direction, strength, accuracy):
+        """Generate trading recommendation based on prediction"""
+        if accuracy < 60:
+            return "Low confidence - Monitor closely"
+        
+        if direction == "Bullish":
+            if strength > 10:
+                return "Strong Buy Signal - High upside potential"
+            elif strength > 5:
+                return "Buy Signal - Moderate upside expected"
+            else:
+                return "Weak Buy - Consider accumulating"
+        else:
+            if strength > 10:
+                return "Strong Sell Signal - Significant downside risk"
+            elif strength > 5:
+                return "Sell Signal - Moderate downside expected"
+            else:
+                return "Weak Sell - Consider reducing position"
\ No newline at end of file
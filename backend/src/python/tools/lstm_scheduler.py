@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from tools.lstm_architectures import ARCHITECTURES
+from tools.lstm_worker import LSTMWorkerPool
+from tools.model_registry import ModelRegistry, get_default_registry
+from tools.timeframes import next_candle_close
+
+logger = logging.getLogger('LSTMScheduler')
+
+# Độ cũ của model chưa từng huấn luyện; model ở đúng tuổi tối đa có độ cũ 1
+MISSING_STALENESS = 2.0
+
+
+class RequestLog:
+    """
+    Số request LSTM mỗi ngày theo (symbol, training_period, forecast_mode) trong SQLite, do LSTM tool
+    trong process của crew ghi và scheduler đọc; WAL cho phép cả hai dùng file cùng lúc.
+    Ghi không bao giờ raise: log bị khóa hoặc không ghi được chỉ mất lần đếm đó.
+    """
+
+    def __init__(self, path: str = "data/models/requests.sqlite"):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS requests (
+                    symbol TEXT NOT NULL, training_period TEXT NOT NULL, forecast_mode TEXT NOT NULL,
+                    day INTEGER NOT NULL, count INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, training_period, forecast_mode, day)
+                ) WITHOUT ROWID""")
+
+    def record(self, symbol: str, training_period: str, forecast_mode: str, now: Optional[float] = None) -> None:
+        day = int((time.time() if now is None else now) // 86400)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("""
+                    INSERT INTO requests (symbol, training_period, forecast_mode, day, count) VALUES (?, ?, ?, ?, 1)
+                    ON CONFLICT (symbol, training_period, forecast_mode, day) DO UPDATE SET count = count + 1
+                """, (symbol, training_period, forecast_mode, day))
+        except sqlite3.Error:
+            pass
+
+    def counts(self, days: int = 7, now: Optional[float] = None) -> Dict[tuple, int]:
+        """{(symbol, training_period, forecast_mode): số request} trong `days` ngày gần nhất"""
+        since = int((time.time() if now is None else now) // 86400) - days + 1
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT symbol, training_period, forecast_mode, SUM(count) FROM requests
+                WHERE day >= ? GROUP BY symbol, training_period, forecast_mode
+            """, (since,)).fetchall()
+        return {(symbol, period, mode): int(count) for symbol, period, mode, count in rows}
+
+
+_default_log: Optional[RequestLog] = None
+_default_lock = threading.Lock()
+
+
+def get_default_request_log() -> RequestLog:
+    """
+    Log request đặt cạnh các model (LSTM_MODEL_DIR, mặc định data/models). Khi không tạo hoặc mở
+    được file đó thì dùng log trong bộ nhớ (chỉ đếm process này), để LSTM tool không bao giờ
+    lỗi vì nó
+    """
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            path = os.path.join(os.environ.get("LSTM_MODEL_DIR", "data/models"), "requests.sqlite")
+            try:
+                _default_log = RequestLog(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"⚠️ Request log {path} unavailable, counting in memory: {e}")
+                _default_log = RequestLog(":memory:")
+        return _default_log
+
+
+class TrainingJob(NamedTuple):
+    symbol: str
+    training_period: str
+    forecast_mode: str
+    requests: int
+    staleness: float
+    priority: float
+
+
+class LSTMTrainingScheduler:
+    """
+    Giữ sẵn các model LSTM trong registry mà LSTM tool đọc, để lời gọi của agent không phải huấn luyện.
+    - Ứng viên là các symbol × period × mode cấu hình sẵn cộng mọi tổ hợp agent đã yêu cầu
+      trong `window_days` (theo log request)
+    - Ứng viên đến hạn khi model chưa có, quá tuổi tối đa của registry, hoặc chưa thấy nến ngày
+      hiện tại; các ứng viên khác bị bỏ qua mà không chạm đến TensorFlow
+    - Job đến hạn chạy theo độ ưu tiên giảm dần, ưu tiên = (1 + số request) × (1 + độ cũ), trong đó
+      độ cũ là tuổi model chia tuổi tối đa (MISSING_STALENESS với model chưa có)
+    - Job là request `refresh` gửi tới LSTMWorkerPool, cùng đường huấn luyện lại đầy đủ / fine-tune
+      mà một lời gọi dự đoán đi qua; worker của tool nhận model đã lưu ở lần load kế tiếp
+    """
+
+    def __init__(self, symbols: Sequence[str], training_periods: Sequence[str] = ("1y",),
+                 forecast_modes: Sequence[str] = ("recursive",), pool: Optional[LSTMWorkerPool] = None,
+                 registry: Optional[ModelRegistry] = None, request_log: Optional[RequestLog] = None,
+                 window_days: int = 7):
+        self.symbols = list(symbols)
+        self.training_periods = list(training_periods)
+        self.forecast_modes = list(forecast_modes)
+        self.pool = pool or LSTMWorkerPool()
+        self.registry = registry or get_default_registry()
+        self.request_log = request_log or get_default_request_log()
+        self.window_days = window_days
+
+    def plan(self, now: Optional[float] = None) -> List[TrainingJob]:
+        """Các job đến hạn, ưu tiên cao nhất trước"""
+        now = time.time() if now is None else now
+        requests = self.request_log.counts(self.window_days, now)
+        candidates = {(symbol, period, mode): 0 for symbol in self.symbols
+                      for period in self.training_periods for mode in self.forecast_modes}
+        candidates.update((key, count) for key, count in requests.items() if key[2] in ARCHITECTURES)
+
+        # Thời điểm mở của nến ngày hiện tại (ns, giống "last_timestamp" trong meta)
+        current_candle = int((next_candle_close("1d", now) - 86400) * 1e9)
+        jobs = []
+        for (symbol, period, mode), count in candidates.items():
+            meta = self.registry.meta(self.registry.key(symbol, period, ARCHITECTURES[mode]))
+            if meta is None:
+                staleness = MISSING_STALENESS
+            else:
+                age = now - meta.get("full_trained_at", meta.get("trained_at", 0))
+                staleness = min(age / self.registry.max_age_seconds, MISSING_STALENESS) \
+                    if self.registry.max_age_seconds > 0 else MISSING_STALENESS
+                if staleness <= 1 and meta.get("last_timestamp", 0) >= current_candle:
+                    continue
+            jobs.append(TrainingJob(symbol, period, mode, count, round(staleness, 3),
+                                    round((1 + count) * (1 + staleness), 3)))
+        return sorted(jobs, key=lambda job: job.priority, reverse=True)
+
+    def run_once(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Làm mới mọi model đến hạn trên pool; mỗi job một kết quả, theo thứ tự ưu tiên"""
+        jobs = self.plan(now)
+        if not jobs:
+            return []
+        # Mỗi worker một thread điều phối; thread pool phát job theo thứ tự ưu tiên
+        with ThreadPoolExecutor(max_workers=max(1, self.pool.workers)) as dispatch:
+            futures = [dispatch.submit(self._refresh, job) for job in jobs]
+            return [future.result() for future in futures]
+
+    def run_forever(self, interval_seconds: float = 3600) -> None:
+        while True:
+            started = time.time()
+            try:
+                results = self.run_once(started)
+                failed = [result for result in results if "error" in result]
+                logger.info(f"🧠 Refreshed {len(results) - len(failed)} LSTM models, {len(failed)} failed "
+                            f"in {time.time() - started:.1f}s")
+            except Exception as e:
+                logger.error(f"❌ Scheduler pass failed: {e}")
+            time.sleep(max(0.0, interval_seconds - (time.time() - started)))
+
+    def _refresh(self, job: TrainingJob) -> Dict[str, Any]:
+        response = self.pool.request("refresh", {
+            "symbol": job.symbol,
+            "training_period": job.training_period,
+            "forecast_mode": job.forecast_mode
+        }, route=job.symbol)
+        result = {**job._asdict(), **response}
+        if "error" in response:
+            logger.error(f"❌ {job.symbol} {job.training_period} {job.forecast_mode}: {response['error']}")
+        else:
+            logger.info(f"✅ {job.symbol} {job.training_period} {job.forecast_mode}: {response['action']} "
+                        f"({response['reason'] or 'up to date'}, {response['seconds']}s)")
+        return result
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train and refresh LSTM models in the background")
+    parser.add_argument("--symbols", default=os.environ.get("LSTM_SCHEDULE_SYMBOLS", "BTC,ETH"),
+                        help="Comma-separated symbols to keep warm (requested ones are added)")
+    parser.add_argument("--periods", default=os.environ.get("LSTM_SCHEDULE_PERIODS", "1y"))
+    parser.add_argument("--modes", default=os.environ.get("LSTM_SCHEDULE_MODES",
+                                                          os.environ.get("LSTM_FORECAST_MODE", "recursive")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("LSTM_SCHEDULE_WORKERS", 2)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("LSTM_WORKER_THREADS", 0)) or None,
+                        help="TensorFlow threads per worker (default CPUs / workers)")
+    parser.add_argument("--window-days", type=int, default=int(os.environ.get("LSTM_SCHEDULE_WINDOW_DAYS", 7)),
+                        help="Days of request history used for priorities")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("LSTM_SCHEDULE_INTERVAL_MINUTES", 60)),
+                        help="Minutes between passes")
+    parser.add_argument("--once", action="store_true", help="Run one pass and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned jobs without training")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    modes = _split(args.modes)
+    unknown = [mode for mode in modes if mode not in ARCHITECTURES]
+    if unknown:
+        parser.error(f"Unsupported forecast modes: {unknown} (expected some of {list(ARCHITECTURES)})")
+
+    with LSTMWorkerPool(workers=args.workers, threads=args.threads) as pool:
+        scheduler = LSTMTrainingScheduler(_split(args.symbols), _split(args.periods), modes, pool,
+                                          window_days=args.window_days)
+        if args.dry_run:
+            for job in scheduler.plan():
+                print(f"{job.priority:>8} {job.symbol:<8} {job.training_period:<4} {job.forecast_mode:<10} "
+                      f"requests={job.requests} staleness={job.staleness}")
+        elif args.once:
+            results = scheduler.run_once()
+            sys.exit(1 if any("error" in result for result in results) else 0)
+        else:
+            scheduler.run_forever(args.interval * 60)
+
+
+if __name__ == "__main__":
+    main()
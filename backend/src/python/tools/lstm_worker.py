@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import zlib
+import argparse
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Request và response là dict JSON, mỗi dòng một message trên stdin/stdout của worker:
+#   {"op": "predict", "args": {tham số keyword của LSTMForecaster.run}} -> {"output": "<JSON của tool>"}
+#   {"op": "refresh", "args": {tham số keyword của LSTMForecaster.refresh}} -> {"action": ..., "trained_at": ...}
+#   {"op": "ping", "args": {}} -> {"pid": ..., "threads": ...}
+# Mọi lỗi được trả về dạng {"error": "..."}. Trên đường ống request mang thêm "id" và response
+# được gói thành {"id": ..., "response": {...}}
+OPERATIONS = ("predict", "refresh", "ping")
+
+# Thư mục chứa package `tools`, thêm vào PYTHONPATH của process worker
+_PACKAGE_ROOT = str(Path(__file__).resolve().parent.parent)
+
+_forecaster = None
+_threads: Optional[int] = None
+
+
+def _init_worker(threads: int) -> None:
+    """Khởi động worker: giới hạn số thread TensorFlow/BLAS trước khi TensorFlow được load, rồi load một lần"""
+    global _threads
+    _threads = threads
+    for name in ("TF_NUM_INTRAOP_THREADS", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+        _get_forecaster()
+    except Exception:
+        # Giữ worker sống: request đầu tiên sẽ trả lỗi import trong response
+        pass
+
+
+def _get_forecaster():
+    global _forecaster
+    if _forecaster is None:
+        from tools.lstm_model import LSTMForecaster
+        _forecaster = LSTMForecaster()
+    return _forecaster
+
+
+def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Trả lời một request; chạy trong worker (hoặc trong process gọi khi workers=0)"""
+    op = request.get("op")
+    try:
+        if op == "predict":
+            return {"output": _get_forecaster().run(**request.get("args", {}))}
+        if op == "refresh":
+            return _get_forecaster().refresh(**request.get("args", {}))
+        if op == "ping":
+            return {"pid": os.getpid(), "threads": _threads}
+        return {"error": f"Unsupported operation: {op} (expected one of {list(OPERATIONS)})"}
+    except Exception as e:
+        return {"error": f"LSTM worker failed: {str(e)}"}
+
+
+class WorkerExited(Exception):
+    """Process worker đã thoát (crash, bị kill) trước khi trả lời"""
+
+
+class _Worker:
+    """
+    Một process `python -m tools.lstm_worker`: request được ghi vào stdin kèm id, một thread đọc
+    stdout và hoàn tất Future của request cùng id. Worker xử lý lần lượt, nên request gửi trong
+    lúc nó bận xếp hàng trong pipe
+    """
+
+    def __init__(self, threads: int):
+        env = {**os.environ,
+               "PYTHONPATH": os.pathsep.join(filter(None, [_PACKAGE_ROOT, os.environ.get("PYTHONPATH")]))}
+        self.process = subprocess.Popen([sys.executable, "-m", "tools.lstm_worker", "--threads", str(threads)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+                                        text=True, encoding="utf-8")
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._exited = False
+        threading.Thread(target=self._read, name=f"lstm-worker-{self.process.pid}", daemon=True).start()
+
+    def submit(self, request: Dict[str, Any]) -> Future:
+        future = Future()
+        with self._lock:
+            if self._exited:
+                raise WorkerExited()
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self.process.stdin.write(json.dumps({**request, "id": request_id}) + "\n")
+                self.process.stdin.flush()
+            except (OSError, ValueError):
+                self._pending.pop(request_id, None)
+                raise WorkerExited()
+        return future
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                future = self._pending.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message.get("response") or {})
+        # EOF: process đã thoát, các request còn chờ không bao giờ được trả lời
+        with self._lock:
+            self._exited = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(WorkerExited())
+
+    def close(self, wait: bool = True) -> None:
+        """Đóng stdin để worker thoát sau request đang chạy; wait=False kill ngay"""
+        if wait:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait()
+                return
+            except KeyboardInterrupt:
+                pass
+        self.process.kill()
+        self.process.wait()
+
+
+class LSTMWorkerPool:
+    """
+    Các process worker chạy lâu dài, giữ TensorFlow, model registry và cache kết quả LSTM.
+    - Mỗi worker là một process `python -m tools.lstm_worker` riêng nói giao thức dict ở trên qua
+      stdin/stdout, nên process gọi không bao giờ import TensorFlow, worker không thừa hưởng các thread
+      của crew và không chạy lại `__main__` của process gọi (main.py import crew, crewai và các tool)
+    - Request được định tuyến theo symbol: model của một symbol nằm sẵn trong một worker và các
+      lời gọi đồng thời cho nó xếp hàng ở đó thay vì huấn luyện cùng model hai lần
+    - `threads` giới hạn số thread intra-op của TensorFlow (và OpenMP/BLAS) mỗi worker; inter-op là 1
+    - Worker bị crash được thay ở request kế tiếp; request quá thời gian vẫn chạy tiếp trong
+      worker của nó và các request sau cho worker đó xếp hàng phía sau
+    workers=0 xử lý request ngay trong process gọi (load TensorFlow ở đó), để debug
+    """
+
+    def __init__(self, workers: int = 1, threads: Optional[int] = None, timeout: Optional[float] = None):
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+        self.timeout = timeout
+        self._processes: List[Optional[_Worker]] = [None] * max(0, workers)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.restarts = 0
+
+    def __enter__(self) -> "LSTMWorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads,
+                "running": sum(worker is not None for worker in self._processes),
+                "requests": self.requests,
+                "errors": self.errors,
+                "restarts": self.restarts
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._processes = self._processes, [None] * len(self._processes)
+        for worker in workers:
+            if worker is not None:
+                worker.close()
+
+    def slot(self, route: Any) -> int:
+        """Worker mà `route` ánh xạ tới: crc32 ổn định giữa các process, khác với hash() của Python"""
+        return zlib.crc32(str(route).encode('utf-8')) % self.workers
+
+    def request(self, op: str, args: Optional[Dict[str, Any]] = None, route: Any = None) -> Dict[str, Any]:
+        """Gửi một request đến worker mà `route` ánh xạ tới và chờ response"""
+        request = {"op": op, "args": args or {}}
+        if self.workers <= 0:
+            response = handle(request)
+        else:
+            slot = self.slot(route)
+            worker = self._worker(slot)
+            try:
+                response = worker.submit(request).result(timeout=self.timeout)
+            except TimeoutError:
+                response = {"error": f"LSTM worker did not answer within {self.timeout}s"}
+            except WorkerExited:
+                self._discard(slot, worker)
+                response = {"error": "LSTM worker exited unexpectedly; it is restarted on the next request"}
+        with self._lock:
+            self.requests += 1
+            self.errors += "error" in response
+        return response
+
+    def _worker(self, slot: int) -> _Worker:
+        with self._lock:
+            worker = self._processes[slot]
+            if worker is None:
+                worker = _Worker(self.threads)
+                self._processes[slot] = worker
+            return worker
+
+    def _discard(self, slot: int, worker: _Worker) -> None:
+        with self._lock:
+            if self._processes[slot] is worker:
+                self._processes[slot] = None
+                self.restarts += 1
+        worker.close(wait=False)
+
+
+_default_pool: Optional[LSTMWorkerPool] = None
+_default_lock = threading.Lock()
+
+
+def get_default_lstm_pool() -> LSTMWorkerPool:
+    """
+    Pool dùng chung cho LSTM tool. LSTM_WORKERS là số worker (mặc định 1, 0 chạy trong process),
+    LSTM_WORKER_THREADS là số thread TensorFlow mỗi worker (mặc định số CPU / số worker) và
+    LSTM_WORKER_TIMEOUT là số giây chờ response (mặc định 0, không giới hạn).
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = LSTMWorkerPool(
+                workers=int(os.environ.get("LSTM_WORKERS", 1)),
+                threads=int(os.environ.get("LSTM_WORKER_THREADS", 0)) or None,
+                timeout=float(os.environ.get("LSTM_WORKER_TIMEOUT", 0)) or None
+            )
+        return _default_pool
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Vòng lặp của process worker: mỗi dòng stdin là một request, mỗi dòng stdout là response của nó"""
+    parser = argparse.ArgumentParser(description="LSTM worker: JSON-lines requests on stdin, responses on stdout")
+    parser.add_argument("--threads", type=int, default=1, help="TensorFlow intra-op threads")
+    args = parser.parse_args(argv)
+
+    # stdout chỉ dành cho response: mọi output khác (print, log của TensorFlow) chuyển sang stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    _init_worker(args.threads)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            message = json.dumps({"id": request_id, "response": handle(request)})
+        except (ValueError, TypeError, AttributeError) as e:
+            # Request không phải JSON object, hoặc response không tuần tự hoá được
+            message = json.dumps({"id": request_id, "response": {"error": f"Invalid LSTM worker message: {str(e)}"}})
+        protocol.write(message + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import numpy as np
+from typing import Dict, Any, Optional, Sequence
+from tools.indicator_engine import as_float_array
+
+# Số nến mỗi bên mà một đỉnh/đáy swing phải vượt trội
+SWING_WINDOW = 5
+
+# Các cửa sổ hồi quy cho độ dốc xu hướng, ngắn nhất trước
+TREND_WINDOWS = (10, 50, 200)
+
+# Nhãn xu hướng lấy từ cửa sổ ngắn nhất có ít nhất chừng này nến: R² của 10 nến chủ yếu là nhiễu.
+# Cửa sổ ngắn hơn (lịch sử chưa đủ dài) chỉ cho nhãn "Weak"
+TREND_LABEL_MIN_WINDOW = 50
+
+# Độ dốc tuyệt đối (% mỗi nến) dưới mức này là đi ngang, dù đường hồi quy khớp tốt đến đâu
+TREND_FLAT_SLOPE_PCT = 0.01
+
+
+def swing_points(highs, lows, window: int = SWING_WINDOW) -> Dict[str, np.ndarray]:
+    """
+    Chỉ số các đỉnh và đáy swing trên toàn chuỗi: nến i là đỉnh swing khi high của nó là
+    lớn nhất trong `2 * window + 1` nến quanh nó (đỉnh phẳng thì nến đầu tiên được chọn), đáy
+    tương tự. `window` nến cuối chưa thể xác nhận nên không bao giờ là swing.
+    """
+    highs, lows = as_float_array(highs), as_float_array(lows)
+    n = len(highs)
+    if n < 2 * window + 1:
+        empty = np.empty(0, dtype=np.intp)
+        return {"highs": empty, "lows": empty}
+    centre = slice(window, n - window)
+    # Cực trị của `window` nến trước/sau mỗi nến trung tâm, mỗi offset một lượt vectorized
+    high = np.where(np.isnan(highs), -np.inf, highs)
+    low = np.where(np.isnan(lows), np.inf, lows)
+    before_high, after_high = np.full(n - 2 * window, -np.inf), np.full(n - 2 * window, -np.inf)
+    before_low, after_low = np.full(n - 2 * window, np.inf), np.full(n - 2 * window, np.inf)
+    for offset in range(1, window + 1):
+        np.maximum(before_high, high[window - offset:n - window - offset], out=before_high)
+        np.maximum(after_high, high[window + offset:n - window + offset], out=after_high)
+        np.minimum(before_low, low[window - offset:n - window - offset], out=before_low)
+        np.minimum(after_low, low[window + offset:n - window + offset], out=after_low)
+    # Bên trái so sánh chặt, bên phải tính cả bằng: nến đầu của đỉnh phẳng là swing
+    return {
+        "highs": np.flatnonzero((high[centre] > before_high) & (high[centre] >= after_high)) + window,
+        "lows": np.flatnonzero((low[centre] < before_low) & (low[centre] <= after_low)) + window
+    }
+
+
+def cluster_zones(levels: np.ndarray, bars: np.ndarray, tolerance: float) -> Dict[str, np.ndarray]:
+    """
+    Gom các mức giá thành vùng rộng không quá `tolerance` theo log giá (độ rộng tương đối, nên
+    đúng ở mọi vùng giá): mỗi vùng bắt đầu từ mức thấp nhất chưa được gán và lấy mọi mức nằm
+    trong tolerance phía trên nó. Vòng lặp chạy một lần mỗi vùng, mỗi bước là một binary search.
+    Trả về các mảng low/high/level (trung bình)/touches/last_bar theo vùng.
+    """
+    if len(levels) == 0:
+        empty = np.empty(0)
+        return {"low": empty, "high": empty, "level": empty, "touches": empty.astype(np.intp),
+                "last_bar": empty.astype(np.intp)}
+    order = np.argsort(levels, kind="stable")
+    levels, bars = levels[order], bars[order]
+    log_levels = np.log(levels)
+    starts = [0]
+    while True:
+        end = int(np.searchsorted(log_levels, log_levels[starts[-1]] + tolerance, side="right"))
+        if end >= len(levels):
+            break
+        starts.append(end)
+    starts = np.asarray(starts)
+    touches = np.diff(np.r_[starts, len(levels)])
+    return {
+        "low": levels[starts],
+        "high": np.maximum.reduceat(levels, starts),
+        "level": np.add.reduceat(levels, starts) / touches,
+        "touches": touches,
+        "last_bar": np.maximum.reduceat(bars, starts)
+    }
+
+
+def support_resistance(prices, highs=None, lows=None, window: int = SWING_WINDOW,
+                       max_zones: int = 3, min_touches: int = 2,
+                       tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Các vùng hỗ trợ/kháng cự xếp hạng từ các điểm swing trên toàn bộ lịch sử.
+    - Đỉnh và đáy swing được gộp chung (kháng cự bị phá thành hỗ trợ) rồi gom vùng
+    - tolerance mặc định là trung vị biên độ nến so với giá đóng cửa (tối thiểu 0.1%)
+    - Vùng dưới giá hiện tại là hỗ trợ, trên là kháng cự. Trong `3 * max_zones` vùng gần giá
+      nhất mỗi bên (những vùng giá gặp trước), giữ các vùng có ít nhất `min_touches` lần chạm
+      nếu có, xếp theo số lần chạm rồi theo khoảng cách
+    `support`/`resistance` là mức của vùng gần nhất mỗi bên.
+    """
+    prices = as_float_array(prices)
+    highs = prices if highs is None else as_float_array(highs)
+    lows = prices if lows is None else as_float_array(lows)
+    swings = swing_points(highs, lows, window)
+    result = {"support": None, "resistance": None, "support_zones": [], "resistance_zones": [],
+              "swing_highs": int(len(swings["highs"])), "swing_lows": int(len(swings["lows"]))}
+    if len(swings["highs"]) + len(swings["lows"]) == 0:
+        return result
+
+    if tolerance is None:
+        ranges = (highs - lows) / prices
+        tolerance = max(float(np.nanmedian(ranges)) if np.isfinite(ranges).any() else 0.0, 0.001)
+
+    bars = np.concatenate([swings["highs"], swings["lows"]])
+    levels = np.concatenate([highs[swings["highs"]], lows[swings["lows"]]])
+    valid = np.isfinite(levels) & (levels > 0)
+    zones = cluster_zones(levels[valid], bars[valid], tolerance)
+
+    current = prices[-1]
+    last_index = len(prices) - 1
+    distance = (zones["level"] - current) / current * 100
+    for side, mask in (("support", zones["high"] < current), ("resistance", zones["low"] > current)):
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            continue
+        candidates = candidates[np.argsort(np.abs(distance[candidates]), kind="stable")[:3 * max_zones]]
+        result[side] = round(float(zones["level"][candidates[0]]), 2)
+        strong = candidates[zones["touches"][candidates] >= min_touches]
+        if len(strong):
+            candidates = strong
+        # lexsort: key cuối là key chính -> nhiều lần chạm nhất trước, rồi gần giá nhất
+        ranked = candidates[np.lexsort((np.abs(distance[candidates]), -zones["touches"][candidates]))]
+        result[f"{side}_zones"] = [{
+            "level": round(float(zones["level"][i]), 2),
+            "low": round(float(zones["low"][i]), 2),
+            "high": round(float(zones["high"][i]), 2),
+            "touches": int(zones["touches"][i]),
+            "distance_pct": round(float(distance[i]), 2),
+            "bars_since_touch": int(last_index - zones["last_bar"][i])
+        } for i in ranked[:max_zones]]
+    return result
+
+
+def regression_slopes(prices, windows: Sequence[int] = TREND_WINDOWS) -> Dict[str, Any]:
+    """
+    Độ dốc bình phương tối thiểu của `w` giá đóng cửa cuối cho mọi cửa sổ trong một phép nhân ma trận.
+    Mỗi cửa sổ thành một hàng trọng số hồi quy đã căn giữa (bằng 0 ngoài cửa sổ) cạnh một hàng
+    trọng số trung bình, nên `weights @ [y, y²]` cho độ dốc, trung bình và Σy² của mọi cửa sổ.
+    Độ dốc chuẩn hóa theo giá trung bình của cửa sổ (% mỗi nến), kèm R² (độ khớp).
+    """
+    prices = as_float_array(prices)
+    windows = [w for w in windows if 2 <= w <= len(prices)]
+    if not windows:
+        return {}
+    longest = max(windows)
+    # Trừ giá đóng cửa cuối để Σy² không quá lớn so với phương sai ở mức giá cỡ BTC
+    reference = prices[-1]
+    tail = prices[-longest:] - reference
+    weights = np.zeros((2 * len(windows), longest))
+    for row, w in enumerate(windows):
+        x = np.arange(w) - (w - 1) / 2
+        weights[2 * row, -w:] = x / (x @ x)
+        weights[2 * row + 1, -w:] = 1.0 / w
+    products = weights @ np.column_stack([tail, tail * tail])
+
+    slopes = {}
+    for row, w in enumerate(windows):
+        slope = products[2 * row, 0]
+        mean, mean_square = products[2 * row + 1]
+        sxx = w * (w * w - 1) / 12
+        syy = w * (mean_square - mean * mean)
+        r2 = slope * slope * sxx / syy if syy > 0 else 0.0
+        price = mean + reference
+        slopes[str(w)] = {
+            "slope_pct": round(float(slope / price * 100), 4) if price else None,
+            "r2": round(float(min(max(r2, 0.0), 1.0)), 3)
+        }
+    return slopes
+
+
+def trend_label(slope: Dict[str, Any], window: int = TREND_LABEL_MIN_WINDOW) -> str:
+    """
+    Hướng theo dấu của độ dốc chuẩn hóa, độ mạnh theo R². Độ dốc nhỏ hơn TREND_FLAT_SLOPE_PCT là
+    "Sideways"; "Strong" cần R² >= 0.6 trên cửa sổ `window` ít nhất TREND_LABEL_MIN_WINDOW nến
+    """
+    if not slope or slope["slope_pct"] is None:
+        return "Unknown"
+    if slope["r2"] < 0.2 or abs(slope["slope_pct"]) < TREND_FLAT_SLOPE_PCT:
+        return "Sideways"
+    direction = "Uptrend" if slope["slope_pct"] > 0 else "Downtrend"
+    strong = slope["r2"] >= 0.6 and window >= TREND_LABEL_MIN_WINDOW
+    return f"{'Strong' if strong else 'Weak'} {direction}"
+
+
+def label_window(slopes: Dict[str, Any]) -> Optional[str]:
+    """Cửa sổ quyết định nhãn: ngắn nhất đủ TREND_LABEL_MIN_WINDOW nến, không có thì dài nhất hiện có"""
+    if not slopes:
+        return None
+    windows = sorted(slopes, key=int)
+    return next((w for w in windows if int(w) >= TREND_LABEL_MIN_WINDOW), windows[-1])
+
+
+def market_structure(prices, highs=None, lows=None, windows: Sequence[int] = TREND_WINDOWS,
+                     swing_window: int = SWING_WINDOW, max_zones: int = 3) -> Dict[str, Any]:
+    """Vùng hỗ trợ/kháng cự và xu hướng nhiều cửa sổ cho `market_context`"""
+    slopes = regression_slopes(prices, windows)
+    window = label_window(slopes)
+    return {
+        "support_resistance": support_resistance(prices, highs, lows, swing_window, max_zones),
+        "trend_strength": trend_label(slopes[window], int(window)) if window else "Unknown",
+        "trend_slopes": slopes
+    }
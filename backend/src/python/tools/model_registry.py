@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from tools.single_flight import SingleFlight
+
+# Số phiên bản đã hoàn tất giữ lại mỗi model: bên đang load phiên bản trước vẫn đọc được khi có bản mới
+KEEP_VERSIONS = 2
+# Phiên bản chưa có meta.json lâu hơn mức này là lần lưu của process đã chết và được dọn
+PARTIAL_MAX_AGE_SECONDS = 3600
+
+
+class ModelKey(NamedTuple):
+    symbol: str
+    training_period: str
+    architecture: str
+
+
+class TrainedModel(NamedTuple):
+    """Model Keras cùng scaler dùng khi huấn luyện và metadata của nó (meta.json)"""
+    key: ModelKey
+    model: Any
+    scaler: Any
+    meta: Dict[str, Any]
+
+
+def architecture_hash(architecture: Dict[str, Any]) -> str:
+    """Hash ngắn, ổn định của cấu hình model/huấn luyện: thay đổi bất kỳ sẽ cho model mới"""
+    encoded = json.dumps(architecture, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class ModelRegistry:
+    """
+    Các model đã huấn luyện trên đĩa trong `<root>/<symbol>/<training_period>/<architecture hash>/`.
+    Mỗi lần lưu là một phiên bản bất biến `versions/<version>/` gồm model.keras (trọng số + kiến trúc),
+    scaler.pkl (scaler đã fit) và meta.json (trained_at, nến cuối, chỉ số validation); file CURRENT
+    trỏ tới phiên bản hiện hành và được thay bằng os.replace sau khi phiên bản ghi xong.
+    Nhờ vậy nhiều process lưu cùng model không ghi đè file của nhau, bên load luôn nhận model, scaler
+    và meta của cùng một lần lưu, còn phiên bản dở dang (chưa có meta.json) không bao giờ được trỏ tới.
+    - Model đã load nằm trong LRU bộ nhớ gồm `max_loaded` entry, nên lần gọi lặp lại không phải load Keras;
+      chỉ trả từ bộ nhớ khi CURRENT trên đĩa vẫn trỏ tới cùng phiên bản, nên model do process khác lưu
+      (scheduler chạy nền, worker khác) được dùng ở lần load kế tiếp
+    - `train` chạy qua SingleFlight: các bên gọi đồng thời cần cùng model chỉ huấn luyện một lần
+    - `is_stale` đúng khi lần huấn luyện đầy đủ gần nhất (meta "full_trained_at", không có thì
+      "trained_at") cũ hơn `max_age_seconds`; fine-tune ở giữa không đặt lại mốc này
+    """
+
+    def __init__(self, root: str = "data/models", max_age_seconds: float = 7 * 24 * 3600,
+                 error_ratio: float = 1.5, max_loaded: int = 8):
+        self.root = Path(root)
+        self.max_age_seconds = max_age_seconds
+        self.error_ratio = error_ratio
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[ModelKey, TrainedModel]" = OrderedDict()
+        self._versions: Dict[ModelKey, str] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.memory_hits = 0
+        self.disk_loads = 0
+        self.trainings = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_loads": self.disk_loads,
+                "trainings": self.trainings,
+                "loaded": len(self._loaded)
+            }
+
+    def key(self, symbol: str, training_period: str, architecture: Dict[str, Any]) -> ModelKey:
+        return ModelKey(symbol, training_period, architecture_hash(architecture))
+
+    def path(self, key: ModelKey) -> Path:
+        return self.root / key.symbol / key.training_period / key.architecture
+
+    def current_version(self, key: ModelKey) -> Optional[str]:
+        """Tên phiên bản CURRENT đang trỏ tới; None nếu model chưa từng được lưu xong"""
+        try:
+            return (self.path(key) / "CURRENT").read_text(encoding='utf-8').strip() or None
+        except OSError:
+            return None
+
+    def meta(self, key: ModelKey) -> Optional[Dict[str, Any]]:
+        """meta.json của model đã lưu mà không load model (không cần TensorFlow); None nếu chưa có"""
+        version = self.current_version(key)
+        if version is None:
+            return None
+        try:
+            with open(self.path(key) / "versions" / version / "meta.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: ModelKey) -> Optional[TrainedModel]:
+        """Model từ bộ nhớ, không có thì từ đĩa; None nếu chưa từng được huấn luyện"""
+        version = self.current_version(key)
+        if version is None:
+            return None
+        with self._lock:
+            trained = self._loaded.get(key)
+            if trained is not None and self._versions.get(key) == version:
+                self._loaded.move_to_end(key)
+                self.memory_hits += 1
+                return trained
+
+        directory = self.path(key) / "versions" / version
+        try:
+            with open(directory / "meta.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(directory / "scaler.pkl", 'rb') as f:
+                scaler = pickle.load(f)
+            model = self._load_model(directory / "model.keras")
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            # Phiên bản hỏng hoặc đã bị dọn: coi như chưa có, lần huấn luyện sau sẽ lưu phiên bản mới
+            return None
+
+        trained = TrainedModel(key, model, scaler, meta)
+        with self._lock:
+            self.disk_loads += 1
+            self._remember(trained, version)
+        return trained
+
+    def save(self, key: ModelKey, model: Any, scaler: Any, meta: Dict[str, Any]) -> TrainedModel:
+        meta = {**meta, "symbol": key.symbol, "training_period": key.training_period,
+                "architecture_hash": key.architecture, "trained_at": meta.get("trained_at", time.time())}
+
+        # Tên phiên bản duy nhất giữa các process và sắp theo thời gian; meta.json ghi sau cùng
+        # đánh dấu phiên bản hoàn tất, rồi CURRENT được thay nguyên tử để công bố cả phiên bản
+        version = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        directory = self.path(key) / "versions" / version
+        directory.mkdir(parents=True)
+        model.save(directory / "model.keras")
+        with open(directory / "scaler.pkl", 'wb') as f:
+            pickle.dump(scaler, f)
+        with open(directory / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        self._write_atomic(self.path(key) / "CURRENT", version.encode('utf-8'))
+        self._prune(self.path(key) / "versions", version)
+
+        trained = TrainedModel(key, model, scaler, meta)
+        with self._lock:
+            self._remember(trained, version)
+        return trained
+
+    def train(self, key: ModelKey, train: Callable[[], TrainedModel]) -> TrainedModel:
+        """Chạy `train` (nên kết thúc bằng `save`) một lần cho các bên gọi đồng thời cùng key"""
+        def run() -> TrainedModel:
+            trained = train()
+            with self._lock:
+                self.trainings += 1
+            return trained
+        return self._flights.do(key, run)
+
+    def is_stale(self, trained: TrainedModel, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - trained.meta.get("full_trained_at", trained.meta.get("trained_at", 0)) > self.max_age_seconds
+
+    def _remember(self, trained: TrainedModel, version: str) -> None:
+        self._loaded[trained.key] = trained
+        self._loaded.move_to_end(trained.key)
+        self._versions[trained.key] = version
+        while len(self._loaded) > self.max_loaded:
+            evicted, _ = self._loaded.popitem(last=False)
+            self._versions.pop(evicted, None)
+
+    @staticmethod
+    def _load_model(path: Path) -> Any:
+        from tensorflow.keras.models import load_model
+        return load_model(path)
+
+    @staticmethod
+    def _prune(versions: Path, current: str) -> None:
+        """
+        Xoá phiên bản cũ ngoài KEEP_VERSIONS phiên bản hoàn tất mới nhất; phiên bản chưa có meta.json
+        chỉ bị xoá khi quá PARTIAL_MAX_AGE_SECONDS (process khác có thể đang ghi nó)
+        """
+        now = time.time()
+        complete = []
+        for directory in sorted(versions.iterdir(), key=lambda p: p.name, reverse=True):
+            if directory.name == current:
+                continue
+            try:
+                if (directory / "meta.json").exists():
+                    complete.append(directory)
+                elif now - directory.stat().st_mtime > PARTIAL_MAX_AGE_SECONDS:
+                    shutil.rmtree(directory, ignore_errors=True)
+            except OSError:
+                continue
+        for directory in complete[KEEP_VERSIONS - 1:]:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def _write_atomic(path: Path, payload: bytes) -> None:
+        # Tên tạm riêng cho từng lần ghi để các process ghi cùng file không giẫm lên nhau
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_default_registry() -> ModelRegistry:
+    """
+    Registry dùng chung cho LSTM tool. LSTM_MODEL_DIR là thư mục (mặc định data/models),
+    LSTM_MODEL_MAX_AGE_HOURS là khoảng thời gian giữa hai lần huấn luyện lại đầy đủ (mặc định 168;
+    ở giữa thì fine-tune theo nến ngày) và LSTM_RETRAIN_ERROR_RATIO là mức sai số trên nến mới được
+    phép vượt sai số validation trước khi huấn luyện lại đầy đủ (mặc định 1.5).
+    """
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry(
+                root=os.environ.get("LSTM_MODEL_DIR", "data/models"),
+                max_age_seconds=float(os.environ.get("LSTM_MODEL_MAX_AGE_HOURS", 168)) * 3600,
+                error_ratio=float(os.environ.get("LSTM_RETRAIN_ERROR_RATIO", 1.5))
+            )
+        return _default_registry
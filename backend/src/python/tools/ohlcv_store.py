@@ -0,0 +1,311 @@
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Any, Optional
+from tools.timeframes import TIMEFRAMES, period_to_timedelta
+from tools.single_flight import SingleFlight
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Yahoo Finance trả nến intraday lùi về quá khứ tối đa bao xa
+INTRADAY_LIMITS = {
+    "1m": pd.Timedelta(days=7),
+    "5m": pd.Timedelta(days=60),
+    "15m": pd.Timedelta(days=60),
+    "30m": pd.Timedelta(days=60),
+    "1h": pd.Timedelta(days=730),
+    "2m": pd.Timedelta(days=60),
+    "60m": pd.Timedelta(days=730),
+    "90m": pd.Timedelta(days=60),
+}
+
+
+# Mỗi cột giá thành một chuỗi phân tách bằng dấu phẩy trong `read`; NULL (NaN khi ghi) thành "nan"
+_READ_COLUMNS = [
+    f"group_concat(CASE WHEN {column} IS NULL THEN 'nan' ELSE printf('%!.17g', {column}) END, ',')"
+    for column in ("open", "high", "low", "close", "volume")
+]
+
+
+def _parse(text: Optional[str], dtype) -> np.ndarray:
+    """Mảng từ một cột `group_concat` (None khi không có dòng nào khớp)"""
+    return np.fromstring(text, dtype=dtype, sep=',') if text else np.empty(0, dtype=dtype)
+
+
+def _utc_index(data: pd.DataFrame) -> pd.DataFrame:
+    index = pd.DatetimeIndex(data.index)
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    # Timestamp lưu dạng nanosecond từ epoch, bất kể provider dùng độ phân giải nào
+    data.index = index.as_unit("ns")
+    return data
+
+
+class OHLCVProvider:
+    """
+    Nguồn nến OHLCV cho kho. `fetch` trả về DataFrame có DatetimeIndex và các cột
+    Open/High/Low/Close/Volume cho mọi nến từ `start` trở đi
+    (start=None là toàn bộ lịch sử có được).
+    """
+
+    def fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class YahooFinanceProvider(OHLCVProvider):
+    """Yahoo Finance qua yfinance (import ở lần dùng đầu tiên)"""
+
+    def fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        limit = INTRADAY_LIMITS.get(interval)
+        if limit is not None:
+            # Yahoo từ chối yêu cầu intraday cũ hơn khoảng thời gian nó lưu giữ
+            earliest = pd.Timestamp.now(tz="UTC") - limit + pd.Timedelta(hours=1)
+            start = earliest if start is None else max(start, earliest)
+        if start is None:
+            return ticker.history(period="max", interval=interval)
+        return ticker.history(start=start.to_pydatetime(), interval=interval)
+
+
+class ReplayProvider(OHLCVProvider):
+    """
+    Phát lại offline các nến đã ghi từ `<directory>/<symbol>_<interval>.parquet` hoặc `.csv`
+    (cột CSV đầu tiên là timestamp). Thay Yahoo khi test và backfill.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+
+    def _load(self, symbol: str, interval: str) -> pd.DataFrame:
+        key = (symbol, interval)
+        if key not in self._frames:
+            stem = self.directory / f"{symbol}_{interval}"
+            if stem.with_suffix(".parquet").exists():
+                frame = pd.read_parquet(stem.with_suffix(".parquet"))
+            elif stem.with_suffix(".csv").exists():
+                frame = pd.read_csv(stem.with_suffix(".csv"), index_col=0, parse_dates=True)
+            else:
+                frame = pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz="UTC"))
+            self._frames[key] = _utc_index(frame).sort_index()
+        return self._frames[key]
+
+    def fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        frame = self._load(symbol, interval)
+        return frame if start is None else frame[frame.index >= start]
+
+
+class OHLCVStore:
+    """
+    Kho SQLite cục bộ chứa nến OHLCV theo key (symbol, interval).
+    - Yêu cầu đầu tiên cho một period tải nó một lần; các yêu cầu sau chỉ tải phần đuôi từ
+      nến cuối đã lưu (tính cả nến đó, nên nến chưa đóng được cập nhật)
+    - Các dòng được upsert theo (symbol, interval, timestamp), nên phần chồng lấn không bị trùng
+    - Phần đuôi được bổ sung tối đa mỗi `refresh_seconds`; giữa các lần đó đọc không chạm mạng
+    - Các lần tải giống nhau chạy đồng thời (cùng symbol, interval và khoảng) dùng chung một lần
+      tải qua SingleFlight; `stats()["coalesced"]` đếm số lần tải tiết kiệm được
+    - `version(symbol, interval)` tăng mỗi khi một lần merge thực sự thay đổi nến đã lưu, nên
+      các kết quả suy ra từ chúng có thể bị hủy mà không cần đọc lại
+    Kết quả đọc là các mảng NumPy (`arrays`) hoặc DataFrame cùng dạng yfinance (`history`).
+    """
+
+    def __init__(self, path: str = "data/ohlcv.sqlite", provider: Optional[OHLCVProvider] = None,
+                 refresh_seconds: float = 60):
+        self.path = path
+        self.provider = provider or YahooFinanceProvider()
+        self.refresh_seconds = refresh_seconds
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._flights = SingleFlight()
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.reads = 0
+        self.late_coalesced = 0
+        self.direct_fetches = 0
+        self._versions: Dict[tuple, int] = {}
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL, interval TEXT NOT NULL, ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, interval, ts)
+                ) WITHOUT ROWID""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT NOT NULL, interval TEXT NOT NULL,
+                    start_ts INTEGER, fetched_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )""")
+
+    def stats(self) -> Dict[str, Any]:
+        flights = self._flights.stats()
+        return {
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "reads": self.reads,
+            "direct_fetches": self.direct_fetches,
+            "coalesced": flights["coalesced"] + self.late_coalesced,
+            "in_flight": flights["in_flight"],
+            "max_waiters": flights["max_waiters"]
+        }
+
+    def version(self, symbol: str, interval: str) -> int:
+        """Bộ đếm thay đổi của các nến đã lưu cho (symbol, interval), bằng 0 cho đến lần lưu đầu"""
+        with self._lock:
+            return self._versions.get((symbol, interval), 0)
+
+    def history(self, symbol: str, period: str = "30d", interval: str = "1h") -> pd.DataFrame:
+        """Các nến phủ `period` đến hiện tại, bổ sung từ provider khi cần"""
+        arrays = self.arrays(symbol, period, interval)
+        return pd.DataFrame(
+            {column: arrays[column.lower()] for column in OHLCV_COLUMNS},
+            index=pd.DatetimeIndex(arrays["timestamp"]).tz_localize("UTC")
+        )
+
+    def arrays(self, symbol: str, period: str = "30d", interval: str = "1h") -> Dict[str, np.ndarray]:
+        """
+        Mảng timestamp (datetime64[ns], UTC) và các mảng float64 open/high/low/close/volume.
+        Interval kho không lưu (1wk, 1mo, 60m, 90m, ... của yfinance) được tải thẳng từ
+        provider mỗi lần, không cache
+        """
+        span = period_to_timedelta(period)
+        if interval not in TIMEFRAMES:
+            return self._fetch_direct(symbol, interval, None if span is None else pd.Timestamp.now(tz="UTC") - span)
+        # Bắt đầu tại ranh giới nến để các yêu cầu đồng thời cho cùng period có cùng key tải
+        start = None if span is None else (pd.Timestamp.now(tz="UTC") - span).floor(TIMEFRAMES[interval])
+        self.update(symbol, interval, start)
+        return self.read(symbol, interval, start)
+
+    def _fetch_direct(self, symbol: str, interval: str, start: Optional[pd.Timestamp]) -> Dict[str, np.ndarray]:
+        data = self.provider.fetch(symbol, interval, start)
+        with self._lock:
+            self.direct_fetches += 1
+        data = _utc_index(data.copy()).reindex(columns=OHLCV_COLUMNS).dropna(subset=["Close"])
+        data = data[~data.index.duplicated(keep="last")].sort_index()
+        if start is not None:
+            data = data[data.index >= start]
+        arrays = {"timestamp": data.index.asi8.view("datetime64[ns]")}
+        for column in OHLCV_COLUMNS:
+            arrays[column.lower()] = data[column].to_numpy(dtype=np.float64)
+        return arrays
+
+    def update(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> None:
+        """Bảo đảm các nến từ `start` (None = toàn bộ lịch sử) đến hiện tại đã được lưu"""
+        if interval not in TIMEFRAMES:
+            raise ValueError(f"Unsupported interval: {interval}")
+        decided_at = time.time()
+        with self._lock:
+            row = self._coverage(symbol, interval)
+            last_ts = self.last_timestamp(symbol, interval)
+        wanted_ts = None if start is None else start.value
+
+        # Tải ngoài lock của kho để các symbol khác nhau tải song song
+        if row is None or last_ts is None or (row[0] is not None and (wanted_ts is None or wanted_ts < row[0])):
+            # Chưa lưu gì, hoặc khoảng đã lưu bắt đầu sau period được yêu cầu
+            self._flights.do((symbol, interval, "full", wanted_ts),
+                             lambda: self._fetch(symbol, interval, start, wanted_ts, "full_fetches", decided_at))
+        elif decided_at - row[1] >= self.refresh_seconds:
+            self._flights.do((symbol, interval, "tail"),
+                             lambda: self._fetch(symbol, interval, pd.Timestamp(last_ts, tz="UTC"), row[0],
+                                                 "tail_fetches", decided_at))
+
+    def _coverage(self, symbol: str, interval: str) -> Optional[tuple]:
+        return self._conn.execute(
+            "SELECT start_ts, fetched_at FROM coverage WHERE symbol = ? AND interval = ?", (symbol, interval)
+        ).fetchone()
+
+    def _fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp], coverage_ts: Optional[int],
+               counter: str, decided_at: float) -> None:
+        with self._lock:
+            row = self._coverage(symbol, interval)
+            if row is not None and row[1] >= decided_at and (row[0] is None or (coverage_ts or 0) >= row[0]):
+                # Một lần tải giống hệt đã xong trong khoảng từ lúc kiểm tra đến giờ
+                self.late_coalesced += 1
+                return
+        data = self.provider.fetch(symbol, interval, start)
+        with self._lock:
+            self._merge(symbol, interval, data, coverage_ts)
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _merge(self, symbol: str, interval: str, data: pd.DataFrame, start_ts: Optional[int]) -> None:
+        rows = []
+        if data is not None and not data.empty:
+            data = _utc_index(data.copy())
+            data = data[~data.index.duplicated(keep="last")].dropna(subset=["Close"])
+            values = data.reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=np.float64)
+            timestamps = data.index.asi8
+            rows = [(symbol, interval, int(ts), *map(float, row)) for ts, row in zip(timestamps, values)]
+        changes = self._conn.total_changes
+        with self._conn:
+            # Nến giống hệt được giữ nguyên để chỉ thay đổi thật mới tăng version
+            self._conn.executemany(
+                "INSERT INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (symbol, interval, ts) DO UPDATE SET "
+                "open = excluded.open, high = excluded.high, low = excluded.low, "
+                "close = excluded.close, volume = excluded.volume "
+                "WHERE (open, high, low, close, volume) IS NOT "
+                "(excluded.open, excluded.high, excluded.low, excluded.close, excluded.volume)", rows
+            )
+            if self._conn.total_changes != changes:
+                self._versions[(symbol, interval)] = self._versions.get((symbol, interval), 0) + 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+                (symbol, interval, start_ts, time.time())
+            )
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Timestamp UTC (nanosecond) của nến mới nhất đã lưu"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(ts) FROM candles WHERE symbol = ? AND interval = ?", (symbol, interval)
+            ).fetchone()
+        return row[0] if row else None
+
+    def read(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+        """
+        Các nến đã lưu từ `start` dưới dạng mảng NumPy, không gọi provider.
+        SQLite ghép mỗi cột thành một chuỗi phân tách bằng dấu phẩy (REAL với 17 chữ số có nghĩa,
+        khôi phục float64 chính xác) để NumPy parse trực tiếp, không tạo object Python nào
+        cho từng nến
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT group_concat(ts, ','), {', '.join(_READ_COLUMNS)} FROM ("
+                "SELECT * FROM candles WHERE symbol = ? AND interval = ? AND ts >= ? ORDER BY ts)",
+                (symbol, interval, -2 ** 63 if start is None else start.value)
+            ).fetchone()
+            self.reads += 1
+        timestamps, *columns = row
+        arrays = {"timestamp": _parse(timestamps, np.int64).view("datetime64[ns]")}
+        for name, text in zip(("open", "high", "low", "close", "volume"), columns):
+            arrays[name] = _parse(text, np.float64)
+        return arrays
+
+
+_default_store: Optional[OHLCVStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_store() -> OHLCVStore:
+    """
+    Kho dùng chung cho các tool. OHLCV_STORE_PATH là file SQLite (mặc định data/ohlcv.sqlite),
+    OHLCV_REPLAY_DIR chuyển sang provider phát lại offline, OHLCV_REFRESH_SECONDS là chu kỳ bổ sung.
+    """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            replay_dir = os.environ.get("OHLCV_REPLAY_DIR")
+            _default_store = OHLCVStore(
+                path=os.environ.get("OHLCV_STORE_PATH", "data/ohlcv.sqlite"),
+                provider=ReplayProvider(replay_dir) if replay_dir else YahooFinanceProvider(),
+                refresh_seconds=float(os.environ.get("OHLCV_REFRESH_SECONDS", 60))
+            )
+        return _default_store
@@ -0,0 +1,161 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Optional, Sequence, NamedTuple, Tuple
+from tools.indicator_engine import as_float_array
+from tools.technical_indicators import TechnicalIndicators
+from tools.timeframes import resample_ohlcv
+
+SERIES = ('prices', 'volumes', 'highs', 'lows')
+
+
+class IndicatorJob(NamedTuple):
+    """Một lượt tính chỉ báo cho một mã trên một khung thời gian"""
+    symbol: str
+    timeframe: Optional[str]
+    prices: np.ndarray
+    volumes: Optional[np.ndarray] = None
+    highs: Optional[np.ndarray] = None
+    lows: Optional[np.ndarray] = None
+    indicators: Optional[List[str]] = None
+
+
+# Mô tả job gửi sang worker: chỉ có vị trí (offset, length) của từng chuỗi trong vùng shared memory
+_Descriptor = Tuple[str, Optional[str], Optional[List[str]], Tuple[Optional[Tuple[int, int]], ...]]
+
+
+def _run_chunk(shm_name: str, descriptors: List[_Descriptor]) -> List[Dict[str, Any]]:
+    """Chạy trong worker: gắn vào shared memory và tính trên các view, không sao chép dữ liệu"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buffer = np.ndarray((shm.size // 8,), dtype=np.float64, buffer=shm.buf)
+        results = []
+        for symbol, timeframe, indicators, spans in descriptors:
+            prices, volumes, highs, lows = (
+                None if span is None else buffer[span[0]:span[0] + span[1]] for span in spans
+            )
+            results.append(_calculate(symbol, timeframe, prices, volumes, highs, lows, indicators))
+            del prices, volumes, highs, lows
+        del buffer
+        return results
+    finally:
+        shm.close()
+
+
+def _calculate(symbol: str, timeframe: Optional[str], prices, volumes, highs, lows,
+               indicators: Optional[List[str]]) -> Dict[str, Any]:
+    try:
+        result = TechnicalIndicators.calculate_multiple_indicators(prices, volumes, highs, lows, indicators)
+    except Exception as e:
+        result = {"error": f"Lỗi tính chỉ báo: {str(e)}"}
+    return {"symbol": symbol, "timeframe": timeframe, "candles": int(len(prices)), "result": result}
+
+
+class ParallelIndicatorExecutor:
+    """
+    Chạy `calculate_multiple_indicators` cho nhiều job (mã × khung thời gian) trên process pool.
+    - Dữ liệu của mọi job được ghép vào một vùng shared memory duy nhất; worker chỉ nhận tên vùng
+      và vị trí các chuỗi nên không phải pickle list giá
+    - Job được gom thành từng chunk `chunk_size` job cho mỗi lần gửi sang worker
+    - Kết quả trả về theo đúng thứ tự job
+    max_workers/chunk_size mặc định lấy từ INDICATOR_WORKERS/INDICATOR_CHUNK_SIZE;
+    max_workers=1 tính ngay trong process hiện tại
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                 mp_context=None):
+        self.max_workers = max_workers or int(os.environ.get("INDICATOR_WORKERS", 0)) or os.cpu_count() or 1
+        self.chunk_size = chunk_size or int(os.environ.get("INDICATOR_CHUNK_SIZE", 0)) or None
+        self.mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelIndicatorExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Pool được giữ lại giữa các lần map để không phải khởi động lại worker
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+        return self._pool
+
+    def _chunk_size(self, job_count: int) -> int:
+        if self.chunk_size:
+            return self.chunk_size
+        # Khoảng 4 chunk cho mỗi worker để cân bằng tải khi độ dài lịch sử khác nhau
+        return max(1, math.ceil(job_count / (self.max_workers * 4)))
+
+    def map(self, jobs: Sequence[IndicatorJob]) -> List[Dict[str, Any]]:
+        """Kết quả {"symbol", "timeframe", "candles", "result"} cho từng job, theo thứ tự job"""
+        jobs = [job._replace(**{name: as_float_array(getattr(job, name)) for name in SERIES}) for job in jobs]
+        if not jobs:
+            return []
+        if self.max_workers == 1:
+            return [_calculate(job.symbol, job.timeframe, job.prices, job.volumes, job.highs, job.lows,
+                               job.indicators) for job in jobs]
+
+        total = sum(len(getattr(job, name)) for job in jobs for name in SERIES if getattr(job, name) is not None)
+        shm = shared_memory.SharedMemory(create=True, size=max(8, total * 8))
+        try:
+            buffer = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+            descriptors = []
+            offset = 0
+            for job in jobs:
+                spans = []
+                for name in SERIES:
+                    values = getattr(job, name)
+                    if values is None:
+                        spans.append(None)
+                        continue
+                    buffer[offset:offset + len(values)] = values
+                    spans.append((offset, len(values)))
+                    offset += len(values)
+                descriptors.append((job.symbol, job.timeframe, job.indicators, tuple(spans)))
+            del buffer
+
+            size = self._chunk_size(len(descriptors))
+            pool = self._get_pool()
+            futures = [pool.submit(_run_chunk, shm.name, descriptors[i:i + size])
+                       for i in range(0, len(descriptors), size)]
+            return [result for future in futures for result in future.result()]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def run(self, data: Dict[str, pd.DataFrame], timeframes: Optional[List[str]] = None,
+            indicators: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Fan-out mã × khung thời gian: `data` là OHLCV (như yfinance) theo mã; mỗi khung thời gian
+        được resample trong process chính rồi tính song song. timeframes=None tính trên nến gốc
+        """
+        return self.map(build_jobs(data, timeframes, indicators))
+
+
+def build_jobs(data: Dict[str, pd.DataFrame], timeframes: Optional[List[str]] = None,
+               indicators: Optional[List[str]] = None) -> List[IndicatorJob]:
+    jobs = []
+    for symbol, frame in data.items():
+        for timeframe in (timeframes or [None]):
+            candles = resample_ohlcv(frame, timeframe) if timeframe else frame
+            column = lambda name: candles[name].to_numpy() if name in candles.columns else None
+            jobs.append(IndicatorJob(symbol, timeframe, column('Close'), column('Volume'),
+                                     column('High'), column('Low'), indicators))
+    return jobs
+
+
+def calculate_parallel(data: Dict[str, pd.DataFrame], timeframes: Optional[List[str]] = None,
+                       indicators: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Một lượt tính song song với pool tạm thời (xem ParallelIndicatorExecutor)"""
+    with ParallelIndicatorExecutor(max_workers, chunk_size) as executor:
+        return executor.run(data, timeframes, indicators)
@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from tools.single_flight import SingleFlight
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'version')
+
+    def __init__(self, value: str, expires_at: float, version: Hashable):
+        self.value = value
+        self.expires_at = expires_at
+        self.version = version
+
+
+class ResultCache:
+    """
+    LRU trong bộ nhớ cho kết quả tool đã hoàn tất (chuỗi JSON), mỗi entry có hạn riêng.
+    - Entry được trả về đến `expires_at` (lần đóng nến kế tiếp với tool) và chỉ khi phiên bản
+      dữ liệu của bên gọi vẫn trùng với phiên bản lúc tính
+    - `compute` chạy qua SingleFlight, nên các lần miss đồng thời cho một key chỉ tính một lần
+    - Chuỗi là bất biến, nên lần trúng trả về đúng object đã lưu, không sao chép
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: Hashable, version: Hashable = None) -> Optional[str]:
+        """Giá trị đã cache, hoặc None khi không có, đã quá hạn hay được tính từ phiên bản khác"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at <= now:
+                    self.expired += 1
+                elif entry.version != version:
+                    self.invalidated += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: str, expires_at: float, version: Hashable = None) -> None:
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = _Entry(value, expires_at, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def coalesce(self, key: Hashable, compute) -> Any:
+        """Chạy `compute` một lần cho các bên gọi đồng thời cùng key"""
+        return self._flights.do(key, compute)
+
+
+_default_cache: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_result_cache() -> ResultCache:
+    """Cache kết quả dùng chung cho các tool; TA_RESULT_CACHE_ENTRIES là kích thước (0 để tắt)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(max_entries=int(os.environ.get("TA_RESULT_CACHE_ENTRIES", 512)))
+        return _default_cache
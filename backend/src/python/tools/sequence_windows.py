@@ -0,0 +1,61 @@
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Optional, Tuple
+
+# Trên số cửa sổ huấn luyện này, LSTM được nạp qua pipeline tf.data dạng streaming thay vì mảng
+STREAMING_MIN_WINDOWS = int(os.environ.get("LSTM_STREAMING_MIN_WINDOWS", 50_000))
+
+
+def sliding_windows(series: np.ndarray, seq_length: int, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Các cửa sổ huấn luyện dạng view strided chỉ đọc của `series` (1 chiều, hoặc (n, 1) như scaler trả về):
+    X[i] = series[i:i + seq_length], y[i] = `horizon` giá trị kế tiếp (1 chiều khi horizon=1).
+    Không sao chép gì, nên bộ nhớ chỉ bằng kích thước chuỗi dù cửa sổ dài bao nhiêu.
+    """
+    series = np.asarray(series)
+    if series.ndim == 2:
+        series = series[:, 0]
+    count = max(len(series) - seq_length - horizon + 1, 0)
+    if count == 0:
+        return np.empty((0, seq_length), dtype=series.dtype), np.empty((0,) if horizon == 1 else (0, horizon), dtype=series.dtype)
+    X = sliding_window_view(series, seq_length)[:count]
+    targets = series[seq_length:]
+    y = targets[:count] if horizon == 1 else sliding_window_view(targets, horizon)[:count]
+    return X, y
+
+
+def window_dataset(series: np.ndarray, seq_length: int, horizon: int = 1, indices: Optional[np.ndarray] = None,
+                   batch_size: int = 32, shuffle: bool = False, seed: Optional[int] = None,
+                   with_targets: bool = True):
+    """
+    Pipeline tf.data trên các cửa sổ của `series`: chỉ chỉ số bắt đầu cửa sổ được xáo trộn và
+    chia batch; mỗi batch lấy đầu vào (batch, seq_length, 1) từ tensor của chuỗi ngay lúc chạy
+    và batch kế tiếp được prefetch trong khi model huấn luyện. Bộ nhớ đỉnh là chuỗi cộng vài
+    batch, nên lịch sử theo giờ hoặc phút nhiều năm vẫn huấn luyện được mà không tạo ra mọi cửa sổ.
+    `indices` chọn cửa sổ (ví dụ phần train hoặc validation), mặc định là tất cả.
+    """
+    import tensorflow as tf
+
+    series = np.asarray(series, dtype=np.float32)
+    if series.ndim == 2:
+        series = series[:, 0]
+    count = max(len(series) - seq_length - horizon + 1, 0)
+    if indices is None:
+        indices = np.arange(count)
+
+    values = tf.constant(series)
+    input_offsets = tf.range(seq_length, dtype=tf.int64)
+    target_offsets = tf.range(horizon, dtype=tf.int64) + seq_length
+
+    def gather(starts):
+        inputs = tf.gather(values, starts[:, None] + input_offsets)[..., None]
+        if not with_targets:
+            return inputs
+        targets = tf.gather(values, starts[:, None] + target_offsets)
+        return inputs, (targets[:, 0] if horizon == 1 else targets)
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if shuffle:
+        dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,495 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Any, Optional, List
+from tools.indicator_engine import IndicatorEngine, ewm_mean
+from tools.technical_indicators import TechnicalIndicators
+
+
+class _EwmState:
+    """
+    Trạng thái EWM (adjust=True) cập nhật O(1), khớp với pandas `ewm(...).mean()`
+    y_t = num_t / den_t, num_t = x_t + (1 - alpha) * num_{t-1}, den_t = 1 + (1 - alpha) * den_{t-1}
+    """
+
+    def __init__(self, alpha: float):
+        self.decay = 1 - alpha
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+
+    def seed(self, values) -> None:
+        """Khởi tạo trạng thái từ lịch sử bằng một lần tính vector hóa"""
+        self.count = len(values)
+        if self.count == 0:
+            return
+        last = float(ewm_mean(values, alpha=1 - self.decay)[-1])
+        self.den = (1 - self.decay ** self.count) / (1 - self.decay)
+        self.num = last * self.den
+
+    def update(self, value: float) -> float:
+        self.num = value + self.decay * self.num
+        self.den = 1 + self.decay * self.den
+        self.count += 1
+        return self.num / self.den
+
+    @property
+    def value(self) -> float:
+        return self.num / self.den if self.count else math.nan
+
+
+def _span_alpha(span: int) -> float:
+    return 2 / (span + 1)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Phép chia theo ngữ nghĩa NumPy (x/0 -> inf, 0/0 -> NaN) để khớp với bản batch"""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return math.nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class _RollingSums:
+    """
+    Tổng và tổng bình phương trượt của `period` giá trị cuối, cập nhật O(1) mỗi nến.
+    Các tổng lấy trên độ lệch so với `shift` (một giá trị trong cửa sổ) để tránh triệt tiêu số ở mức
+    giá cỡ BTC, và được tính lại bằng fsum sau mỗi `period` lần cập nhật nên sai số không tích lũy
+    (chi phí khấu hao vẫn O(1)). Giá trị NaN/inf không vào tổng: khi cửa sổ có chúng thì tính trực tiếp
+    trên cửa sổ như bản batch
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.shift = 0.0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.nonfinite = 0
+        self._updates = 0
+
+    def extend(self, values) -> None:
+        self.window.extend(values)
+        self._resum()
+
+    def append(self, value: float) -> None:
+        if len(self.window) == self.period:
+            self._remove(self.window[0])
+        self.window.append(value)
+        if math.isfinite(value):
+            delta = value - self.shift
+            self.sum += delta
+            self.sum_squares += delta * delta
+        else:
+            self.nonfinite += 1
+        self._updates += 1
+        if self._updates >= self.period:
+            self._resum()
+
+    def _remove(self, value: float) -> None:
+        if math.isfinite(value):
+            delta = value - self.shift
+            self.sum -= delta
+            self.sum_squares -= delta * delta
+        else:
+            self.nonfinite -= 1
+
+    def _resum(self) -> None:
+        finite = [x for x in self.window if math.isfinite(x)]
+        self.shift = finite[-1] if finite else 0.0
+        self.sum = math.fsum(x - self.shift for x in finite)
+        self.sum_squares = math.fsum((x - self.shift) ** 2 for x in finite)
+        self.nonfinite = len(self.window) - len(finite)
+        self._updates = 0
+
+    def mean(self) -> float:
+        if self.nonfinite:
+            return sum(self.window) / len(self.window)
+        return self.shift + self.sum / len(self.window)
+
+    def variance(self, ddof: int = 1) -> float:
+        n = len(self.window)
+        if self.nonfinite:
+            mean = self.mean()
+            return sum((x - mean) ** 2 for x in self.window) / (n - ddof)
+        return max(self.sum_squares - self.sum * self.sum / n, 0.0) / (n - ddof)
+
+
+class _RollingExtreme:
+    """
+    Max (hoặc min) trượt của `period` giá trị cuối bằng deque đơn điệu, O(1) khấu hao mỗi nến.
+    Cửa sổ có NaN thì dùng max()/min() trực tiếp để giữ đúng kết quả như trước
+    """
+
+    def __init__(self, period: int, largest: bool = True):
+        self.period = period
+        self.largest = largest
+        self.window = deque(maxlen=period)
+        self._candidates = deque()
+        self._index = 0
+        self._nans = 0
+
+    def extend(self, values) -> None:
+        for value in values:
+            self.append(value)
+
+    def append(self, value: float) -> None:
+        if len(self.window) == self.period and math.isnan(self.window[0]):
+            self._nans -= 1
+        self.window.append(value)
+        if math.isnan(value):
+            self._nans += 1
+        else:
+            while self._candidates and (self._candidates[-1][1] <= value if self.largest
+                                        else self._candidates[-1][1] >= value):
+                self._candidates.pop()
+            self._candidates.append((self._index, value))
+        self._index += 1
+        while self._candidates and self._candidates[0][0] <= self._index - 1 - self.period:
+            self._candidates.popleft()
+
+    @property
+    def value(self) -> float:
+        if self._nans or not self._candidates:
+            return (max if self.largest else min)(self.window)
+        return self._candidates[0][1]
+
+
+class StreamingIndicator(ABC):
+    """
+    Lớp cơ sở cho chỉ báo dạng stream: khởi tạo từ lịch sử một lần (`from_history`),
+    sau đó mỗi nến mới gọi `update(close, high, low, volume)` với chi phí O(1) (khấu hao với các
+    chỉ báo cửa sổ: tổng trượt và deque đơn điệu, không duyệt lại cả cửa sổ).
+    Lớp con thiếu `seed`/`update`/`result` sẽ lỗi ngay khi khởi tạo
+    """
+
+    @abstractmethod
+    def seed(self, engine: IndicatorEngine) -> "StreamingIndicator":
+        """Khởi tạo trạng thái từ lịch sử"""
+
+    @abstractmethod
+    def update(self, close: float, high: Optional[float] = None, low: Optional[float] = None,
+               volume: Optional[float] = None) -> Dict[str, Any]:
+        """Cập nhật với một nến mới, trả về kết quả hiện tại"""
+
+    @abstractmethod
+    def result(self) -> Dict[str, Any]:
+        """Kết quả hiện tại theo định dạng của bản batch"""
+
+    @classmethod
+    def from_history(cls, prices: List[float], highs: Optional[List[float]] = None,
+                     lows: Optional[List[float]] = None, volumes: Optional[List[float]] = None,
+                     **params) -> "StreamingIndicator":
+        return cls(**params).seed(IndicatorEngine(prices, volumes, highs, lows))
+
+
+class StreamingRSI(StreamingIndicator):
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._gain = _EwmState(1 / period)
+        self._loss = _EwmState(1 / period)
+        self._prev_close: Optional[float] = None
+        self.value = math.nan
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingRSI":
+        if len(engine):
+            delta = engine.diff()
+            self._gain.seed(IndicatorEngine.gains(delta))
+            self._loss.seed(IndicatorEngine.losses(delta))
+            self._prev_close = float(engine.close[-1])
+            self.value = float(engine.rsi(self.period)[-1])
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        delta = close - self._prev_close if self._prev_close is not None else 0.0
+        avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+        self._prev_close = close
+        if self._gain.count < self.period:
+            self.value = math.nan
+        else:
+            rs = _divide(avg_gain, avg_loss)
+            self.value = 100 - (100 / (1 + rs))
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self._gain.count < self.period + 1:
+            return {"error": "Không đủ dữ liệu để tính RSI"}
+        signal, message = TechnicalIndicators._rsi_signal(self.value)
+        return {
+            "indicator": "RSI",
+            "value": round(self.value, 2),
+            "signal": signal,
+            "message": message,
+            "period": self.period
+        }
+
+
+class StreamingEMA(StreamingIndicator):
+    def __init__(self, period: int = 21):
+        self.period = period
+        self._ema = _EwmState(_span_alpha(period))
+        self.close = math.nan
+        self.value = math.nan
+        self.prev_value = math.nan
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingEMA":
+        if len(engine):
+            self._ema.seed(engine.close)
+            ema = engine.ema(self.period)
+            self.value = float(ema[-1])
+            self.prev_value = float(ema[-2]) if len(ema) >= 2 else math.nan
+            self.close = float(engine.close[-1])
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        self.prev_value = self.value
+        self.value = self._ema.update(close)
+        self.close = close
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self._ema.count < self.period:
+            return {"error": "Không đủ dữ liệu để tính EMA"}
+        slope = (self.value - self.prev_value) / self.prev_value * 100 if self._ema.count >= 2 else 0
+        signal, message = TechnicalIndicators._moving_average_signal("EMA", self.period, self.close, self.value, slope)
+        return {
+            "indicator": f"EMA_{self.period}",
+            "current_price": round(self.close, 2),
+            "ema_value": round(self.value, 2),
+            "signal": signal,
+            "message": message,
+            "ema_slope": round(slope, 4)
+        }
+
+
+class StreamingSMA(StreamingIndicator):
+    def __init__(self, period: int = 20):
+        self.period = period
+        self._window = _RollingSums(period)
+        self.count = 0
+        self.close = math.nan
+        self.value = math.nan
+        self.prev_value = math.nan
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingSMA":
+        if len(engine):
+            self._window.extend(engine.close[-self.period:].tolist())
+            self.count = len(engine)
+            sma = engine.sma(self.period)
+            self.value = float(sma[-1])
+            self.prev_value = float(sma[-2]) if len(sma) >= 2 else math.nan
+            self.close = float(engine.close[-1])
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        self._window.append(close)
+        self.count += 1
+        self.prev_value = self.value
+        self.value = self._window.mean() if self.count >= self.period else math.nan
+        self.close = close
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self.count < self.period:
+            return {"error": "Không đủ dữ liệu để tính SMA"}
+        slope = (self.value - self.prev_value) / self.prev_value * 100 if self.count >= 2 else 0
+        signal, message = TechnicalIndicators._moving_average_signal("SMA", self.period, self.close, self.value, slope)
+        return {
+            "indicator": f"SMA_{self.period}",
+            "current_price": round(self.close, 2),
+            "sma_value": round(self.value, 2),
+            "signal": signal,
+            "message": message,
+            "sma_slope": round(slope, 4)
+        }
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.period = period
+        self.std_dev = std_dev
+        self._window = _RollingSums(period)
+        self.count = 0
+        self.close = math.nan
+        self.upper = self.middle = self.lower = math.nan
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingBollingerBands":
+        if len(engine):
+            self._window.extend(engine.close[-self.period:].tolist())
+            self.count = len(engine)
+            upper, middle, lower = engine.bollinger(self.period, self.std_dev)
+            self.upper, self.middle, self.lower = float(upper[-1]), float(middle[-1]), float(lower[-1])
+            self.close = float(engine.close[-1])
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        self._window.append(close)
+        self.count += 1
+        self.close = close
+        if self.count >= self.period:
+            middle = self._window.mean()
+            std = math.sqrt(self._window.variance())
+            self.upper, self.middle, self.lower = middle + std * self.std_dev, middle, middle - std * self.std_dev
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self.count < self.period:
+            return {"error": "Không đủ dữ liệu để tính Bollinger Bands"}
+        band_position = _divide(self.close - self.lower, self.upper - self.lower)
+        signal, message = TechnicalIndicators._bollinger_signal(self.close, self.upper, self.middle, self.lower)
+        return {
+            "indicator": "BOLLINGER_BANDS",
+            "current_price": round(self.close, 2),
+            "upper_band": round(self.upper, 2),
+            "middle_band": round(self.middle, 2),
+            "lower_band": round(self.lower, 2),
+            "signal": signal,
+            "message": message,
+            "bandwidth": round(_divide(self.upper - self.lower, self.middle) * 100, 2),
+            "band_position": round(band_position, 2)
+        }
+
+
+class StreamingMACD(StreamingIndicator):
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self._fast = _EwmState(_span_alpha(fast_period))
+        self._slow = _EwmState(_span_alpha(slow_period))
+        self._signal = _EwmState(_span_alpha(signal_period))
+        self.macd = self.signal = self.histogram = math.nan
+        self.prev_histogram = 0.0
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingMACD":
+        if len(engine):
+            self._fast.seed(engine.close)
+            self._slow.seed(engine.close)
+            macd_line, signal_line, histogram = engine.macd(self.fast_period, self.slow_period, self.signal_period)
+            self._signal.seed(macd_line)
+            self.macd, self.signal, self.histogram = float(macd_line[-1]), float(signal_line[-1]), float(histogram[-1])
+            self.prev_histogram = float(histogram[-2]) if len(histogram) > 1 else 0.0
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        self.prev_histogram = self.histogram if self._signal.count else 0.0
+        self.macd = self._fast.update(close) - self._slow.update(close)
+        self.signal = self._signal.update(self.macd)
+        self.histogram = self.macd - self.signal
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self._signal.count < self.slow_period + self.signal_period:
+            return {"error": "Không đủ dữ liệu để tính MACD"}
+        trend, message = TechnicalIndicators._macd_signal(self.macd, self.signal, self.histogram, self.prev_histogram)
+        return {
+            "indicator": "MACD",
+            "macd": round(self.macd, 4),
+            "signal": round(self.signal, 4),
+            "histogram": round(self.histogram, 4),
+            "trend": trend,
+            "message": message
+        }
+
+
+class StreamingStochastic(StreamingIndicator):
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.k_period = k_period
+        self.d_period = d_period
+        self._highs = _RollingExtreme(k_period, largest=True)
+        self._lows = _RollingExtreme(k_period, largest=False)
+        self._k_values = deque(maxlen=d_period)
+        self.count = 0
+        self.k = self.d = math.nan
+        self.prev_k = self.prev_d = math.nan
+
+    def seed(self, engine: IndicatorEngine) -> "StreamingStochastic":
+        if len(engine):
+            self._highs.extend(engine.high[-self.k_period:].tolist())
+            self._lows.extend(engine.low[-self.k_period:].tolist())
+            k_percent, d_percent = engine.stochastic(self.k_period, self.d_period)
+            self._k_values.extend(k_percent[-self.d_period:].tolist())
+            self.count = len(engine)
+            self.k, self.d = float(k_percent[-1]), float(d_percent[-1])
+            self.prev_k = float(k_percent[-2]) if len(k_percent) > 1 else self.k
+            self.prev_d = float(d_percent[-2]) if len(d_percent) > 1 else self.d
+        return self
+
+    def update(self, close, high=None, low=None, volume=None) -> Dict[str, Any]:
+        # Thiếu high/low thì dùng giá đóng cửa như bản batch
+        self._highs.append(close if high is None else high)
+        self._lows.append(close if low is None else low)
+        self.count += 1
+        self.prev_k, self.prev_d = self.k, self.d
+        if self.count >= self.k_period:
+            lowest_low = self._lows.value
+            self.k = _divide(close - lowest_low, self._highs.value - lowest_low) * 100
+        else:
+            self.k = math.nan
+        self._k_values.append(self.k)
+        if len(self._k_values) == self.d_period and not any(math.isnan(k) for k in self._k_values):
+            self.d = math.fsum(self._k_values) / self.d_period
+        else:
+            self.d = math.nan
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        if self.count < self.k_period + self.d_period:
+            return {"error": "Không đủ dữ liệu để tính Stochastic"}
+        signal, message = TechnicalIndicators._stochastic_signal(self.k, self.d, self.prev_k, self.prev_d)
+        return {
+            "indicator": "STOCHASTIC",
+            "k_percent": round(self.k, 2),
+            "d_percent": round(self.d, 2),
+            "signal": signal,
+            "message": message,
+            "k_period": self.k_period,
+            "d_period": self.d_period
+        }
+
+
+class StreamingIndicatorSet:
+    """
+    Bộ chỉ báo stream mặc định (giống `calculate_multiple_indicators`) cho cập nhật theo từng tick.
+    `update` trả về kết quả từng chỉ báo và phần tổng hợp `summary`
+    """
+
+    INDICATOR_CLASSES = {
+        'rsi': StreamingRSI,
+        'macd': StreamingMACD,
+        'bollinger': StreamingBollingerBands,
+        'ema': StreamingEMA,
+        'sma': StreamingSMA,
+        'stochastic': StreamingStochastic
+    }
+
+    def __init__(self, indicators: Optional[List[str]] = None):
+        if indicators is None:
+            indicators = list(self.INDICATOR_CLASSES)
+        self.indicators = {
+            name.lower(): self.INDICATOR_CLASSES[name.lower()]()
+            for name in indicators if name.lower() in self.INDICATOR_CLASSES
+        }
+
+    @classmethod
+    def from_history(cls, prices: List[float], highs: Optional[List[float]] = None,
+                     lows: Optional[List[float]] = None, volumes: Optional[List[float]] = None,
+                     indicators: Optional[List[str]] = None) -> "StreamingIndicatorSet":
+        stream = cls(indicators)
+        engine = IndicatorEngine(prices, volumes, highs, lows)
+        for indicator in stream.indicators.values():
+            indicator.seed(engine)
+        return stream
+
+    def update(self, close: float, high: Optional[float] = None, low: Optional[float] = None,
+               volume: Optional[float] = None) -> Dict[str, Any]:
+        results = {}
+        for name, indicator in self.indicators.items():
+            try:
+                results[name] = indicator.update(close, high, low, volume)
+            except Exception as e:
+                results[name] = {"error": f"Lỗi tính {name}: {str(e)}"}
+        results['summary'] = TechnicalIndicators.summarize_signals(results)
+        return results
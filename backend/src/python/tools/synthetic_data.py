@@ -0,0 +1,56 @@
+import numpy as np
+from typing import Optional
+import pandas as pd
+from tools.timeframes import TIMEFRAMES, period_to_timedelta
+from tools.ohlcv_store import OHLCVProvider
+
+
+def random_walk_ohlcv(points: int, interval: str = "1h", seed: int = 42, start_price: float = 30000.0,
+                      volatility: float = 0.01, end: str = "2024-01-01") -> pd.DataFrame:
+    """
+    Nến OHLCV tổng hợp từ random walk hình học, cùng dạng với history của yfinance
+    (DatetimeIndex, các cột Open/High/Low/Close/Volume). Cùng seed cho cùng kết quả.
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, points)))
+    open_ = np.empty(points)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0, volatility / 2, (2, points)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(mean=10, sigma=0.5, size=points)
+    index = pd.date_range(end=pd.Timestamp(end, tz="UTC"), periods=points, freq=TIMEFRAMES[interval])
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+def period_points(period: str, interval: str) -> int:
+    """Số nến mà một period kiểu yfinance ("30d", "1y", "max") trải qua ở một interval"""
+    span = period_to_timedelta(period)
+    if span is None:
+        return 10_000
+    return max(1, int(span / TIMEFRAMES[interval]))
+
+
+class SyntheticProvider(OHLCVProvider):
+    """
+    Thay thế offline cho việc tải từ Yahoo Finance: `history(symbol, period, interval)` trả về
+    nến random walk, seed suy ra từ symbol nên các lần gọi lặp lại cho cùng kết quả.
+    `points` cố định thì bỏ qua độ dài period. Dùng được làm provider của OHLCVStore;
+    nến kết thúc tại `end` (mặc định: nến hiện tại).
+    """
+
+    def __init__(self, points: Optional[int] = None, seed: int = 42, end: Optional[str] = None):
+        self.points = points
+        self.seed = seed
+        self.end = end
+
+    def history(self, symbol: str, period: str = "30d", interval: str = "1h") -> pd.DataFrame:
+        points = self.points or period_points(period, interval)
+        seed = self.seed + sum(symbol.encode())
+        end = self.end or pd.Timestamp.now(tz="UTC").floor(TIMEFRAMES[interval]).tz_localize(None)
+        return random_walk_ohlcv(points, interval=interval, seed=seed, end=end)
+
+    def fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        data = self.history(symbol, "max", interval)
+        return data if start is None else data[data.index >= start]
@@ -1,77 +1,295 @@
 from crewai.tools import BaseTool
 from typing import Type, List, Dict, Any, Optional
 from pydantic import BaseModel, Field
+from pathlib import Path
+import os
+import re
 import json
 import requests
+import numpy as np
 from tools.technical_indicators import TechnicalIndicators
-import yfinance as yf
+from tools.indicator_cache import get_default_cache
+from tools.indicator_engine import LOW_MEMORY_WINDOW, obv_offset
+from tools.timeframes import MIN_TIMEFRAME_CANDLES, TIMEFRAMES, base_interval, resample_ohlcv, timeframe_confluence, next_candle_close
+from tools.ohlcv_store import get_default_store
+from tools.result_cache import get_default_result_cache
+from tools.market_structure import market_structure
+from tools.compact_output import HISTORY_MODES, compact_result, dumps_compact
 import pandas as pd
 
 class TechnicalAnalysisInput(BaseModel):
     """Input schema for technical analysis tool."""
     symbol: str = Field(..., description="Cryptocurrency symbol (e.g., BTC-USD, ETH-USD)")
     indicators: List[str] = Field(default=["rsi", "macd", "bollinger", "ema"], 
-                                description="List of indicators to calculate")
+                                description="List of indicators to calculate: rsi, macd, bollinger, ema, sma, "
+                                            "stochastic, volume, atr, adx, obv, vwap, ichimoku")
     period: str = Field(default="30d", description="Time period for data (1d, 7d, 30d, 90d)")
     interval: str = Field(default="1h", description="Data interval (1m, 5m, 15m, 1h, 1d)")
+    output_mode: str = Field(default="summary",
+                             description="'summary' for the JSON signal summary, 'compact' for a minified summary "
+                                         "without messages (fewer tokens), 'columns' to export full indicator history to a file")
+    timeframes: List[str] = Field(default=[],
+                                  description="Multi-timeframe mode, e.g. ['5m', '15m', '1h', '4h', '1d']: "
+                                              "one fetch, indicators on every timeframe plus a confluence summary; "
+                                              f"timeframes with fewer than {MIN_TIMEFRAME_CANDLES} candles in the period are "
+                                              "marked insufficient and excluded from the confluence")
+    low_memory: bool = Field(default=os.environ.get("INDICATOR_LOW_MEMORY", "").lower() in ("1", "true", "yes"),
+                             description="Low-memory mode for very long histories: NumPy inputs without list copies, "
+                                         "summary from the latest candles only, float32 indicator columns")
+    fields: List[str] = Field(default=[],
+                              description="Compact mode: top-level keys to keep, e.g. ['summary', 'rsi', 'market_context']")
+    history: str = Field(default="numeric",
+                         description="Compact mode: 'numeric' number-only indicator histories, 'none' to drop them, 'full'")
+    max_chars: int = Field(default=0, description="Compact mode: hard cap on the JSON length (0 = no cap)")
+
+# Thư mục ghi file cột chỉ báo ở chế độ output_mode="columns"
+INDICATOR_OUTPUT_DIR = Path(os.environ.get("INDICATOR_OUTPUT_DIR", "data/indicators"))
 
 class TechnicalAnalysisTool(BaseTool):
     name: str = "Technical Analysis Tool"
     description: str = (
         "Performs comprehensive technical analysis on cryptocurrency prices. "
         "Calculates RSI, MACD, Bollinger Bands, EMA, SMA, Stochastic, and provides trading signals. "
+        "On request also ATR (volatility), ADX/DMI (trend strength), OBV, VWAP and Ichimoku. "
         "Also includes volume analysis and trend detection."
     )
     args_schema: Type[BaseModel] = TechnicalAnalysisInput
+    # Instance dành cho agent có thể trả lời lời gọi 'summary' ở dạng compact (xem tools/compact_output.py)
+    compact_output: bool = os.environ.get("TA_COMPACT_OUTPUT", "").lower() in ("1", "true", "yes")
+    compact_max_chars: int = int(os.environ.get("TA_COMPACT_MAX_CHARS", 0))
 
     def _run(self, symbol: str, indicators: List[str] = None, 
-             period: str = "30d", interval: str = "1h") -> str:
+             period: str = "30d", interval: str = "1h", output_mode: str = "summary",
+             timeframes: Optional[List[str]] = None, low_memory: bool = False,
+             fields: Optional[List[str]] = None, history: str = "numeric", max_chars: int = 0) -> str:
         try:
             if indicators is None:
                 indicators = ["rsi", "macd", "bollinger", "ema", "sma"]
             
-            # Fetch price data từ Yahoo Finance
-            ticker = yf.Ticker(f"{symbol}-USD" if not symbol.endswith("-USD") else symbol)
-            data = ticker.history(period=period, interval=interval)
-            
-            if data.empty:
-                return json.dumps({"error": f"No data found for {symbol}"})
-            
-            # Prepare data
-            prices = data['Close'].tolist()
-            volumes = data['Volume'].tolist() if 'Volume' in data.columns else None
-            highs = data['High'].tolist() if 'High' in data.columns else None
-            lows = data['Low'].tolist() if 'Low' in data.columns else None
+            if timeframes:
+                unknown = [tf for tf in timeframes if tf not in TIMEFRAMES]
+                if unknown:
+                    return json.dumps({"error": f"Unsupported timeframes: {unknown}"})
+                interval = base_interval(timeframes)
             
-            # Calculate technical indicators
-            ta = TechnicalIndicators()
-            results = ta.calculate_multiple_indicators(
-                prices=prices,
-                volumes=volumes,
-                highs=highs,
-                lows=lows,
-                indicators=indicators
-            )
+            if output_mode == "columns":
+                return self._compute(symbol, indicators, period, interval, output_mode, timeframes, low_memory)
             
-            # Add current price and market context
-            current_price = prices[-1]
-            price_change = ((prices[-1] - prices[-2]) / prices[-2] * 100) if len(prices) > 1 else 0
+            compact = None
+            if output_mode == "compact" or (output_mode == "summary" and self.compact_output):
+                if history not in HISTORY_MODES:
+                    return json.dumps({"error": f"Unsupported history mode: {history}"})
+                compact = (tuple(fields or ()), history, max_chars or self.compact_max_chars)
             
-            # Add advanced analysis
-            results['market_context'] = {
-                "current_price": round(current_price, 2),
-                "price_change_24h": round(price_change, 2),
-                "volatility": round(pd.Series(prices).pct_change().std() * 100, 2),
-                "volume_trend": self._analyze_volume_trend(volumes) if volumes else "N/A",
-                "support_resistance": self._find_support_resistance(prices),
-                "trend_strength": self._calculate_trend_strength(prices)
-            }
-            
-            return json.dumps(results, ensure_ascii=False, indent=2)
+            # JSON chỉ thay đổi khi một nến đóng hoặc các nến đã lưu thay đổi
+            cache = get_default_result_cache()
+            cache_key = (symbol, tuple(indicators), period, interval, tuple(timeframes or ()), bool(low_memory),
+                         compact)
+            cached = cache.get(cache_key, self._data_version(symbol, interval))
+            if cached is not None:
+                return cached
+            return cache.coalesce(cache_key, lambda: self._compute(
+                symbol, indicators, period, interval, output_mode, timeframes, low_memory, cache_key, compact))
             
         except Exception as e:
             return json.dumps({"error": f"Technical analysis failed: {str(e)}"})
     
+    def _compute(self, symbol: str, indicators: List[str], period: str, interval: str, output_mode: str,
+                 timeframes: Optional[List[str]], low_memory: bool, cache_key: Optional[tuple] = None,
+                 compact: Optional[tuple] = None) -> str:
+        """
+        Tải, phân tích và serialize; summary thành công được cache đến lần đóng nến kế tiếp.
+        `compact` = (fields, history, max_chars) chọn dạng rút gọn dành cho agent.
+        """
+        # Lấy nến từ kho OHLCV cục bộ (chỉ tải phần đuôi còn thiếu từ Yahoo Finance)
+        data = self._fetch_history(symbol, period, interval)
+        
+        if data.empty:
+            return json.dumps({"error": f"No data found for {symbol}"})
+        
+        if output_mode == "columns":
+            return json.dumps(self._export_columns(symbol, period, interval, data, low_memory))
+        
+        if timeframes:
+            results = self._analyze_timeframes(data, indicators, timeframes, interval, low_memory)
+        else:
+            results = self._analyze(data, indicators, low_memory)
+        
+        output = self._serialize(results, compact)
+        # Interval kho OHLCV không lưu (1wk, 1mo, 60m, ...) không có ranh giới nến cũng như phiên bản dữ liệu
+        # để làm mất hiệu lực, nên không cache
+        if cache_key is not None and "error" not in results and interval in TIMEFRAMES:
+            get_default_result_cache().put(cache_key, output, next_candle_close(interval),
+                                           self._data_version(symbol, interval))
+        return output
+    
+    @staticmethod
+    def _serialize(results: Dict[str, Any], compact: Optional[tuple] = None) -> str:
+        if compact is None:
+            return json.dumps(results, ensure_ascii=False, indent=2)
+        fields, history, max_chars = compact
+        if "timeframes" in results:
+            # Chọn field áp dụng bên trong từng khung thời gian; summary đồng thuận giữ nguyên
+            results = {**results, "timeframes": {
+                tf: compact_result(result, fields, history) for tf, result in results["timeframes"].items()
+            }}
+            return dumps_compact(compact_result(results, history=history), max_chars)
+        return dumps_compact(compact_result(results, fields, history), max_chars)
+    
+    def _analyze_timeframes(self, data: pd.DataFrame, indicators: List[str],
+                            timeframes: List[str], base: str, low_memory: bool = False) -> Dict[str, Any]:
+        """
+        Resample một lần tải sang mọi khung thời gian và thêm summary đồng thuận giữa các khung;
+        khung không đủ MIN_TIMEFRAME_CANDLES nến vẫn có kết quả nhưng không được bỏ phiếu
+        """
+        per_timeframe = {}
+        for timeframe in timeframes:
+            candles = resample_ohlcv(data, timeframe, base)
+            if candles.empty:
+                per_timeframe[timeframe] = {"error": f"No candles for {timeframe}"}
+                continue
+            per_timeframe[timeframe] = self._analyze(candles, indicators, low_memory)
+            per_timeframe[timeframe]["candles"] = len(candles)
+        
+        return {
+            "base_interval": base,
+            "timeframes": per_timeframe,
+            "confluence": timeframe_confluence(per_timeframe)
+        }
+    
+    def _analyze(self, data: pd.DataFrame, indicators: List[str], low_memory: bool = False) -> Dict[str, Any]:
+        """Kết quả chỉ báo và market context cho một tập nến"""
+        if low_memory:
+            return self._analyze_low_memory(data, indicators)
+        
+        # Prepare data
+        prices = data['Close'].tolist()
+        volumes = data['Volume'].tolist() if 'Volume' in data.columns else None
+        highs = data['High'].tolist() if 'High' in data.columns else None
+        lows = data['Low'].tolist() if 'Low' in data.columns else None
+        
+        # Calculate technical indicators (memo dùng chung giữa các agent theo nội dung đầu vào)
+        results = get_default_cache().calculate_multiple_indicators(
+            prices=prices,
+            volumes=volumes,
+            highs=highs,
+            lows=lows,
+            indicators=indicators
+        )
+        
+        # Add current price and market context
+        current_price = prices[-1]
+        price_change = ((prices[-1] - prices[-2]) / prices[-2] * 100) if len(prices) > 1 else 0
+        
+        # Add advanced analysis
+        results['market_context'] = {
+            "current_price": round(current_price, 2),
+            "price_change_24h": round(price_change, 2),
+            "volatility": round(pd.Series(prices).pct_change().std() * 100, 2),
+            "volume_trend": self._analyze_volume_trend(volumes) if volumes else "N/A",
+            **self._market_structure(data)
+        }
+        
+        return results
+    
+    def _analyze_low_memory(self, data: pd.DataFrame, indicators: List[str]) -> Dict[str, Any]:
+        """
+        Cùng kết quả với `_analyze` nhưng không chép lịch sử ra list Python: các chỉ báo chỉ cần
+        LOW_MEMORY_WINDOW nến cuối (xem tools/indicator_engine.py), lấy dạng view NumPy của các cột
+        DataFrame. Cấu trúc thị trường (vùng hỗ trợ/kháng cự, độ dốc xu hướng) và độ biến động vẫn
+        tính vectorized trên toàn bộ lịch sử; độ biến động tính bằng float32 (khoảng 7 chữ số có nghĩa,
+        nên có thể lệch ở chữ số làm tròn cuối).
+        """
+        column = lambda name: data[name].to_numpy()[-LOW_MEMORY_WINDOW:] if name in data.columns else None
+        prices, volumes, highs, lows = column('Close'), column('Volume'), column('High'), column('Low')
+        
+        start = len(data) - LOW_MEMORY_WINDOW
+        results = get_default_cache().calculate_multiple_indicators(
+            prices=prices,
+            volumes=volumes,
+            highs=highs,
+            lows=lows,
+            indicators=indicators,
+            # OBV nối tiếp từ các nến trước cửa sổ nên cùng mức với `_analyze`
+            obv_offset=obv_offset(data['Close'].to_numpy(), data['Volume'].to_numpy(), start)
+            if volumes is not None and start > 0 else 0.0
+        )
+        
+        close = data['Close'].to_numpy(dtype=np.float32)
+        returns = close[1:] / close[:-1] - 1
+        recent_prices = prices.tolist()
+        recent_volumes = volumes.tolist() if volumes is not None else None
+        price_change = ((recent_prices[-1] - recent_prices[-2]) / recent_prices[-2] * 100) if len(recent_prices) > 1 else 0
+        
+        results['market_context'] = {
+            "current_price": round(recent_prices[-1], 2),
+            "price_change_24h": round(price_change, 2),
+            "volatility": round(float(np.std(returns, ddof=1, dtype=np.float64)) * 100, 2) if len(returns) > 1 else float('nan'),
+            "volume_trend": self._analyze_volume_trend(recent_volumes) if recent_volumes else "N/A",
+            **self._market_structure(data)
+        }
+        
+        return results
+    
+    def _fetch_history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """Nến OHLCV từ kho cục bộ dùng chung, bổ sung từ Yahoo Finance"""
+        return get_default_store().history(self._ticker(symbol), period, interval)
+    
+    def _data_version(self, symbol: str, interval: str) -> int:
+        """Bộ đếm thay đổi của kho cho các nến `_fetch_history` đọc (kết quả cache gắn với nó)"""
+        return get_default_store().version(self._ticker(symbol), interval)
+    
+    @staticmethod
+    def _ticker(symbol: str) -> str:
+        return f"{symbol}-USD" if not symbol.endswith("-USD") else symbol
+    
+    def get_indicator_columns(self, symbol: str, period: str = "30d", interval: str = "1h",
+                              output: str = "numpy", low_memory: bool = False) -> Any:
+        """
+        Các cột chỉ báo trên toàn bộ lịch sử, thẳng hàng với các nến (dùng để vẽ biểu đồ và backtest).
+        Trả về dict các mảng NumPy, hoặc pyarrow.Table khi output="arrow".
+        low_memory=True trả về các cột float32.
+        """
+        data = self._fetch_history(symbol, period, interval)
+        return self._indicator_columns(data, output, low_memory)
+    
+    def _indicator_columns(self, data: pd.DataFrame, output: str = "numpy", low_memory: bool = False) -> Any:
+        return TechnicalIndicators.calculate_indicator_columns(
+            prices=data['Close'].to_numpy(),
+            volumes=data['Volume'].to_numpy() if 'Volume' in data.columns else None,
+            highs=data['High'].to_numpy() if 'High' in data.columns else None,
+            lows=data['Low'].to_numpy() if 'Low' in data.columns else None,
+            timestamps=data.index.to_numpy(dtype='datetime64[ns]'),
+            output=output,
+            low_memory=low_memory
+        )
+    
+    def _export_columns(self, symbol: str, period: str, interval: str, data: pd.DataFrame,
+                        low_memory: bool = False) -> Dict[str, Any]:
+        """Ghi các cột chỉ báo đầy đủ ra Parquet (hoặc .npz khi không có pyarrow) và mô tả file"""
+        INDICATOR_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        # Tên file lấy từ tham số do agent truyền vào: chỉ giữ ký tự an toàn và không ra ngoài thư mục output
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{symbol}_{period}_{interval}").lstrip(".")
+        if not name or (INDICATOR_OUTPUT_DIR / name).resolve().parent != INDICATOR_OUTPUT_DIR.resolve():
+            return {"error": f"Invalid export name: {symbol}_{period}_{interval}"}
+        try:
+            import pyarrow.parquet as pq
+            table = self._indicator_columns(data, output="arrow", low_memory=low_memory)
+            path = INDICATOR_OUTPUT_DIR / f"{name}.parquet"
+            pq.write_table(table, path)
+            columns = table.column_names
+        except ImportError:
+            arrays = self._indicator_columns(data, low_memory=low_memory)
+            path = INDICATOR_OUTPUT_DIR / f"{name}.npz"
+            np.savez(path, **arrays)
+            columns = list(arrays)
+        return {
+            "symbol": symbol,
+            "rows": len(data),
+            "columns": columns,
+            "path": str(path)
+        }
+    
     def _analyze_volume_trend(self, volumes: List[float]) -> str:
         """Analyze volume trend over the period"""
         if len(volumes) < 10:
@@ -87,39 +305,10 @@ class TechnicalAnalysisTool(BaseTool):
         else:
             return "Stable"
     
-    def _find_support_resistance(self, prices: List[float]) -> Dict[str, float]:
-        """Find basic support and resistance levels"""
-        if len(prices) < 20:
-            return {"support": None, "resistance": None}
-        
-        recent_prices = prices[-20:]
-        support = min(recent_prices)
-        resistance = max(recent_prices)
-        
-        return {
-            "support": round(support, 2),
-            "resistance": round(resistance, 2)
-        }
-    
-    def _calculate_trend_strength(self, prices: List[float]) -> str:
-        """Calculate trend strength based on price momentum"""
-        if len(prices) < 10:
-            return "Unknown"
-        
-        # Calculate linear regression slope
-        x = list(range(len(prices[-10:])))
-        y = prices[-10:]
-        
-        n = len(x)
-        slope = (n * sum(x[i] * y[i] for i in range(n)) - sum(x) * sum(y)) / (n * sum(x[i]**2 for i in range(n)) - sum(x)**2)
-        
-        if slope > 0.5:
-            return "Strong Uptrend"
-        elif slope > 0.1:
-            return "Weak Uptrend"
-        elif slope < -0.5:
-            return "Strong Downtrend"
-        elif slope < -0.1:
-            return "Weak Downtrend"
-        else:
-            return "Sideways"
\ No newline at end of file
+    def _market_structure(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Vùng hỗ trợ/kháng cự theo swing và độ dốc xu hướng nhiều cửa sổ (tools/market_structure.py)"""
+        return market_structure(
+            data['Close'].to_numpy(),
+            data['High'].to_numpy() if 'High' in data.columns else None,
+            data['Low'].to_numpy() if 'Low' in data.columns else None
+        )
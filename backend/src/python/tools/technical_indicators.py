@@ -1,8 +1,15 @@
+import os
 import sys
 import json
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, TextIO
+
+if __package__ in (None, ''):
+    # Chạy trực tiếp `python tools/technical_indicators.py`: cần thư mục gốc để import `tools.*`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.indicator_engine import IndicatorEngine, tail
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -11,6 +18,19 @@ class TechnicalIndicators:
     Lớp tính toán các chỉ báo kỹ thuật cho crypto
     """
     
+    # Trọng số của từng tín hiệu trong phân tích tổng hợp
+    SIGNAL_WEIGHTS = {
+        'STRONG_BULLISH': 3,
+        'BULLISH': 2,
+        'BUY': 2,
+        'OVERSOLD': 1,
+        'NEUTRAL': 0,
+        'BEARISH': -2,
+        'SELL': -2,
+        'STRONG_BEARISH': -3,
+        'OVERBOUGHT': -1
+    }
+    
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> Dict[str, Any]:
         """
@@ -18,34 +38,18 @@ class TechnicalIndicators:
         RSI = 100 - (100 / (1 + RS))
         RS = Average Gain / Average Loss
         """
+        return TechnicalIndicators._rsi(IndicatorEngine(prices), period)
+    
+    @staticmethod
+    def _rsi(engine: IndicatorEngine, period: int = 14) -> Dict[str, Any]:
         try:
-            if len(prices) < period + 1:
+            if len(engine) < period + 1:
                 return {"error": "Không đủ dữ liệu để tính RSI"}
             
-            df = pd.DataFrame({'price': prices})
-            delta = df['price'].diff()
-            
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
+            rsi = engine.rsi(period)
             
-            avg_gain = gain.ewm(alpha=1/period, min_periods=period).mean()
-            avg_loss = loss.ewm(alpha=1/period, min_periods=period).mean()
-    
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            current_rsi = rsi.iloc[-1]
-            
-            # Phân tích RSI - SỬA LẠI: RSI >= 70 là quá mua, RSI <= 30 là quá bán
-            if current_rsi >= 70:
-                signal = "OVERBOUGHT"
-                message = "Vùng quá mua - Có thể bán"
-            elif current_rsi <= 30:
-                signal = "OVERSOLD"
-                message = "Vùng quá bán - Có thể mua"
-            else:
-                signal = "NEUTRAL"
-                message = "Vùng trung tính"
+            current_rsi = rsi[-1]
+            signal, message = TechnicalIndicators._rsi_signal(current_rsi)
             
             return {
                 "indicator": "RSI",
@@ -53,50 +57,44 @@ class TechnicalIndicators:
                 "signal": signal,
                 "message": message,
                 "period": period,
-                "history": rsi.dropna().round(2).tolist()[-10:]
+                "history": tail(rsi, 2)
             }
             
         except Exception as e:
             return {"error": f"Lỗi tính RSI: {str(e)}"}
     
+    @staticmethod
+    def _rsi_signal(current_rsi: float) -> Tuple[str, str]:
+        # Phân tích RSI - SỬA LẠI: RSI >= 70 là quá mua, RSI <= 30 là quá bán
+        if current_rsi >= 70:
+            return "OVERBOUGHT", "Vùng quá mua - Có thể bán"
+        elif current_rsi <= 30:
+            return "OVERSOLD", "Vùng quá bán - Có thể mua"
+        return "NEUTRAL", "Vùng trung tính"
+    
     @staticmethod
     def calculate_macd(prices: List[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, Any]:
         """
         Tính MACD (Moving Average Convergence Divergence)
         """
+        return TechnicalIndicators._macd(IndicatorEngine(prices), fast_period, slow_period, signal_period)
+    
+    @staticmethod
+    def _macd(engine: IndicatorEngine, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, Any]:
         try:
-            if len(prices) < slow_period + signal_period:
+            if len(engine) < slow_period + signal_period:
                 return {"error": "Không đủ dữ liệu để tính MACD"}
             
-            df = pd.DataFrame({'price': prices})
-            
-            # Tính EMA
-            ema_fast = df['price'].ewm(span=fast_period).mean()
-            ema_slow = df['price'].ewm(span=slow_period).mean()
-            
-            # Tính MACD
-            macd_line = ema_fast - ema_slow
-            signal_line = macd_line.ewm(span=signal_period).mean()
-            histogram = macd_line - signal_line
-            
-            current_macd = macd_line.iloc[-1]
-            current_signal = signal_line.iloc[-1]
-            current_histogram = histogram.iloc[-1]
-            prev_histogram = histogram.iloc[-2] if len(histogram) > 1 else 0
-            
-            # Phân tích MACD
-            if current_macd > current_signal and prev_histogram <= 0 and current_histogram > 0:
-                signal = "BUY"
-                message = "MACD cắt lên Signal - Tín hiệu mua mạnh"
-            elif current_macd < current_signal and prev_histogram >= 0 and current_histogram < 0:
-                signal = "SELL"
-                message = "MACD cắt xuống Signal - Tín hiệu bán mạnh"
-            elif current_macd > current_signal:
-                signal = "BULLISH"
-                message = "MACD trên Signal - Xu hướng tăng"
-            else:
-                signal = "BEARISH"
-                message = "MACD dưới Signal - Xu hướng giảm"
+            # EMA nhanh/chậm được dùng chung với chỉ báo EMA
+            macd_line, signal_line, histogram = engine.macd(fast_period, slow_period, signal_period)
+            
+            current_macd = macd_line[-1]
+            current_signal = signal_line[-1]
+            current_histogram = histogram[-1]
+            prev_histogram = histogram[-2] if len(histogram) > 1 else 0
+            signal, message = TechnicalIndicators._macd_signal(
+                current_macd, current_signal, current_histogram, prev_histogram
+            )
             
             return {
                 "indicator": "MACD",
@@ -106,53 +104,53 @@ class TechnicalIndicators:
                 "trend": signal,
                 "message": message,
                 "history": {
-                    "macd": macd_line.dropna().round(4).tolist()[-10:],
-                    "signal": signal_line.dropna().round(4).tolist()[-10:],
-                    "histogram": histogram.dropna().round(4).tolist()[-10:]
+                    "macd": tail(macd_line, 4),
+                    "signal": tail(signal_line, 4),
+                    "histogram": tail(histogram, 4)
                 }
             }
             
         except Exception as e:
             return {"error": f"Lỗi tính MACD: {str(e)}"}
     
+    @staticmethod
+    def _macd_signal(current_macd: float, current_signal: float,
+                     current_histogram: float, prev_histogram: float) -> Tuple[str, str]:
+        # Phân tích MACD
+        if current_macd > current_signal and prev_histogram <= 0 and current_histogram > 0:
+            return "BUY", "MACD cắt lên Signal - Tín hiệu mua mạnh"
+        elif current_macd < current_signal and prev_histogram >= 0 and current_histogram < 0:
+            return "SELL", "MACD cắt xuống Signal - Tín hiệu bán mạnh"
+        elif current_macd > current_signal:
+            return "BULLISH", "MACD trên Signal - Xu hướng tăng"
+        return "BEARISH", "MACD dưới Signal - Xu hướng giảm"
+    
     @staticmethod
     def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: float = 2) -> Dict[str, Any]:
         """
         Tính Bollinger Bands
         """
+        return TechnicalIndicators._bollinger_bands(IndicatorEngine(prices), period, std_dev)
+    
+    @staticmethod
+    def _bollinger_bands(engine: IndicatorEngine, period: int = 20, std_dev: float = 2) -> Dict[str, Any]:
         try:
-            if len(prices) < period:
+            if len(engine) < period:
                 return {"error": "Không đủ dữ liệu để tính Bollinger Bands"}
             
-            df = pd.DataFrame({'price': prices})
-            
-            # Tính SMA và standard deviation
-            sma = df['price'].rolling(window=period).mean()
-            std = df['price'].rolling(window=period).std()
-            
-            upper_band = sma + (std * std_dev)
-            lower_band = sma - (std * std_dev)
+            # SMA và standard deviation được dùng chung với chỉ báo SMA
+            upper_band, sma, lower_band = engine.bollinger(period, std_dev)
             
-            current_price = prices[-1]
-            current_upper = upper_band.iloc[-1]
-            current_lower = lower_band.iloc[-1]
-            current_middle = sma.iloc[-1]
+            current_price = float(engine.close[-1])
+            current_upper = upper_band[-1]
+            current_lower = lower_band[-1]
+            current_middle = sma[-1]
             
             # Phân tích Bollinger Bands
             band_position = (current_price - current_lower) / (current_upper - current_lower)
-            
-            if current_price >= current_upper:
-                signal = "OVERBOUGHT"
-                message = "Giá chạm band trên - Có thể quá mua"
-            elif current_price <= current_lower:
-                signal = "OVERSOLD"
-                message = "Giá chạm band dưới - Có thể quá bán"
-            elif current_price > current_middle:
-                signal = "BULLISH"
-                message = "Giá trên đường giữa - Xu hướng tăng"
-            else:
-                signal = "BEARISH"
-                message = "Giá dưới đường giữa - Xu hướng giảm"
+            signal, message = TechnicalIndicators._bollinger_signal(
+                current_price, current_upper, current_middle, current_lower
+            )
             
             return {
                 "indicator": "BOLLINGER_BANDS",
@@ -169,42 +167,45 @@ class TechnicalIndicators:
         except Exception as e:
             return {"error": f"Lỗi tính Bollinger Bands: {str(e)}"}
     
+    @staticmethod
+    def _bollinger_signal(current_price: float, current_upper: float,
+                          current_middle: float, current_lower: float) -> Tuple[str, str]:
+        if current_price >= current_upper:
+            return "OVERBOUGHT", "Giá chạm band trên - Có thể quá mua"
+        elif current_price <= current_lower:
+            return "OVERSOLD", "Giá chạm band dưới - Có thể quá bán"
+        elif current_price > current_middle:
+            return "BULLISH", "Giá trên đường giữa - Xu hướng tăng"
+        return "BEARISH", "Giá dưới đường giữa - Xu hướng giảm"
+    
     @staticmethod
     def calculate_ema(prices: List[float], period: int = 21) -> Dict[str, Any]:
         """
         Tính EMA (Exponential Moving Average)
         """
+        return TechnicalIndicators._ema(IndicatorEngine(prices), period)
+    
+    @staticmethod
+    def _ema(engine: IndicatorEngine, period: int = 21) -> Dict[str, Any]:
         try:
-            if len(prices) < period:
+            if len(engine) < period:
                 return {"error": "Không đủ dữ liệu để tính EMA"}
             
-            df = pd.DataFrame({'price': prices})
-            ema = df['price'].ewm(span=period).mean()
+            ema = engine.ema(period)
             
-            current_price = prices[-1]
-            current_ema = ema.iloc[-1]
+            current_price = float(engine.close[-1])
+            current_ema = ema[-1]
             
             # Tính độ dốc của EMA
             if len(ema) >= 2:
-                ema_slope = (ema.iloc[-1] - ema.iloc[-2]) / ema.iloc[-2] * 100
+                ema_slope = (ema[-1] - ema[-2]) / ema[-2] * 100
             else:
                 ema_slope = 0
             
             # Phân tích EMA
-            if current_price > current_ema:
-                if ema_slope > 0:
-                    signal = "STRONG_BULLISH"
-                    message = f"Giá trên EMA{period} và EMA đang tăng - Xu hướng tăng mạnh"
-                else:
-                    signal = "BULLISH"
-                    message = f"Giá trên EMA{period} - Xu hướng tăng"
-            else:
-                if ema_slope < 0:
-                    signal = "STRONG_BEARISH"
-                    message = f"Giá dưới EMA{period} và EMA đang giảm - Xu hướng giảm mạnh"
-                else:
-                    signal = "BEARISH"
-                    message = f"Giá dưới EMA{period} - Xu hướng giảm"
+            signal, message = TechnicalIndicators._moving_average_signal(
+                "EMA", period, current_price, current_ema, ema_slope
+            )
             
             return {
                 "indicator": f"EMA_{period}",
@@ -213,7 +214,7 @@ class TechnicalIndicators:
                 "signal": signal,
                 "message": message,
                 "ema_slope": round(ema_slope, 4),
-                "history": ema.dropna().round(2).tolist()[-10:]
+                "history": tail(ema, 2)
             }
             
         except Exception as e:
@@ -224,37 +225,29 @@ class TechnicalIndicators:
         """
         Tính SMA (Simple Moving Average)
         """
+        return TechnicalIndicators._sma(IndicatorEngine(prices), period)
+    
+    @staticmethod
+    def _sma(engine: IndicatorEngine, period: int = 20) -> Dict[str, Any]:
         try:
-            if len(prices) < period:
+            if len(engine) < period:
                 return {"error": "Không đủ dữ liệu để tính SMA"}
             
-            df = pd.DataFrame({'price': prices})
-            sma = df['price'].rolling(window=period).mean()
+            sma = engine.sma(period)
             
-            current_price = prices[-1]
-            current_sma = sma.iloc[-1]
+            current_price = float(engine.close[-1])
+            current_sma = sma[-1]
             
             # Tính độ dốc của SMA
             if len(sma) >= 2:
-                sma_slope = (sma.iloc[-1] - sma.iloc[-2]) / sma.iloc[-2] * 100
+                sma_slope = (sma[-1] - sma[-2]) / sma[-2] * 100
             else:
                 sma_slope = 0
             
             # Phân tích SMA
-            if current_price > current_sma:
-                if sma_slope > 0:
-                    signal = "STRONG_BULLISH"
-                    message = f"Giá trên SMA{period} và SMA đang tăng - Xu hướng tăng mạnh"
-                else:
-                    signal = "BULLISH"
-                    message = f"Giá trên SMA{period} - Xu hướng tăng"
-            else:
-                if sma_slope < 0:
-                    signal = "STRONG_BEARISH"
-                    message = f"Giá dưới SMA{period} và SMA đang giảm - Xu hướng giảm mạnh"
-                else:
-                    signal = "BEARISH"
-                    message = f"Giá dưới SMA{period} - Xu hướng giảm"
+            signal, message = TechnicalIndicators._moving_average_signal(
+                "SMA", period, current_price, current_sma, sma_slope
+            )
             
             return {
                 "indicator": f"SMA_{period}",
@@ -263,30 +256,49 @@ class TechnicalIndicators:
                 "signal": signal,
                 "message": message,
                 "sma_slope": round(sma_slope, 4),
-                "history": sma.dropna().round(2).tolist()[-10:]
+                "history": tail(sma, 2)
             }
             
         except Exception as e:
             return {"error": f"Lỗi tính SMA: {str(e)}"}
     
+    @staticmethod
+    def _moving_average_signal(name: str, period: int, current_price: float,
+                               current_value: float, slope: float) -> Tuple[str, str]:
+        """
+        Phân tích giá so với đường trung bình (EMA/SMA) và độ dốc của nó
+        """
+        if current_price > current_value:
+            if slope > 0:
+                return "STRONG_BULLISH", f"Giá trên {name}{period} và {name} đang tăng - Xu hướng tăng mạnh"
+            return "BULLISH", f"Giá trên {name}{period} - Xu hướng tăng"
+        if slope < 0:
+            return "STRONG_BEARISH", f"Giá dưới {name}{period} và {name} đang giảm - Xu hướng giảm mạnh"
+        return "BEARISH", f"Giá dưới {name}{period} - Xu hướng giảm"
+    
     @staticmethod
     def calculate_volume(prices: List[float], volumes: List[float], period: int = 20) -> Dict[str, Any]:
         """
         Tính trung bình khối lượng giao dịch và Volume Rate of Change
         """
+        return TechnicalIndicators._volume(IndicatorEngine(prices, volumes), period)
+    
+    @staticmethod
+    def _volume(engine: IndicatorEngine, period: int = 20) -> Dict[str, Any]:
         try:
-            if len(volumes) < period:
+            volumes = engine.volume
+            prices = engine.close
+            if volumes is None or len(volumes) < period:
                 return {"error": "Không đủ dữ liệu để tính khối lượng giao dịch"}
             
-            df = pd.DataFrame({'volume': volumes, 'price': prices})
-            sma_volume = df['volume'].rolling(window=period).mean()
+            sma_volume = engine.volume_sma(period)
             
-            current_volume = volumes[-1]
-            current_sma_volume = sma_volume.iloc[-1]
+            current_volume = float(volumes[-1])
+            current_sma_volume = sma_volume[-1]
             
             # Tính Volume Rate of Change
             if len(volumes) >= 2:
-                volume_roc = (current_volume - volumes[-2]) / volumes[-2] * 100
+                volume_roc = (current_volume - float(volumes[-2])) / float(volumes[-2]) * 100
             else:
                 volume_roc = 0
             
@@ -294,7 +306,7 @@ class TechnicalIndicators:
             volume_ratio = current_volume / current_sma_volume
             
             # Phân tích khối lượng với price action
-            price_change = (prices[-1] - prices[-2]) / prices[-2] * 100 if len(prices) >= 2 else 0
+            price_change = (float(prices[-1]) - float(prices[-2])) / float(prices[-2]) * 100 if len(prices) >= 2 else 0
             
             if volume_ratio > 1.5:  # Volume cao hơn 50% so với trung bình
                 if price_change > 0:
@@ -322,7 +334,7 @@ class TechnicalIndicators:
                 "volume_roc": round(volume_roc, 2),
                 "signal": signal,
                 "message": message,
-                "history": sma_volume.dropna().round(2).tolist()[-10:]
+                "history": tail(sma_volume, 2)
             }
             
         except Exception as e:
@@ -336,48 +348,24 @@ class TechnicalIndicators:
         %K = (Current Close - Lowest Low) / (Highest High - Lowest Low) * 100
         %D = SMA của %K
         """
+        return TechnicalIndicators._stochastic(IndicatorEngine(prices, highs=highs, lows=lows), k_period, d_period)
+    
+    @staticmethod
+    def _stochastic(engine: IndicatorEngine, k_period: int = 14, d_period: int = 3) -> Dict[str, Any]:
         try:
-            if len(prices) < k_period + d_period:
+            if len(engine) < k_period + d_period:
                 return {"error": "Không đủ dữ liệu để tính Stochastic"}
             
-            df = pd.DataFrame({
-                'close': prices,
-                'high': highs if highs else prices,
-                'low': lows if lows else prices
-            })
-            
-            # Tính %K
-            lowest_low = df['low'].rolling(window=k_period).min()
-            highest_high = df['high'].rolling(window=k_period).max()
+            # Thiếu high/low thì engine dùng giá đóng cửa
+            k_percent, d_percent = engine.stochastic(k_period, d_period)
             
-            k_percent = ((df['close'] - lowest_low) / (highest_high - lowest_low)) * 100
-            d_percent = k_percent.rolling(window=d_period).mean()
-            
-            current_k = k_percent.iloc[-1]
-            current_d = d_percent.iloc[-1]
+            current_k = k_percent[-1]
+            current_d = d_percent[-1]
             
             # Phân tích Stochastic với crossover
-            prev_k = k_percent.iloc[-2] if len(k_percent) > 1 else current_k
-            prev_d = d_percent.iloc[-2] if len(d_percent) > 1 else current_d
-            
-            if current_k >= 80 and current_d >= 80:
-                signal = "OVERBOUGHT"
-                message = "Stochastic trong vùng quá mua - Có thể bán"
-            elif current_k <= 20 and current_d <= 20:
-                signal = "OVERSOLD"
-                message = "Stochastic trong vùng quá bán - Có thể mua"
-            elif current_k > current_d and prev_k <= prev_d:
-                signal = "BUY"
-                message = "%K cắt lên %D - Tín hiệu mua"
-            elif current_k < current_d and prev_k >= prev_d:
-                signal = "SELL"
-                message = "%K cắt xuống %D - Tín hiệu bán"
-            elif current_k > current_d:
-                signal = "BULLISH"
-                message = "%K trên %D - Xu hướng tăng"
-            else:
-                signal = "BEARISH"
-                message = "%K dưới %D - Xu hướng giảm"
+            prev_k = k_percent[-2] if len(k_percent) > 1 else current_k
+            prev_d = d_percent[-2] if len(d_percent) > 1 else current_d
+            signal, message = TechnicalIndicators._stochastic_signal(current_k, current_d, prev_k, prev_d)
             
             return {
                 "indicator": "STOCHASTIC",
@@ -388,24 +376,286 @@ class TechnicalIndicators:
                 "k_period": k_period,
                 "d_period": d_period,
                 "history": {
-                    "k_percent": k_percent.dropna().round(2).tolist()[-10:],
-                    "d_percent": d_percent.dropna().round(2).tolist()[-10:]
+                    "k_percent": tail(k_percent, 2),
+                    "d_percent": tail(d_percent, 2)
                 }
             }
             
         except Exception as e:
             return {"error": f"Lỗi tính Stochastic: {str(e)}"}
     
+    @staticmethod
+    def _stochastic_signal(current_k: float, current_d: float,
+                           prev_k: float, prev_d: float) -> Tuple[str, str]:
+        if current_k >= 80 and current_d >= 80:
+            return "OVERBOUGHT", "Stochastic trong vùng quá mua - Có thể bán"
+        elif current_k <= 20 and current_d <= 20:
+            return "OVERSOLD", "Stochastic trong vùng quá bán - Có thể mua"
+        elif current_k > current_d and prev_k <= prev_d:
+            return "BUY", "%K cắt lên %D - Tín hiệu mua"
+        elif current_k < current_d and prev_k >= prev_d:
+            return "SELL", "%K cắt xuống %D - Tín hiệu bán"
+        elif current_k > current_d:
+            return "BULLISH", "%K trên %D - Xu hướng tăng"
+        return "BEARISH", "%K dưới %D - Xu hướng giảm"
+    
+    @staticmethod
+    def calculate_atr(prices: List[float], highs: Optional[List[float]] = None,
+                      lows: Optional[List[float]] = None, period: int = 14) -> Dict[str, Any]:
+        """
+        Tính ATR (Average True Range) - độ biến động trung bình
+        TR = max(High - Low, |High - Close trước|, |Low - Close trước|), làm trơn Wilder
+        """
+        return TechnicalIndicators._atr(IndicatorEngine(prices, highs=highs, lows=lows), period)
+    
+    @staticmethod
+    def _atr(engine: IndicatorEngine, period: int = 14) -> Dict[str, Any]:
+        try:
+            if len(engine) < period + 1:
+                return {"error": "Không đủ dữ liệu để tính ATR"}
+            
+            atr = engine.atr(period)
+            
+            current_price = float(engine.close[-1])
+            current_atr = atr[-1]
+            price_move = current_price - float(engine.close[-2])
+            signal, message = TechnicalIndicators._atr_signal(price_move, current_atr)
+            
+            return {
+                "indicator": f"ATR_{period}",
+                "atr_value": round(current_atr, 4),
+                "atr_percent": round(current_atr / current_price * 100, 2),
+                "price_move_atr": round(price_move / current_atr, 2) if current_atr else 0,
+                "signal": signal,
+                "message": message,
+                "history": tail(atr, 4)
+            }
+            
+        except Exception as e:
+            return {"error": f"Lỗi tính ATR: {str(e)}"}
+    
+    @staticmethod
+    def _atr_signal(price_move: float, current_atr: float) -> Tuple[str, str]:
+        # Nến vượt quá 1 ATR được coi là phá vỡ biến động
+        if price_move > current_atr:
+            return "BULLISH", "Giá tăng hơn 1 ATR - Phá vỡ biến động đi lên"
+        elif price_move < -current_atr:
+            return "BEARISH", "Giá giảm hơn 1 ATR - Phá vỡ biến động đi xuống"
+        return "NEUTRAL", "Biến động trong phạm vi bình thường"
+    
+    @staticmethod
+    def calculate_adx(prices: List[float], highs: Optional[List[float]] = None,
+                      lows: Optional[List[float]] = None, period: int = 14) -> Dict[str, Any]:
+        """
+        Tính ADX và DMI (+DI, -DI) - độ mạnh và hướng của xu hướng
+        """
+        return TechnicalIndicators._adx(IndicatorEngine(prices, highs=highs, lows=lows), period)
+    
+    @staticmethod
+    def _adx(engine: IndicatorEngine, period: int = 14) -> Dict[str, Any]:
+        try:
+            if len(engine) < period * 2:
+                return {"error": "Không đủ dữ liệu để tính ADX"}
+            
+            plus_di, minus_di, adx = engine.dmi(period)
+            
+            current_adx = adx[-1]
+            current_plus = plus_di[-1]
+            current_minus = minus_di[-1]
+            signal, message = TechnicalIndicators._adx_signal(current_adx, current_plus, current_minus)
+            
+            return {
+                "indicator": f"ADX_{period}",
+                "adx": round(current_adx, 2),
+                "plus_di": round(current_plus, 2),
+                "minus_di": round(current_minus, 2),
+                "signal": signal,
+                "message": message,
+                "history": {
+                    "adx": tail(adx, 2),
+                    "plus_di": tail(plus_di, 2),
+                    "minus_di": tail(minus_di, 2)
+                }
+            }
+            
+        except Exception as e:
+            return {"error": f"Lỗi tính ADX: {str(e)}"}
+    
+    @staticmethod
+    def _adx_signal(current_adx: float, plus_di: float, minus_di: float) -> Tuple[str, str]:
+        # ADX >= 25: xu hướng mạnh, 20-25: xu hướng đang hình thành, < 20: không có xu hướng
+        if current_adx >= 25:
+            if plus_di > minus_di:
+                return "STRONG_BULLISH", "ADX trên 25 và +DI trên -DI - Xu hướng tăng mạnh"
+            return "STRONG_BEARISH", "ADX trên 25 và -DI trên +DI - Xu hướng giảm mạnh"
+        elif current_adx >= 20:
+            if plus_di > minus_di:
+                return "BULLISH", "+DI trên -DI - Xu hướng tăng đang hình thành"
+            return "BEARISH", "-DI trên +DI - Xu hướng giảm đang hình thành"
+        return "NEUTRAL", "ADX dưới 20 - Thị trường không có xu hướng"
+    
+    @staticmethod
+    def calculate_obv(prices: List[float], volumes: List[float], period: int = 20) -> Dict[str, Any]:
+        """
+        Tính OBV (On-Balance Volume) và so sánh với đường trung bình `period` nến của nó
+        """
+        return TechnicalIndicators._obv(IndicatorEngine(prices, volumes), period)
+    
+    @staticmethod
+    def _obv(engine: IndicatorEngine, period: int = 20) -> Dict[str, Any]:
+        try:
+            if engine.volume is None or len(engine) < period + 1:
+                return {"error": "Không đủ dữ liệu để tính OBV"}
+            
+            obv = engine.obv()
+            obv_sma = engine.obv_sma(period)
+            
+            current_obv = obv[-1]
+            current_sma = obv_sma[-1]
+            obv_change = current_obv - obv[-2]
+            signal, message = TechnicalIndicators._obv_signal(current_obv, current_sma, obv_change)
+            
+            return {
+                "indicator": "OBV",
+                "obv": round(current_obv, 2),
+                "obv_sma": round(current_sma, 2),
+                "signal": signal,
+                "message": message,
+                "history": tail(obv, 2)
+            }
+            
+        except Exception as e:
+            return {"error": f"Lỗi tính OBV: {str(e)}"}
+    
+    @staticmethod
+    def _obv_signal(current_obv: float, current_sma: float, obv_change: float) -> Tuple[str, str]:
+        if current_obv > current_sma and obv_change > 0:
+            return "BULLISH", "OBV trên trung bình và đang tăng - Dòng tiền vào"
+        elif current_obv < current_sma and obv_change < 0:
+            return "BEARISH", "OBV dưới trung bình và đang giảm - Dòng tiền ra"
+        return "NEUTRAL", "OBV chưa xác nhận xu hướng"
+    
+    @staticmethod
+    def calculate_vwap(prices: List[float], volumes: List[float], highs: Optional[List[float]] = None,
+                       lows: Optional[List[float]] = None, period: int = 20) -> Dict[str, Any]:
+        """
+        Tính VWAP trượt: tổng (giá điển hình × khối lượng) / tổng khối lượng của `period` nến
+        """
+        return TechnicalIndicators._vwap(IndicatorEngine(prices, volumes, highs, lows), period)
+    
+    @staticmethod
+    def _vwap(engine: IndicatorEngine, period: int = 20) -> Dict[str, Any]:
+        try:
+            if engine.volume is None or len(engine) < period:
+                return {"error": "Không đủ dữ liệu để tính VWAP"}
+            
+            vwap = engine.vwap(period)
+            
+            current_price = float(engine.close[-1])
+            current_vwap = vwap[-1]
+            signal, message = TechnicalIndicators._vwap_signal(current_price, current_vwap)
+            
+            return {
+                "indicator": f"VWAP_{period}",
+                "current_price": round(current_price, 2),
+                "vwap": round(current_vwap, 2),
+                "distance_percent": round((current_price - current_vwap) / current_vwap * 100, 2),
+                "signal": signal,
+                "message": message,
+                "history": tail(vwap, 2)
+            }
+            
+        except Exception as e:
+            return {"error": f"Lỗi tính VWAP: {str(e)}"}
+    
+    @staticmethod
+    def _vwap_signal(current_price: float, current_vwap: float) -> Tuple[str, str]:
+        if current_price > current_vwap:
+            return "BULLISH", "Giá trên VWAP - Bên mua chiếm ưu thế"
+        return "BEARISH", "Giá dưới VWAP - Bên bán chiếm ưu thế"
+    
+    @staticmethod
+    def calculate_ichimoku(prices: List[float], highs: Optional[List[float]] = None,
+                           lows: Optional[List[float]] = None, tenkan_period: int = 9,
+                           kijun_period: int = 26, senkou_b_period: int = 52) -> Dict[str, Any]:
+        """
+        Tính Ichimoku Kinko Hyo (Tenkan-sen, Kijun-sen và mây Senkou Span A/B)
+        """
+        return TechnicalIndicators._ichimoku(IndicatorEngine(prices, highs=highs, lows=lows),
+                                             tenkan_period, kijun_period, senkou_b_period)
+    
+    @staticmethod
+    def _ichimoku(engine: IndicatorEngine, tenkan_period: int = 9, kijun_period: int = 26,
+                  senkou_b_period: int = 52) -> Dict[str, Any]:
+        try:
+            if len(engine) < senkou_b_period + kijun_period:
+                return {"error": "Không đủ dữ liệu để tính Ichimoku"}
+            
+            tenkan, kijun, span_a, span_b = engine.ichimoku(tenkan_period, kijun_period, senkou_b_period)
+            
+            current_price = float(engine.close[-1])
+            cloud_top = max(span_a[-1], span_b[-1])
+            cloud_bottom = min(span_a[-1], span_b[-1])
+            signal, message = TechnicalIndicators._ichimoku_signal(
+                current_price, tenkan[-1], kijun[-1], cloud_top, cloud_bottom
+            )
+            
+            return {
+                "indicator": "ICHIMOKU",
+                "current_price": round(current_price, 2),
+                "tenkan_sen": round(tenkan[-1], 2),
+                "kijun_sen": round(kijun[-1], 2),
+                "senkou_span_a": round(span_a[-1], 2),
+                "senkou_span_b": round(span_b[-1], 2),
+                "signal": signal,
+                "message": message
+            }
+            
+        except Exception as e:
+            return {"error": f"Lỗi tính Ichimoku: {str(e)}"}
+    
+    @staticmethod
+    def _ichimoku_signal(current_price: float, tenkan: float, kijun: float,
+                         cloud_top: float, cloud_bottom: float) -> Tuple[str, str]:
+        if current_price > cloud_top:
+            if tenkan > kijun:
+                return "STRONG_BULLISH", "Giá trên mây và Tenkan trên Kijun - Xu hướng tăng mạnh"
+            return "BULLISH", "Giá trên mây Ichimoku - Xu hướng tăng"
+        elif current_price < cloud_bottom:
+            if tenkan < kijun:
+                return "STRONG_BEARISH", "Giá dưới mây và Tenkan dưới Kijun - Xu hướng giảm mạnh"
+            return "BEARISH", "Giá dưới mây Ichimoku - Xu hướng giảm"
+        return "NEUTRAL", "Giá trong mây Ichimoku - Thị trường tích lũy"
+    
     @staticmethod
     def calculate_multiple_indicators(prices: List[float], volumes: Optional[List[float]] = None, 
                                     highs: Optional[List[float]] = None, lows: Optional[List[float]] = None,
-                                    indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+                                    indicators: Optional[List[str]] = None,
+                                    low_memory: bool = False) -> Dict[str, Any]:
+        """
+        Tính nhiều chỉ báo cùng lúc và đưa ra phân tích tổng hợp.
+        Dữ liệu chỉ được chuyển sang mảng NumPy một lần; các chỉ báo dùng chung
+        diff, EMA và rolling mean/std qua IndicatorEngine.
+        low_memory=True: chỉ tính trên LOW_MEMORY_WINDOW nến cuối (truyền mảng NumPy thay vì list
+        để không tốn bộ nhớ cho list); kết quả giống chế độ thường, bộ nhớ không tăng theo độ dài lịch sử
+        """
+        if low_memory:
+            engine = IndicatorEngine.from_tail(prices, volumes, highs, lows)
+        else:
+            engine = IndicatorEngine(prices, volumes, highs, lows)
+        return TechnicalIndicators.calculate_from_engine(engine, indicators)
+    
+    @staticmethod
+    def calculate_from_engine(engine: IndicatorEngine, indicators: Optional[List[str]] = None) -> Dict[str, Any]:
         """
-        Tính nhiều chỉ báo cùng lúc và đưa ra phân tích tổng hợp
+        Như `calculate_multiple_indicators` nhưng dùng một IndicatorEngine có sẵn
+        (ví dụ engine lấy từ cache với các chuỗi trung gian đã tính)
         """
+        has_volume = engine.volume is not None
+        
         if indicators is None:
             indicators = ['rsi', 'macd', 'bollinger', 'ema', 'sma', 'stochastic']
-            if volumes:
+            if has_volume:
                 indicators.append('volume')
         
         results = {}
@@ -413,34 +663,85 @@ class TechnicalIndicators:
         for indicator in indicators:
             try:
                 if indicator.lower() == 'rsi':
-                    results['rsi'] = TechnicalIndicators.calculate_rsi(prices)
+                    results['rsi'] = TechnicalIndicators._rsi(engine)
                 elif indicator.lower() == 'macd':
-                    results['macd'] = TechnicalIndicators.calculate_macd(prices)
+                    results['macd'] = TechnicalIndicators._macd(engine)
                 elif indicator.lower() == 'bollinger':
-                    results['bollinger'] = TechnicalIndicators.calculate_bollinger_bands(prices)
+                    results['bollinger'] = TechnicalIndicators._bollinger_bands(engine)
                 elif indicator.lower() == 'ema':
-                    results['ema'] = TechnicalIndicators.calculate_ema(prices)
+                    results['ema'] = TechnicalIndicators._ema(engine)
                 elif indicator.lower() == 'sma':
-                    results['sma'] = TechnicalIndicators.calculate_sma(prices)
+                    results['sma'] = TechnicalIndicators._sma(engine)
                 elif indicator.lower() == 'stochastic':
-                    results['stochastic'] = TechnicalIndicators.calculate_stochastic(prices, highs, lows)
-                elif indicator.lower() == 'volume' and volumes:
-                    results['volume'] = TechnicalIndicators.calculate_volume(prices, volumes)
+                    results['stochastic'] = TechnicalIndicators._stochastic(engine)
+                elif indicator.lower() == 'volume' and has_volume:
+                    results['volume'] = TechnicalIndicators._volume(engine)
+                elif indicator.lower() == 'atr':
+                    results['atr'] = TechnicalIndicators._atr(engine)
+                elif indicator.lower() == 'adx':
+                    results['adx'] = TechnicalIndicators._adx(engine)
+                elif indicator.lower() == 'obv' and has_volume:
+                    results['obv'] = TechnicalIndicators._obv(engine)
+                elif indicator.lower() == 'vwap' and has_volume:
+                    results['vwap'] = TechnicalIndicators._vwap(engine)
+                elif indicator.lower() == 'ichimoku':
+                    results['ichimoku'] = TechnicalIndicators._ichimoku(engine)
             except Exception as e:
                 results[indicator] = {"error": f"Lỗi tính {indicator}: {str(e)}"}
         
-        # Phân tích tổng hợp với trọng số
-        signal_weights = {
-            'STRONG_BULLISH': 3,
-            'BULLISH': 2,
-            'BUY': 2,
-            'OVERSOLD': 1,
-            'NEUTRAL': 0,
-            'BEARISH': -2,
-            'SELL': -2,
-            'STRONG_BEARISH': -3,
-            'OVERBOUGHT': -1
-        }
+        results['summary'] = TechnicalIndicators.summarize_signals(results)
+        
+        return results
+    
+    @staticmethod
+    def calculate_indicator_columns(prices: List[float], volumes: Optional[List[float]] = None,
+                                    highs: Optional[List[float]] = None, lows: Optional[List[float]] = None,
+                                    timestamps: Optional[List[Any]] = None, output: str = 'numpy',
+                                    low_memory: bool = False) -> Any:
+        """
+        Chế độ đầy đủ lịch sử (opt-in): trả về toàn bộ các cột chỉ báo thẳng hàng với nến
+        (timestamp, rsi, macd, macd_signal, macd_histogram, bb_*, ema_21, sma_20, stoch_k, stoch_d)
+        - output='numpy': dict tên cột -> mảng NumPy
+        - output='arrow': pyarrow.Table (cần cài pyarrow)
+        low_memory=True: các cột là float32 (một nửa bộ nhớ, ~7 chữ số có nghĩa, xem IndicatorEngine)
+        """
+        engine = IndicatorEngine(prices, volumes, highs, lows, dtype=np.float32 if low_memory else np.float64)
+        columns = engine.columns(timestamps)
+        if output == 'arrow':
+            import pyarrow as pa
+            return pa.table(columns)
+        return columns
+    
+    @staticmethod
+    def calculate_parameter_sweep(prices: List[float], param_sets: List[Dict[str, Any]],
+                                  volumes: Optional[List[float]] = None, highs: Optional[List[float]] = None,
+                                  lows: Optional[List[float]] = None) -> pd.DataFrame:
+        """
+        Quét nhiều bộ tham số trong một lượt, ví dụ:
+        [{"indicator": "rsi", "period": 7}, {"indicator": "ema", "period": 200},
+         {"indicator": "bollinger", "period": 20, "std_dev": 2.5}]
+        Trả về DataFrame tidy (indicator, params, value, signal, ...); xem tools/indicator_sweep.py
+        """
+        from tools.indicator_sweep import run_parameter_sweep
+        return run_parameter_sweep(prices, param_sets, volumes, highs, lows)
+
+    @staticmethod
+    def calculate_signal_series(prices: List[float], volumes: Optional[List[float]] = None,
+                                highs: Optional[List[float]] = None, lows: Optional[List[float]] = None,
+                                indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        `overall_signal` và `average_score` cho mọi nến (mảng), thay cho việc gọi
+        calculate_multiple_indicators cho từng nến; xem tools/backtest.py
+        """
+        from tools.backtest import signal_series
+        return signal_series(IndicatorEngine(prices, volumes, highs, lows), indicators)
+
+    @staticmethod
+    def summarize_signals(results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Phân tích tổng hợp với trọng số từ kết quả của các chỉ báo
+        """
+        signal_weights = TechnicalIndicators.SIGNAL_WEIGHTS
         
         total_score = 0
         valid_indicators = 0
@@ -490,7 +791,7 @@ class TechnicalIndicators:
             recommendation = "Không thể phân tích - Cần kiểm tra dữ liệu"
             average_score = 0
         
-        results['summary'] = {
+        return {
             "overall_signal": overall_signal,
             "recommendation": recommendation,
             "average_score": round(average_score, 2),
@@ -499,68 +800,209 @@ class TechnicalIndicators:
             "signal_details": signal_details,
             "confidence": min(100, abs(average_score) * 30)  # Độ tin cậy 0-100%
         }
-        
-        return results
+
+def run_indicator(indicator_name: str, prices: List[float], volumes: Optional[List[float]] = None,
+                  highs: Optional[List[float]] = None, lows: Optional[List[float]] = None) -> Dict[str, Any]:
+    """
+    Tính chỉ báo theo tên (dùng chung cho CLI và chế độ server)
+    """
+    # Tạo instance
+    ta = TechnicalIndicators()
+    
+    # Tính chỉ báo dựa trên tên
+    if indicator_name.lower() == 'rsi':
+        return ta.calculate_rsi(prices)
+    elif indicator_name.lower() == 'macd':
+        return ta.calculate_macd(prices)
+    elif indicator_name.lower() == 'bollinger':
+        return ta.calculate_bollinger_bands(prices)
+    elif indicator_name.lower() == 'ema':
+        return ta.calculate_ema(prices)
+    elif indicator_name.lower() == 'sma':
+        return ta.calculate_sma(prices)
+    elif indicator_name.lower() == 'stochastic':
+        return ta.calculate_stochastic(prices, highs, lows)
+    elif indicator_name.lower() == 'volume' and volumes is not None and len(volumes):
+        return ta.calculate_volume(prices, volumes)
+    elif indicator_name.lower() == 'atr':
+        return ta.calculate_atr(prices, highs, lows)
+    elif indicator_name.lower() == 'adx':
+        return ta.calculate_adx(prices, highs, lows)
+    elif indicator_name.lower() == 'obv' and volumes is not None and len(volumes):
+        return ta.calculate_obv(prices, volumes)
+    elif indicator_name.lower() == 'vwap' and volumes is not None and len(volumes):
+        return ta.calculate_vwap(prices, volumes, highs, lows)
+    elif indicator_name.lower() == 'ichimoku':
+        return ta.calculate_ichimoku(prices, highs, lows)
+    elif indicator_name.lower() == 'all':
+        return ta.calculate_multiple_indicators(prices, volumes, highs, lows)
+    return {"error": f"Chỉ báo '{indicator_name}' không được hỗ trợ"}
+
+# Tên key trong file .npz cho từng chuỗi dữ liệu
+NPZ_KEYS = {
+    'prices': ('prices', 'close'),
+    'volumes': ('volumes', 'volume'),
+    'highs': ('highs', 'high'),
+    'lows': ('lows', 'low')
+}
+
+def load_series(source: Any, name: str = 'prices', stdin: Optional[TextIO] = None) -> Optional[np.ndarray]:
+    """
+    Đọc một chuỗi dữ liệu từ:
+    - JSON inline ("[1, 2, 3]") hoặc list Python
+    - file .npy (memory-mapped, không sao chép)
+    - file .npz (lấy key theo `NPZ_KEYS[name]`)
+    - file float64 thô .f64/.bin (memory-mapped)
+    - "-": buffer float64 thô từ stdin
+    """
+    if source is None or not isinstance(source, str):
+        return source
+    if source == '-':
+        stream = stdin if stdin is not None else sys.stdin
+        return np.frombuffer(stream.buffer.read(), dtype=np.float64)
+    if source.lstrip().startswith('['):
+        return json.loads(source)
+    
+    path = source[len('mmap:'):] if source.startswith('mmap:') else source
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    if path.endswith('.npz'):
+        with np.load(path) as archive:
+            for key in NPZ_KEYS.get(name, (name,)):
+                if key in archive:
+                    return archive[key]
+        return None
+    if path.endswith(('.f64', '.bin')) or source.startswith('mmap:'):
+        return np.memmap(path, dtype=np.float64, mode='r')
+    return json.loads(source)
+
+def _flatten_result(result: Any, prefix: str = '') -> Dict[str, np.ndarray]:
+    """
+    Làm phẳng kết quả lồng nhau thành các cột `a.b.c` để ghi dạng nhị phân/cột
+    """
+    columns = {}
+    if isinstance(result, dict):
+        for key, value in result.items():
+            columns.update(_flatten_result(value, f"{prefix}{key}."))
+    elif isinstance(result, list) and any(isinstance(item, dict) for item in result):
+        columns[prefix[:-1]] = np.array([json.dumps(item, ensure_ascii=False) for item in result])
+    else:
+        columns[prefix[:-1]] = np.asarray(result)
+    return columns
+
+def write_result(result: Dict[str, Any], output_format: str = 'json', stdout: Optional[TextIO] = None) -> None:
+    """
+    Ghi kết quả: `json` (mặc định, indent=2 như cũ), `compact` (JSON rút gọn)
+    hoặc `npz` (các cột NumPy nhị phân ghi ra stdout)
+    """
+    stream = stdout if stdout is not None else sys.stdout
+    if output_format == 'npz':
+        stream.flush()
+        np.savez(stream.buffer, **_flatten_result(result))
+        stream.buffer.flush()
+    elif output_format == 'compact':
+        stream.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n')
+    else:
+        stream.write(json.dumps(result, ensure_ascii=False, indent=2) + '\n')
+
+def _pop_option(argv: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Lấy và xóa tùy chọn `--name value` hoặc `--name=value` khỏi argv"""
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        if arg.startswith(name + '='):
+            del argv[i]
+            return arg.split('=', 1)[1]
+    return default
+
+def _handle_request(line: str) -> Dict[str, Any]:
+    """
+    Xử lý một request JSON-lines:
+    {"id": ..., "indicator": "all", "prices": [...], "volumes": [...], "highs": [...], "lows": [...]}
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        # Mỗi chuỗi có thể là list JSON hoặc đường dẫn file .npy/.npz/.f64
+        result = run_indicator(
+            request.get('indicator', 'all'),
+            load_series(request['prices'], 'prices'),
+            load_series(request.get('volumes'), 'volumes'),
+            load_series(request.get('highs'), 'highs'),
+            load_series(request.get('lows'), 'lows')
+        )
+    except Exception as e:
+        result = {"error": f"Lỗi: {str(e)}"}
+    return {"id": request_id, "result": result}
+
+def serve(input_stream: TextIO = sys.stdin, output_stream: TextIO = sys.stdout) -> None:
+    """
+    Chế độ server JSON-lines chạy lâu dài: mỗi dòng stdin là một request, mỗi dòng stdout
+    là một response {"id", "result"} với result cùng schema như CLI.
+    Các chuỗi trong request có thể là đường dẫn file (xem `load_series`).
+    Process chỉ trả chi phí import NumPy/pandas một lần; mỗi request được tính và flush ngay khi
+    đọc xong (dòng trống bị bỏ qua, request lỗi trả về {"error"} mà không dừng vòng lặp)
+    """
+    for line in iter(input_stream.readline, ''):
+        if not line.strip():
+            continue
+        output_stream.write(json.dumps(_handle_request(line), ensure_ascii=False) + '\n')
+        output_stream.flush()
 
 def main():
     # try:
-        if len(sys.argv) < 3:
-            print(json.dumps({"error": "Thiếu tham số. Cần: prices_json và indicator_name"}))
+        argv = sys.argv[1:]
+        output_format = _pop_option(argv, '--format', 'json')
+        
+        if argv and argv[0] == '--serve':
+            serve()
+            return
+        
+        if len(argv) < 2:
+            print(json.dumps({"error": "Thiếu tham số. Cần: prices (JSON, .npy, .npz, .f64 hoặc -) và indicator_name (hoặc --serve)"}))
             return
         
-        prices_json = sys.argv[1]
-        indicator_name = sys.argv[2]
+        prices_source = argv[0]
+        indicator_name = argv[1]
         
         # Parse prices
-        prices = json.loads(prices_json)
+        prices = load_series(prices_source, 'prices')
         
         # Parse thêm volumes, highs, lows nếu có
         volumes = None
         highs = None
         lows = None
         
-        if len(sys.argv) > 3:
+        # File .npz chứa luôn volumes/highs/lows khi không truyền riêng
+        if prices_source.endswith('.npz'):
+            volumes = load_series(prices_source, 'volumes')
+            highs = load_series(prices_source, 'highs')
+            lows = load_series(prices_source, 'lows')
+        
+        if len(argv) > 2:
             try:
-                volumes = json.loads(sys.argv[3])
+                volumes = load_series(argv[2], 'volumes')
             except:
                 pass
                 
-        if len(sys.argv) > 4:
+        if len(argv) > 3:
             try:
-                highs = json.loads(sys.argv[4])
+                highs = load_series(argv[3], 'highs')
             except:
                 pass
                 
-        if len(sys.argv) > 5:
+        if len(argv) > 4:
             try:
-                lows = json.loads(sys.argv[5])
+                lows = load_series(argv[4], 'lows')
             except:
                 pass
         
-        # Tạo instance
-        ta = TechnicalIndicators()
-        
-        # Tính chỉ báo dựa trên tên
-        if indicator_name.lower() == 'rsi':
-            result = ta.calculate_rsi(prices)
-        elif indicator_name.lower() == 'macd':
-            result = ta.calculate_macd(prices)
-        elif indicator_name.lower() == 'bollinger':
-            result = ta.calculate_bollinger_bands(prices)
-        elif indicator_name.lower() == 'ema':
-            result = ta.calculate_ema(prices)
-        elif indicator_name.lower() == 'sma':
-            result = ta.calculate_sma(prices)
-        elif indicator_name.lower() == 'stochastic':
-            result = ta.calculate_stochastic(prices, highs, lows)
-        elif indicator_name.lower() == 'volume' and volumes:
-            result = ta.calculate_volume(prices, volumes)
-        elif indicator_name.lower() == 'all':
-            result = ta.calculate_multiple_indicators(prices, volumes, highs, lows)
-        else:
-            result = {"error": f"Chỉ báo '{indicator_name}' không được hỗ trợ"}
+        result = run_indicator(indicator_name, prices, volumes, highs, lows)
         
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        write_result(result, output_format)
         
     # except Exception as e:
     #     print(json.dumps({"error": f"Lỗi: {str(e)}"}, ensure_ascii=False))
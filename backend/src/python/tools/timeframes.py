@@ -0,0 +1,144 @@
+import os
+import time
+import pandas as pd
+from typing import List, Dict, Any, Optional
+
+# Độ dài nến của các khung thời gian mà tool chấp nhận
+TIMEFRAMES = {
+    "1m": pd.Timedelta(minutes=1),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "1h": pd.Timedelta(hours=1),
+    "4h": pd.Timedelta(hours=4),
+    "1d": pd.Timedelta(days=1),
+}
+
+DEFAULT_TIMEFRAMES = ["5m", "15m", "1h", "4h", "1d"]
+
+# Số nến tối thiểu để một khung thời gian được bỏ phiếu trong summary đồng thuận: đủ cho MACD(12, 26, 9),
+# chỉ báo mặc định cần nhiều nến nhất. Tải một lần theo interval mịn nhất nên khung thô có thể rất ngắn
+# (period 30d ở base 5m chỉ cho 30 nến 1d)
+MIN_TIMEFRAME_CANDLES = int(os.environ.get("MIN_TIMEFRAME_CANDLES", 35))
+
+# Các interval Yahoo Finance trả trực tiếp (4h phải resample)
+FETCHABLE_INTERVALS = ["1m", "5m", "15m", "30m", "1h", "1d"]
+
+OHLCV_AGGREGATION = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+}
+
+
+# Số ngày của mỗi đơn vị trong period kiểu yfinance ("30d", "2wk", "6mo", "1y")
+PERIOD_DAYS = {"wk": 7, "mo": 30, "y": 365, "d": 1}
+
+
+def period_to_timedelta(period: str) -> Optional[pd.Timedelta]:
+    """Độ dài của period kiểu yfinance; None với "max" (toàn bộ lịch sử có được)"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        now = pd.Timestamp.now(tz="UTC")
+        return now - now.normalize().replace(month=1, day=1)
+    for suffix, length in PERIOD_DAYS.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return pd.Timedelta(days=int(period[:-len(suffix)]) * length)
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def next_candle_close(interval: str, now: Optional[float] = None) -> float:
+    """Epoch (giây) của ranh giới `interval` kế tiếp sau `now` (căn theo UTC, giống nến của sàn)"""
+    now = time.time() if now is None else now
+    step = TIMEFRAMES[interval].total_seconds()
+    return (now // step + 1) * step
+
+
+def base_interval(timeframes: List[str]) -> str:
+    """Interval tải được thô nhất chia hết mọi khung thời gian yêu cầu"""
+    durations = [TIMEFRAMES[tf] for tf in timeframes]
+    for interval in reversed(FETCHABLE_INTERVALS):
+        step = TIMEFRAMES[interval]
+        if all(duration % step == pd.Timedelta(0) for duration in durations):
+            return interval
+    return FETCHABLE_INTERVALS[0]
+
+
+def candle_spacing(index: pd.DatetimeIndex) -> Optional[pd.Timedelta]:
+    """Khoảng cách nến điển hình: trung vị khoảng cách giữa các timestamp, không bị lệch bởi nến thiếu"""
+    if len(index) < 2:
+        return None
+    return index.to_series().diff().median()
+
+
+def resample_ohlcv(data: pd.DataFrame, timeframe: str, base: Optional[str] = None) -> pd.DataFrame:
+    """
+    Gộp nến OHLCV lên khung thời gian thô hơn (open=first, high=max, low=min,
+    close=last, volume=sum). Nhãn bucket lấy theo mép trái, bucket rỗng bị bỏ;
+    bucket cuối có thể chưa đóng, giống nến mới nhất từ sàn.
+    `base` là interval lúc tải dữ liệu; không có thì dùng trung vị khoảng cách nến.
+    Dữ liệu đã ở đúng `timeframe` được trả về nguyên vẹn.
+    """
+    duration = TIMEFRAMES[timeframe]
+    spacing = TIMEFRAMES.get(base) if base is not None else candle_spacing(data.index)
+    if spacing == duration:
+        return data
+    aggregation = {column: how for column, how in OHLCV_AGGREGATION.items() if column in data.columns}
+    resampled = data.resample(duration, label="left", closed="left").agg(aggregation)
+    return resampled.dropna(subset=["Close"])
+
+
+def confluence_summary(summaries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Gộp summary của từng khung thời gian thành một điểm đồng thuận"""
+    scored = {tf: s for tf, s in summaries.items() if s.get("valid_indicators")}
+    if not scored:
+        return {"overall_signal": "UNKNOWN", "average_score": 0, "agreement": 0,
+                "bullish": [], "bearish": [], "neutral": []}
+
+    bullish = [tf for tf, s in scored.items() if s["average_score"] >= 0.5]
+    bearish = [tf for tf, s in scored.items() if s["average_score"] <= -0.5]
+    neutral = [tf for tf in scored if tf not in bullish and tf not in bearish]
+    average_score = sum(s["average_score"] for s in scored.values()) / len(scored)
+
+    if average_score >= 1.5:
+        overall_signal = "STRONG_BULLISH"
+    elif average_score >= 0.5:
+        overall_signal = "BULLISH"
+    elif average_score <= -1.5:
+        overall_signal = "STRONG_BEARISH"
+    elif average_score <= -0.5:
+        overall_signal = "BEARISH"
+    else:
+        overall_signal = "NEUTRAL"
+
+    return {
+        "overall_signal": overall_signal,
+        "average_score": round(average_score, 2),
+        "agreement": round(max(len(bullish), len(bearish), len(neutral)) / len(scored) * 100, 1),
+        "bullish": bullish,
+        "bearish": bearish,
+        "neutral": neutral
+    }
+
+
+def timeframe_confluence(results: Dict[str, Dict[str, Any]],
+                         min_candles: int = MIN_TIMEFRAME_CANDLES) -> Dict[str, Any]:
+    """
+    Summary đồng thuận từ kết quả từng khung thời gian ({"summary", "candles", ...}).
+    Khung có ít hơn `min_candles` nến được đánh dấu "insufficient" và không bỏ phiếu; các khung
+    không bỏ phiếu (thiếu nến hoặc lỗi) được liệt kê trong "excluded"
+    """
+    summaries = {}
+    for timeframe, result in results.items():
+        if "summary" not in result:
+            continue
+        if result.get("candles", 0) < min_candles:
+            result["insufficient"] = True
+            continue
+        summaries[timeframe] = result["summary"]
+    confluence = confluence_summary(summaries)
+    confluence["excluded"] = [tf for tf in results if tf not in summaries]
+    return confluence